@@ -37,5 +37,16 @@ class EmailAccount:
         return f"Email Address: {self.address}, Usage: {self.usage}"
 
 
+# EmailFolderSyncState class for defining the last recorded sync state of an import email folder
+@dataclass
+class EmailFolderSyncState:
+    last_uid: int
+    uid_validity: int | None
+    highest_modseq: int | None
+
+    def __str__(self) -> str:
+        return f"Last UID: {self.last_uid}, UIDVALIDITY: {self.uid_validity}, HIGHESTMODSEQ: {self.highest_modseq}"
+
+
 if __name__ == "__main__":
     print("This module is not meant to be executed directly.")
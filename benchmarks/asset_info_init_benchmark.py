@@ -0,0 +1,134 @@
+# Purpose: Asset Info Init Benchmark module for measuring the peak memory and throughput of the chunked asset info initialization on a synthetic listing.
+
+# Standard Libraries
+import argparse
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+
+# Third-party Libraries
+import pandas as pd
+
+# Local Modules
+from database_management.database import Database
+from import_modules.import_market_data.asset_info_extractor import AssetInfoExtractor, ASSET_INFO_CHUNK_SIZE
+from import_modules.import_market_data.yfinance_info_cache import YFinanceInfoCache
+
+# Configure logging
+import logging
+
+
+# Global variables
+BENCHMARK_EXCHANGE_ACRONYM: str = "TSX"
+BENCHMARK_SECTORS: dict[str, list[str]] = {
+    "Technology": ["Software", "Semiconductors", "IT Services"],
+    "Financial Services": ["Banks", "Insurance", "Asset Management"],
+    "Energy": ["Oil & Gas", "Pipelines", "Renewables"],
+    "Industrials": ["Railroads", "Aerospace", "Machinery"]
+}
+BENCHMARK_CITIES: list[str] = ["Toronto", "Calgary", "Vancouver", "Montreal", "Ottawa"]
+DB_SCHEMA_FILENAME: str = "./database_management/schema/schema.sql"
+
+
+# Function to stand in for Yahoo Finance, returns a deterministic info payload of a realistic size for every symbol
+def _stand_in_fetch_info(self: YFinanceInfoCache, yfinance_symbol: str) -> dict:
+    rng = random.Random(yfinance_symbol)
+    sector_name = rng.choice(list(BENCHMARK_SECTORS))
+    return {
+        "quoteType": "EQUITY",
+        "sector": sector_name,
+        "industry": rng.choice(BENCHMARK_SECTORS[sector_name]),
+        "country": "Canada",
+        "city": rng.choice(BENCHMARK_CITIES),
+        "financialCurrency": "CAD",
+        "shortName": f"{yfinance_symbol} Common Shares",
+        "longBusinessSummary": f"{yfinance_symbol} is a synthetic benchmark company. " * 30,
+        "website": f"https://www.{yfinance_symbol.lower()}.example.com",
+        "regularMarketPrice": rng.uniform(1, 500),
+        "marketCap": rng.randint(10**6, 10**12)
+    }
+
+
+# Function to build a synthetic exchange listing with the columns produced by the ExchangeListingsExtractor
+def _generate_synthetic_listing(symbol_count: int, exchange_id: int) -> pd.DataFrame:
+    symbols = [f"S{i:05d}" for i in range(symbol_count)]
+    return pd.DataFrame({
+        "asset_class_name": "equity",
+        "asset_subclass_name": "common_stock",
+        "exchange_currency_id": 1,
+        "exchange_id": exchange_id,
+        "symbol": symbols,
+        "security_name": [f"{symbol} Common Shares" for symbol in symbols]
+    })
+
+
+# Function to create a database with the schema and the reference rows the asset info pipeline looks up
+def _create_benchmark_database(db_filename: str) -> Database:
+    database = Database(db_filename, DB_SCHEMA_FILENAME)
+    # Initialize the schema directly, Database.start() would also download the default market data
+    database.query_executor.initialize_database_schema(DB_SCHEMA_FILENAME)
+    connection = sqlite3.connect(db_filename)
+    with connection:
+        connection.executescript(
+            "INSERT INTO asset_class (id, name) VALUES (1, 'equity'), (2, 'unknown');"
+            "INSERT INTO asset_subclass (asset_class_id, name) VALUES (1, 'common_stock'), (2, 'unknown');"
+            "INSERT INTO country (id, name, iso_code) VALUES (1, 'Canada', 'CAN'), (2, 'unknown', 'unknown');"
+            "INSERT INTO currency (id, name, iso_code, symbol) VALUES (1, 'Canadian Dollar', 'CAD', '$'), (2, 'unknown', 'unknown', '?');"
+            f"INSERT INTO exchange (id, country_id, name, acronym) VALUES (1, 1, 'Toronto Stock Exchange', '{BENCHMARK_EXCHANGE_ACRONYM}');")
+    connection.close()
+    return database
+
+
+# Function to get the current resident set size of the process in MB (Linux only, 0 elsewhere)
+def _get_current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return 0.0
+
+
+# Main entry point for the asset info initialization benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the chunked asset info initialization on a synthetic listing.")
+    parser.add_argument("--symbols", type=int, default=20000, help="number of symbols in the synthetic listing")
+    parser.add_argument("--chunk-size", type=int, default=ASSET_INFO_CHUNK_SIZE, help="symbols processed per chunk")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # Yahoo Finance is replaced by the stand-in so the benchmark measures the pipeline, not the network
+    YFinanceInfoCache._fetch_info = _stand_in_fetch_info # type: ignore
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_filename = os.path.join(temp_dir, "benchmark.db")
+        database = _create_benchmark_database(db_filename)
+        df_listing = _generate_synthetic_listing(args.symbols, exchange_id=1)
+        rss_before_mb = _get_current_rss_mb()
+
+        start_time = time.perf_counter()
+        asset_info_extractor = AssetInfoExtractor(database, chunk_size=args.chunk_size)
+        asset_info_extractor.initialize_asset_info(df_listing, BENCHMARK_EXCHANGE_ACRONYM)
+        elapsed_time = time.perf_counter() - start_time
+
+        # ru_maxrss is reported in KB on Linux
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        connection = sqlite3.connect(db_filename)
+        asset_count = connection.execute("SELECT COUNT(*) FROM asset_info").fetchone()[0]
+        connection.close()
+
+        title = "ASSET INFO INITIALIZATION"
+        print(f"\n{title}")
+        print("-" * len(title))
+        print(f"Symbols: {args.symbols} (chunk size {args.chunk_size})")
+        print(f"Asset info rows in the database: {asset_count}")
+        print(f"Elapsed time: {elapsed_time:.2f} s")
+        print(f"Throughput: {args.symbols / elapsed_time:,.0f} symbols/sec")
+        print(f"RSS before the run: {rss_before_mb:.1f} MB")
+        print(f"Peak RSS: {peak_rss_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Purpose: Email Corpus Generator module for generating brokerage transaction emails to benchmark the email import.
+
+# Standard Libraries
+import random
+from datetime import datetime, timedelta, timezone
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+
+# Third-party Libraries
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Symbols and the currency prefix used in their emails, "US$" for USD and "$" for CAD
+BENCHMARK_SYMBOLS: dict[str, str] = {
+    "AAPL": "US$", "MSFT": "US$", "AMZN": "US$", "GOOGL": "US$", "NVDA": "US$", "KO": "US$", "JNJ": "US$", "PG": "US$",
+    "RY": "$", "TD": "$", "ENB": "$", "BNS": "$", "CNR": "$", "SU": "$", "BCE": "$", "XEQT": "$"
+}
+# Fraction of the corpus that are order filled emails, dividend emails and unrelated emails
+ORDER_FILLED_RATIO: float = 0.75
+DIVIDEND_RATIO: float = 0.2
+
+
+# Function to build a single order filled email
+def _build_order_filled_email(rng: random.Random, symbol: str, currency_prefix: str, date: datetime) -> MIMEText:
+    quantity = rng.randint(1, 200)
+    price = round(rng.uniform(5, 500), 2)
+    order_type = rng.choice(["Market buy", "Market sell", "Limit buy", "Limit sell"])
+    # MIMEText keeps the Date header verbatim, the default email policy would drop its "(UTC)" comment
+    message = MIMEText(
+        f"Account: {rng.choice(['TFSA', 'RRSP', 'Personal'])}\n"
+        f"Type: {order_type}\n"
+        f"Symbol: {symbol}\n"
+        f"Shares: {quantity}\n"
+        f"Average price: {currency_prefix}{price:,.2f}\n"
+        f"Total cost: {currency_prefix}{quantity * price:,.2f}\n"
+    )
+    message["Subject"] = "Your order has been filled"
+    message["Date"] = _format_email_date(date)
+    return message
+
+
+# Function to build a single dividend email
+def _build_dividend_email(rng: random.Random, symbol: str, currency_prefix: str, date: datetime) -> MIMEText:
+    message = MIMEText(
+        f"Account: {rng.choice(['TFSA', 'RRSP', 'Personal'])}\n"
+        f"Symbol: {symbol}\n"
+        f"Amount: {currency_prefix}{rng.uniform(0.5, 250):,.2f}\n"
+    )
+    message["Subject"] = "You earned a dividend"
+    message["Date"] = _format_email_date(date)
+    return message
+
+
+# Function to build a single email that isn't a transaction, the importer has to skip it
+def _build_unrelated_email(rng: random.Random, date: datetime) -> MIMEText:
+    message = MIMEText("Log in to your account to see the details.\n")
+    message["Subject"] = rng.choice(["Your monthly statement is ready", "Account security notice", "New features this month"])
+    message["Date"] = _format_email_date(date)
+    return message
+
+
+# Function to format a date the way the importer parses it, e.g. "Mon, 04 Mar 2024 15:01:02 +0000 (UTC)"
+def _format_email_date(date: datetime) -> str:
+    return f"{format_datetime(date)} (UTC)"
+
+
+# Function to generate a reproducible corpus of raw RFC822 brokerage emails, oldest first
+def generate_brokerage_email_corpus(email_count: int, seed: int=0, start_date: datetime=datetime(2022, 1, 3, tzinfo=timezone.utc)) -> list[bytes]:
+    rng = random.Random(seed)
+    symbols = list(BENCHMARK_SYMBOLS.items())
+    raw_emails = []
+    for i in range(email_count):
+        # Spread the emails over time so every transaction has a distinct timestamp
+        date = start_date + timedelta(minutes=17 * i, seconds=rng.randint(0, 59))
+        symbol, currency_prefix = rng.choice(symbols)
+        email_kind = rng.random()
+        if email_kind < ORDER_FILLED_RATIO:
+            message = _build_order_filled_email(rng, symbol, currency_prefix, date)
+        elif email_kind < ORDER_FILLED_RATIO + DIVIDEND_RATIO:
+            message = _build_dividend_email(rng, symbol, currency_prefix, date)
+        else:
+            message = _build_unrelated_email(rng, date)
+        message["From"] = "notifications@brokerage.example"
+        message["To"] = "benchmark@example.com"
+        raw_emails.append(message.as_bytes())
+    logging.info(f"Generated {email_count} benchmark emails.")
+    return raw_emails
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,129 @@
+# Purpose: Email Import Benchmark module for measuring the end-to-end email import against a local IMAP stand-in server.
+
+# Standard Libraries
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+# Third-party Libraries
+
+# Local Modules
+from account_management.accounts import UserAccount
+from benchmarks.email_corpus_generator import generate_brokerage_email_corpus, BENCHMARK_SYMBOLS
+from benchmarks.imap_stand_in_server import IMAPStandInServer
+from database_management.database import Database
+from import_modules.email_sync_engine import EmailSyncEngine, EmailSyncTarget, EMAIL_FETCH_CHUNK_SIZE
+from import_modules.import_from_email_account import EMAIL_IMPORT_BATCH_SIZE
+
+# Configure logging
+import logging
+
+
+# Global variables
+BENCHMARK_EMAIL_ADDRESS: str = "benchmark@example.com"
+BENCHMARK_EMAIL_PASSWORD: str = "benchmark-password"
+BENCHMARK_BROKERAGE_NAME: str = "benchmark_brokerage"
+DB_SCHEMA_FILENAME: str = "./database_management/schema/schema.sql"
+
+
+# Function to create a database with the schema and the rows the importer looks up (user, import email, currencies, listings)
+def _create_benchmark_database(db_filename: str) -> Database:
+    database = Database(db_filename, DB_SCHEMA_FILENAME)
+    # Initialize the schema directly, Database.start() would also download the default market data
+    database.query_executor.initialize_database_schema(DB_SCHEMA_FILENAME)
+    connection = sqlite3.connect(db_filename)
+    with connection:
+        connection.execute("INSERT INTO user (id, user_role_id, username, password_hash) VALUES (1, 2, 'benchmark', x'00')")
+        connection.execute("INSERT INTO email (user_id, email_usage_id, address) VALUES (1, (SELECT id FROM email_usage WHERE usage = 'import'), ?)",
+            (BENCHMARK_EMAIL_ADDRESS,))
+        connection.execute("INSERT INTO currency (id, name, iso_code, symbol) VALUES (1, 'Canadian Dollar', 'CAD', '$')")
+        connection.execute("INSERT INTO currency (id, name, iso_code, symbol) VALUES (2, 'US Dollar', 'USD', '$')")
+        for i, (symbol, currency_prefix) in enumerate(BENCHMARK_SYMBOLS.items(), start=1):
+            currency_id = 2 if currency_prefix == "US$" else 1
+            connection.execute("INSERT INTO asset_info (asset_class_id, asset_subclass_id, sector_id, industry_id, country_id, city_id, " \
+                "financial_currency_id, exchange_currency_id, exchange_id, symbol, security_name) VALUES (1, 1, 1, 1, 1, 1, ?, ?, ?, ?, ?)",
+                (currency_id, currency_id, currency_id, symbol, f"{symbol} Benchmark Security"))
+    connection.close()
+    # The importer writes everything for the current user
+    database.session_manager.set_current_user(UserAccount(1, "benchmark"))
+    return database
+
+
+# Function to wrap the database connection's commit so every commit is counted
+def _count_database_commits(database: Database) -> list[int]:
+    commit_count = [0]
+    db_connection = database._db_connection
+    commit_transaction = db_connection.commit_transaction
+
+    def counted_commit_transaction() -> None:
+        commit_count[0] += 1
+        commit_transaction()
+
+    db_connection.commit_transaction = counted_commit_transaction # type: ignore
+    return commit_count
+
+
+# Function to run one sync and print its throughput, IMAP round trips and database commits
+def _run_sync(title: str, engine: EmailSyncEngine, targets: list[EmailSyncTarget], server: IMAPStandInServer, commit_count: list[int]) -> None:
+    server.command_counts.clear()
+    commit_count[0] = 0
+    start_time = time.perf_counter()
+    results = engine.sync(targets)
+    elapsed_time = time.perf_counter() - start_time
+
+    emails_fetched = sum(result.emails_fetched for result in results)
+    print(f"\n{title}")
+    print("-" * len(title))
+    for result in results:
+        print(result)
+    print(f"Emails fetched: {emails_fetched}")
+    print(f"Elapsed time: {elapsed_time:.2f} s")
+    print(f"Throughput: {emails_fetched / elapsed_time:,.0f} messages/sec")
+    print(f"IMAP round trips: {server.get_round_trips()} ({', '.join(f'{command}: {count}' for command, count in sorted(server.command_counts.items()))})")
+    print(f"Database commits: {commit_count[0]}")
+
+
+# Main entry point for the email import benchmark
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the email import against a local IMAP stand-in server.")
+    parser.add_argument("--emails", type=int, default=20000, help="number of generated emails")
+    parser.add_argument("--folders", type=int, default=2, help="number of folders the emails are spread over")
+    parser.add_argument("--fetch-chunk-size", type=int, default=EMAIL_FETCH_CHUNK_SIZE, help="emails fetched per IMAP FETCH")
+    parser.add_argument("--batch-size", type=int, default=EMAIL_IMPORT_BATCH_SIZE, help="emails committed per database transaction")
+    parser.add_argument("--no-condstore", action="store_true", help="don't advertise CONDSTORE on the stand-in server")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # Seed the stand-in server with the generated corpus, spread evenly over the folders
+    server = IMAPStandInServer(BENCHMARK_EMAIL_ADDRESS, BENCHMARK_EMAIL_PASSWORD, condstore=not args.no_condstore)
+    raw_emails = generate_brokerage_email_corpus(args.emails)
+    folder_names = [f"Brokerage{i}" for i in range(1, args.folders + 1)]
+    for i, folder_name in enumerate(folder_names):
+        server.add_emails(folder_name, raw_emails[i::len(folder_names)])
+    server.start()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_filename = os.path.join(temp_dir, "benchmark.db")
+        database = _create_benchmark_database(db_filename)
+        commit_count = _count_database_commits(database)
+        engine = EmailSyncEngine(database, fetch_chunk_size=args.fetch_chunk_size, batch_size=args.batch_size,
+            imap_server_address=server.get_address())
+        targets = [EmailSyncTarget(BENCHMARK_EMAIL_ADDRESS, BENCHMARK_EMAIL_PASSWORD.encode(), folder_name, BENCHMARK_BROKERAGE_NAME)
+            for folder_name in folder_names]
+
+        # The first sync imports the whole corpus, the second one finds nothing new
+        _run_sync("INITIAL SYNC", engine, targets, server, commit_count)
+        _run_sync("NO-CHANGE SYNC", engine, targets, server, commit_count)
+
+        connection = sqlite3.connect(db_filename)
+        transaction_count = connection.execute("SELECT COUNT(*) FROM asset_transaction").fetchone()[0]
+        connection.close()
+        print(f"\nAsset transactions in the database: {transaction_count}")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Purpose: IMAP Stand-in Server module for serving a generated email corpus over a minimal local IMAP4rev1 server.
+
+# Standard Libraries
+import re
+import shlex
+import socketserver
+import threading
+from collections import Counter
+
+# Third-party Libraries
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# IMAPStandInMailbox class for holding the emails of a single folder
+class IMAPStandInMailbox:
+    def __init__(self, uid_validity: int=1) -> None:
+        self.uid_validity = uid_validity
+        self.emails: dict[int, bytes] = {}
+        self.uid_next = 1
+        self.highest_modseq = 1
+
+    def append(self, raw_email: bytes) -> int:
+        uid = self.uid_next
+        self.emails[uid] = raw_email
+        self.uid_next += 1
+        self.highest_modseq += 1
+        return uid
+
+    def reset_uid_validity(self) -> None:
+        # Renumber every email, like a server does when a folder is rebuilt
+        emails = list(self.emails.values())
+        self.uid_validity += 1
+        self.emails = {}
+        self.uid_next = 1
+        for raw_email in emails:
+            self.append(raw_email)
+
+
+# IMAPStandInServer class for serving mailboxes to IMAPClient on localhost, with per-command round trip counters
+class IMAPStandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, email_address: str, email_password: str, host: str="127.0.0.1", port: int=0, condstore: bool=True) -> None:
+        super().__init__((host, port), _IMAPStandInRequestHandler)
+        self.email_address = email_address
+        self.email_password = email_password
+        self.condstore = condstore
+        self.mailboxes: dict[str, IMAPStandInMailbox] = {"INBOX": IMAPStandInMailbox()}
+        self.command_counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def get_address(self) -> tuple[str, int]:
+        host, port = self.server_address[:2]
+        return str(host), int(port)
+
+    def add_emails(self, folder_name: str, raw_emails: list[bytes]) -> None:
+        mailbox = self.mailboxes.setdefault(folder_name, IMAPStandInMailbox())
+        for raw_email in raw_emails:
+            mailbox.append(raw_email)
+
+    def count_command(self, command: str) -> None:
+        with self._lock:
+            self.command_counts[command] += 1
+
+    def get_round_trips(self) -> int:
+        return sum(self.command_counts.values())
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"IMAP stand-in server listening on {self.get_address()}")
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+# _IMAPStandInRequestHandler class for handling the commands of a single IMAP connection
+class _IMAPStandInRequestHandler(socketserver.StreamRequestHandler):
+    server: IMAPStandInServer
+
+    def handle(self) -> None:
+        self.selected_mailbox: IMAPStandInMailbox | None = None
+        self._send_line(b"* OK IMAP stand-in server ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            try:
+                tag, command, arguments = self._parse_command(line)
+            except ValueError:
+                self._send_line(b"* BAD Invalid command")
+                continue
+            self.server.count_command(command)
+            if not self._handle_command(tag, command, arguments):
+                break
+
+    def _parse_command(self, line: bytes) -> tuple[bytes, str, list[str]]:
+        parts = line.decode().rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2:
+            raise ValueError("Missing command")
+        arguments = shlex.split(parts[2]) if len(parts) > 2 else []
+        command = parts[1].upper()
+        # UID commands are counted under their own name, e.g. "UID FETCH"
+        if command == "UID" and len(arguments) > 0:
+            command = f"UID {arguments.pop(0).upper()}"
+        return parts[0].encode(), command, arguments
+
+    def _handle_command(self, tag: bytes, command: str, arguments: list[str]) -> bool:
+        if command == "CAPABILITY":
+            capabilities = "IMAP4rev1 CONDSTORE" if self.server.condstore else "IMAP4rev1"
+            self._send_line(f"* CAPABILITY {capabilities}".encode())
+        elif command == "LOGIN":
+            if arguments != [self.server.email_address, self.server.email_password]:
+                self._send_line(tag + b" NO [AUTHENTICATIONFAILED] Invalid credentials")
+                return True
+        elif command == "LIST":
+            for folder_name in self.server.mailboxes:
+                self._send_line(f'* LIST (\\HasNoChildren) "/" {folder_name}'.encode())
+        elif command == "STATUS":
+            mailbox = self.server.mailboxes.get(arguments[0])
+            if mailbox is None:
+                self._send_line(tag + b" NO Mailbox does not exist")
+                return True
+            status_items = [f"UIDNEXT {mailbox.uid_next}", f"UIDVALIDITY {mailbox.uid_validity}"]
+            if self.server.condstore and "HIGHESTMODSEQ" in " ".join(arguments[1:]).upper():
+                status_items.append(f"HIGHESTMODSEQ {mailbox.highest_modseq}")
+            self._send_line(f"* STATUS {arguments[0]} ({' '.join(status_items)})".encode())
+        elif command in ("SELECT", "EXAMINE"):
+            self.selected_mailbox = self.server.mailboxes.get(arguments[0])
+            if self.selected_mailbox is None:
+                self._send_line(tag + b" NO Mailbox does not exist")
+                return True
+            self._send_line(f"* {len(self.selected_mailbox.emails)} EXISTS".encode())
+            self._send_line(b"* 0 RECENT")
+            self._send_line(f"* OK [UIDVALIDITY {self.selected_mailbox.uid_validity}] UIDs valid".encode())
+            self._send_line(f"* OK [UIDNEXT {self.selected_mailbox.uid_next}] Predicted next UID".encode())
+        elif command == "UID SEARCH":
+            if self.selected_mailbox is None:
+                self._send_line(tag + b" BAD No mailbox selected")
+                return True
+            uids = self._search(self.selected_mailbox, arguments)
+            self._send_line(("* SEARCH " + " ".join(str(uid) for uid in uids)).rstrip().encode())
+        elif command == "UID FETCH":
+            if self.selected_mailbox is None:
+                self._send_line(tag + b" BAD No mailbox selected")
+                return True
+            self._fetch(self.selected_mailbox, arguments[0])
+        elif command == "CLOSE":
+            self.selected_mailbox = None
+        elif command == "LOGOUT":
+            self._send_line(b"* BYE Logging out")
+            self._send_line(tag + b" OK LOGOUT completed")
+            return False
+        elif command != "NOOP":
+            self._send_line(tag + b" BAD Unsupported command")
+            return True
+        self._send_line(tag + f" OK {command} completed".encode())
+        return True
+
+    def _search(self, mailbox: IMAPStandInMailbox, arguments: list[str]) -> list[int]:
+        uids = sorted(mailbox.emails)
+        # Only "ALL" and "UID <set>" are used by IMAPClient
+        if len(arguments) >= 2 and arguments[0].upper() == "UID":
+            return self._resolve_uid_set(mailbox, arguments[1])
+        return uids
+
+    def _resolve_uid_set(self, mailbox: IMAPStandInMailbox, uid_set: str) -> list[int]:
+        uids: set[int] = set()
+        highest_uid = max(mailbox.emails, default=0)
+        for uid_range in uid_set.split(","):
+            match = re.fullmatch(r"(\d+|\*)(?::(\d+|\*))?", uid_range)
+            if match is None:
+                continue
+            start = highest_uid if match.group(1) == "*" else int(match.group(1))
+            end = start if match.group(2) is None else (highest_uid if match.group(2) == "*" else int(match.group(2)))
+            # "n:*" always includes the highest UID, even when n is greater than it
+            low, high = min(start, end), max(start, end)
+            uids.update(uid for uid in mailbox.emails if low <= uid <= high)
+        return sorted(uids)
+
+    def _fetch(self, mailbox: IMAPStandInMailbox, uid_set: str) -> None:
+        sequence_numbers = {uid: i for i, uid in enumerate(sorted(mailbox.emails), start=1)}
+        response = bytearray()
+        for uid in self._resolve_uid_set(mailbox, uid_set):
+            raw_email = mailbox.emails[uid]
+            response += f"* {sequence_numbers[uid]} FETCH (UID {uid} RFC822 {{{len(raw_email)}}}\r\n".encode()
+            response += raw_email + b")\r\n"
+        self.wfile.write(bytes(response))
+
+    def _send_line(self, line: bytes) -> None:
+        self.wfile.write(line + b"\r\n")
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
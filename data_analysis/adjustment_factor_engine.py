@@ -0,0 +1,126 @@
+# Purpose: Adjustment Factor Engine module for computing, caching and applying cumulative split and dividend adjustment factors.
+
+# Standard Libraries
+
+# Third-party Libraries
+import numpy as np
+import pandas as pd
+
+# Local Modules
+from database_management.database import Database
+
+# Configure logging
+import logging
+
+
+# Global variables
+ADJUSTMENT_FACTOR_COLUMNS: list[str] = ["asset_id", "date", "split_factor", "dividend_factor"]
+
+
+# AdjustmentFactorEngine class for building per-asset cumulative adjustment factors and applying them to prices and quantities in bulk
+class AdjustmentFactorEngine:
+    def __init__(self, database: Database) -> None:
+        self._database = database
+
+    def _compute_adjustment_factors(self, asset_ids: list[int]) -> pd.DataFrame:
+        df_splits = pd.DataFrame(self._database.query_executor.get_split_history_by_asset_ids(asset_ids),
+                                 columns=["asset_id", "date", "stock_split"])
+        df_dividends = pd.DataFrame(self._database.query_executor.get_dividend_history_with_previous_close_by_asset_ids(asset_ids),
+                                    columns=["asset_id", "date", "dividend", "previous_close"])
+
+        # Every event becomes a (split ratio, dividend multiplier) pair, 1 is no adjustment
+        split_events = pd.DataFrame({
+            "asset_id": df_splits["asset_id"],
+            "date": df_splits["date"],
+            "split_ratio": df_splits["stock_split"].astype(float),
+            "dividend_multiplier": 1.0
+        })
+        # A dividend without a previous close (or larger than it) can't be turned into a multiplier, so it's left out
+        previous_close = pd.to_numeric(df_dividends["previous_close"], errors="coerce").to_numpy(dtype=float)
+        dividend_multiplier = 1.0 - df_dividends["dividend"].astype(float).to_numpy() / previous_close
+        dividend_multiplier = np.where(np.isfinite(dividend_multiplier) & (dividend_multiplier > 0), dividend_multiplier, 1.0)
+        dividend_events = pd.DataFrame({
+            "asset_id": df_dividends["asset_id"],
+            "date": df_dividends["date"],
+            "split_ratio": 1.0,
+            "dividend_multiplier": dividend_multiplier
+        })
+        event_frames = [frame for frame in (split_events, dividend_events) if not frame.empty]
+        if len(event_frames) == 0:
+            return pd.DataFrame(columns=ADJUSTMENT_FACTOR_COLUMNS)
+        df_events = pd.concat(event_frames, ignore_index=True)
+
+        # Combine events on the same day, then take the running product from the latest event backwards
+        df_events = df_events.groupby(["asset_id", "date"], as_index=False)[["split_ratio", "dividend_multiplier"]].prod()
+        df_events = df_events.sort_values(["asset_id", "date"], ascending=[True, False])
+        df_events["split_factor"] = df_events.groupby("asset_id")["split_ratio"].cumprod()
+        df_events["dividend_factor"] = df_events.groupby("asset_id")["dividend_multiplier"].cumprod()
+        return df_events.sort_values(["asset_id", "date"])[ADJUSTMENT_FACTOR_COLUMNS].reset_index(drop=True)
+
+    def refresh_adjustment_factors(self) -> int:
+        # Recompute the factors of every asset with new corporate actions since they were last cached
+        stale_asset_ids = self._database.query_executor.get_stale_price_adjustment_factor_asset_ids()
+        if len(stale_asset_ids) == 0:
+            return 0
+        df_factors = self._compute_adjustment_factors(stale_asset_ids)
+        adjustment_factors = [(int(asset_id), date, float(split_factor), float(dividend_factor))
+                              for asset_id, date, split_factor, dividend_factor in df_factors.itertuples(index=False, name=None)]
+        self._database.query_executor.replace_price_adjustment_factors(stale_asset_ids, adjustment_factors)
+        logging.info(f"Adjustment factors refreshed for {len(stale_asset_ids)} assets.")
+        return len(stale_asset_ids)
+
+    def get_adjustment_factors(self, asset_ids: list[int]) -> pd.DataFrame:
+        # Cached factors, refreshed first if any asset has new corporate actions
+        self.refresh_adjustment_factors()
+        return pd.DataFrame(self._database.query_executor.get_price_adjustment_factors_by_asset_ids(asset_ids), columns=ADJUSTMENT_FACTOR_COLUMNS)
+
+    def _get_factors_by_row(self, df: pd.DataFrame, date_column: str) -> pd.DataFrame:
+        # Find, for every row, the first event strictly after its date, that event's cumulative factors cover the row
+        df_rows = pd.DataFrame({
+            "row": np.arange(len(df)),
+            "asset_id": df["asset_id"].astype("int64").to_numpy(),
+            # Dates are stored both as "YYYY-MM-DD" and as ISO timestamps, only the day matters
+            "date": pd.to_datetime(df[date_column].astype(str).str[:10]).to_numpy()
+        }).sort_values("date")
+        df_factors = self.get_adjustment_factors([int(asset_id) for asset_id in df_rows["asset_id"].unique()])
+        df_factors = pd.DataFrame({
+            "asset_id": df_factors["asset_id"].astype("int64"),
+            "date": pd.to_datetime(df_factors["date"]),
+            "split_factor": df_factors["split_factor"].astype(float),
+            "dividend_factor": df_factors["dividend_factor"].astype(float)
+        }).sort_values("date")
+        df_merged = pd.merge_asof(df_rows, df_factors, on="date", by="asset_id", direction="forward", allow_exact_matches=False)
+        # Rows after the last event need no adjustment
+        return df_merged.sort_values("row")[["split_factor", "dividend_factor"]].fillna(1.0).reset_index(drop=True)
+
+    def adjust_price_series(self, df: pd.DataFrame, price_columns: list[str], date_column: str="date",
+                            splits: bool=False, dividends: bool=True) -> pd.DataFrame:
+        # Return a copy of the (asset_id, date, prices...) frame with its prices adjusted for later splits and/or dividends
+        # Yahoo Finance closes are already split-adjusted, so splits are only applied when asked for (e.g. raw brokerage prices)
+        df_adjusted = df.copy()
+        if df_adjusted.empty:
+            return df_adjusted
+        df_factors = self._get_factors_by_row(df_adjusted, date_column)
+        multiplier = np.ones(len(df_adjusted))
+        if splits:
+            multiplier /= df_factors["split_factor"].to_numpy()
+        if dividends:
+            multiplier *= df_factors["dividend_factor"].to_numpy()
+        for price_column in price_columns:
+            df_adjusted[price_column] = df_adjusted[price_column].astype(float).to_numpy() * multiplier
+        return df_adjusted
+
+    def get_split_adjusted_transactions(self) -> pd.DataFrame:
+        # The current user's transactions with quantities and prices restated in post-split shares, the stored rows are left as imported
+        df_transactions = pd.DataFrame(self._database.query_executor.get_current_user_asset_transaction_quantities(),
+                                       columns=["id", "asset_id", "transaction_date", "quantity", "avg_price"])
+        if df_transactions.empty:
+            return df_transactions.assign(split_factor=pd.Series(dtype=float))
+        df_transactions["split_factor"] = self._get_factors_by_row(df_transactions, "transaction_date")["split_factor"].to_numpy()
+        df_transactions["quantity"] = df_transactions["quantity"].astype(float) * df_transactions["split_factor"]
+        df_transactions["avg_price"] = df_transactions["avg_price"].astype(float) / df_transactions["split_factor"]
+        return df_transactions
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,48 @@
+# Purpose: Price History Bars module for reading asset and index price bars at the coarsest granularity a chart or analysis needs.
+
+# Standard Libraries
+from datetime import date
+
+# Third-party Libraries
+import pandas as pd
+
+# Local Modules
+from database_management.database import Database
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Approximate length of one bar in calendar days, from the coarsest granularity to the finest
+PRICE_HISTORY_GRANULARITY_DAYS: dict[str, float] = {
+    "year": 365.25,
+    "month": 365.25 / 12,
+    "week": 7.0,
+    "day": 365.25 / 252
+}
+PRICE_HISTORY_BAR_COLUMNS: list[str] = ["date", "open", "high", "low", "close", "adj_close", "volume"]
+
+
+# Function to pick the coarsest granularity that still gives at least min_bars bars between the start and end dates
+def choose_price_history_granularity(start_date: str, end_date: str, min_bars: int) -> str:
+    range_days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+    for granularity, granularity_days in PRICE_HISTORY_GRANULARITY_DAYS.items():
+        if range_days / granularity_days >= min_bars:
+            return granularity
+    # Not even daily bars are fine enough, daily is the best available
+    return "day"
+
+
+# Function to get the price bars of an asset or index ("asset" or "index" source) for a date range and resolution
+def get_price_history_bars(database: Database, source: str, source_id: int, start_date: str, end_date: str, min_bars: int) -> pd.DataFrame:
+    granularity = choose_price_history_granularity(start_date, end_date, min_bars)
+    logging.debug(f"Reading {granularity} bars of {source} {source_id} from {start_date} to {end_date}.")
+    bars = database.query_executor.get_price_history_bars(source, source_id, granularity, start_date, end_date)
+    df_bars = pd.DataFrame(bars, columns=PRICE_HISTORY_BAR_COLUMNS)
+    df_bars.attrs["granularity"] = granularity
+    return df_bars
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
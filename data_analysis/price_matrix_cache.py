@@ -0,0 +1,184 @@
+# Purpose: Price Matrix Cache module for keeping close and adjusted close matrices in memory-mapped NumPy files for analytics.
+
+# Standard Libraries
+import os
+from dataclasses import dataclass
+
+# Third-party Libraries
+import numpy as np
+
+# Local Modules
+from database_management.database import Database
+
+# Configure logging
+import logging
+
+
+# Global variables
+PRICE_CACHE_DIRECTORY: str = "./data/price_cache"
+# Matrices cached for every universe, each one is a (dates, assets) float64 array
+PRICE_MATRIX_COLUMNS: list[str] = ["close", "adj_close"]
+
+
+# PriceMatrix class for defining a loaded, memory-mapped price matrix and its axes
+@dataclass
+class PriceMatrix:
+    dates: np.ndarray
+    asset_ids: np.ndarray
+    close: np.ndarray
+    adj_close: np.ndarray
+
+    def __str__(self) -> str:
+        return f"PriceMatrix({len(self.dates)} dates x {len(self.asset_ids)} assets)"
+
+    def get_asset_index(self, asset_id: int) -> int | None:
+        # The asset axis is in insertion order, new assets are appended at the end
+        asset_indexes = np.flatnonzero(self.asset_ids == asset_id)
+        return int(asset_indexes[0]) if len(asset_indexes) > 0 else None
+
+
+# PriceMatrixCache class for syncing a universe of assets from asset_price_history into memory-mapped .npy files
+class PriceMatrixCache:
+    def __init__(self, database: Database, universe_name: str="all", asset_ids: list[int] | None=None,
+                 cache_directory: str=PRICE_CACHE_DIRECTORY) -> None:
+        self._database = database
+        # None means every asset that has price history
+        self._universe_asset_ids = asset_ids
+        self._universe_directory = os.path.join(cache_directory, universe_name)
+
+    def _get_path(self, name: str) -> str:
+        return os.path.join(self._universe_directory, f"{name}.npy")
+
+    def _load_axes(self) -> tuple[np.ndarray, np.ndarray]:
+        if not os.path.exists(self._get_path("dates")) or not os.path.exists(self._get_path("asset_ids")):
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+        return np.load(self._get_path("dates")), np.load(self._get_path("asset_ids"))
+
+    def load(self) -> PriceMatrix | None:
+        # Memory-map the matrices read-only, nothing is read from disk until it's accessed
+        dates, asset_ids = self._load_axes()
+        if len(dates) == 0:
+            return None
+        matrices = {column: np.load(self._get_path(column), mmap_mode="r") for column in PRICE_MATRIX_COLUMNS}
+        return PriceMatrix(dates, asset_ids, matrices["close"], matrices["adj_close"])
+
+    def _get_rows(self, asset_ids: list[int], start_date: str | None=None) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+        rows = self._database.query_executor.get_closing_price_history_by_asset_ids(asset_ids, start_date)
+        if len(rows) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype="datetime64[D]"), {column: np.array([]) for column in PRICE_MATRIX_COLUMNS}
+        row_asset_ids, row_dates, row_close, row_adj_close = zip(*rows)
+        return (np.array(row_asset_ids, dtype=np.int64), np.array(row_dates, dtype="datetime64[D]"),
+                {"close": np.array(row_close, dtype=np.float64), "adj_close": np.array(row_adj_close, dtype=np.float64)})
+
+    def _write_matrices(self, dates: np.ndarray, asset_ids: np.ndarray, old_dates: np.ndarray, old_asset_ids: np.ndarray,
+                        row_asset_ids: np.ndarray, row_dates: np.ndarray, row_values: dict[str, np.ndarray]) -> None:
+        os.makedirs(self._universe_directory, exist_ok=True)
+        # Locate each row on the date axis (sorted) and on the asset axis (insertion order)
+        asset_order = np.argsort(asset_ids)
+        row_asset_indexes = asset_order[np.searchsorted(asset_ids, row_asset_ids, sorter=asset_order)]
+        row_date_indexes = np.searchsorted(dates, row_dates)
+        for column in PRICE_MATRIX_COLUMNS:
+            path = self._get_path(column)
+            if len(dates) == len(old_dates) and len(asset_ids) == len(old_asset_ids) and os.path.exists(path):
+                # Same shape, update the cached file in place
+                matrix = np.load(path, mmap_mode="r+")
+                matrix[row_date_indexes, row_asset_indexes] = row_values[column]
+                matrix.flush()
+                del matrix
+                continue
+            # New dates or assets, write a bigger matrix next to the old one, then swap it in
+            temporary_path = f"{path}.tmp.npy"
+            matrix = np.lib.format.open_memmap(temporary_path, mode="w+", dtype=np.float64, shape=(len(dates), len(asset_ids)))
+            matrix[:] = np.nan
+            if len(old_dates) > 0:
+                # New dates only come after the cached ones and new assets after the cached ones, so the old matrix is the top-left block
+                matrix[:len(old_dates), :len(old_asset_ids)] = np.load(path, mmap_mode="r")
+            matrix[row_date_indexes, row_asset_indexes] = row_values[column]
+            matrix.flush()
+            del matrix
+            os.replace(temporary_path, path)
+        np.save(self._get_path("dates"), dates)
+        np.save(self._get_path("asset_ids"), asset_ids)
+
+    def rebuild(self) -> None:
+        # Build the whole cache from the database
+        asset_ids = np.array(self._universe_asset_ids if self._universe_asset_ids is not None
+                             else self._database.query_executor.get_asset_ids_with_price_history(), dtype=np.int64)
+        for column in PRICE_MATRIX_COLUMNS:
+            if os.path.exists(self._get_path(column)):
+                os.remove(self._get_path(column))
+        row_asset_ids, row_dates, row_values = self._get_rows([int(asset_id) for asset_id in asset_ids])
+        dates = np.unique(row_dates)
+        self._write_matrices(dates, asset_ids, np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64),
+                             row_asset_ids, row_dates, row_values)
+        logging.info(f"Price matrix cache rebuilt: {len(dates)} dates x {len(asset_ids)} assets.")
+
+    def sync(self) -> None:
+        old_dates, old_asset_ids = self._load_axes()
+        if len(old_dates) == 0:
+            self.rebuild()
+            return None
+
+        universe_asset_ids = self._universe_asset_ids if self._universe_asset_ids is not None \
+            else self._database.query_executor.get_asset_ids_with_price_history()
+        new_asset_ids = np.setdiff1d(np.array(universe_asset_ids, dtype=np.int64), old_asset_ids)
+        last_date = str(old_dates[-1])
+
+        # Cached assets only need their rows from the last cached date onwards, new assets need everything
+        row_asset_ids, row_dates, row_values = self._get_rows([int(asset_id) for asset_id in old_asset_ids], last_date)
+        if len(new_asset_ids) > 0:
+            new_row_asset_ids, new_row_dates, new_row_values = self._get_rows([int(asset_id) for asset_id in new_asset_ids])
+            row_asset_ids = np.concatenate([row_asset_ids, new_row_asset_ids])
+            row_dates = np.concatenate([row_dates, new_row_dates])
+            row_values = {column: np.concatenate([row_values[column], new_row_values[column]]) for column in PRICE_MATRIX_COLUMNS}
+
+        # A new asset trading on a date before the last cached one that isn't on the date axis would have to be inserted mid-axis
+        older_row_dates = row_dates[row_dates <= old_dates[-1]]
+        if not np.isin(older_row_dates, old_dates).all():
+            self.rebuild()
+            return None
+
+        # The rows on the last cached date are read again, a cached asset whose prices changed on it had its stored history re-adjusted
+        readjusted_asset_ids = self._find_readjusted_asset_ids(old_dates, old_asset_ids, row_asset_ids, row_dates, row_values)
+
+        dates = np.concatenate([old_dates, np.unique(row_dates[row_dates > old_dates[-1]])])
+        asset_ids = np.concatenate([old_asset_ids, new_asset_ids])
+        self._write_matrices(dates, asset_ids, old_dates, old_asset_ids, row_asset_ids, row_dates, row_values)
+        if len(readjusted_asset_ids) > 0:
+            self.refresh_assets(readjusted_asset_ids)
+        logging.info(f"Price matrix cache synced: {len(dates) - len(old_dates)} new dates, {len(new_asset_ids)} new assets, "
+                     f"{len(readjusted_asset_ids)} re-adjusted assets.")
+
+    def _find_readjusted_asset_ids(self, old_dates: np.ndarray, old_asset_ids: np.ndarray, row_asset_ids: np.ndarray,
+                                   row_dates: np.ndarray, row_values: dict[str, np.ndarray]) -> list[int]:
+        # A new split or dividend re-adjusts every earlier price, so comparing one overlapping date is enough
+        # Assets without a price on the last cached date can't be compared, they keep their cached prices
+        is_last_date_row = (row_dates == old_dates[-1]) & np.isin(row_asset_ids, old_asset_ids)
+        last_date_asset_ids = row_asset_ids[is_last_date_row]
+        if len(last_date_asset_ids) == 0:
+            return []
+        asset_order = np.argsort(old_asset_ids)
+        asset_indexes = asset_order[np.searchsorted(old_asset_ids, last_date_asset_ids, sorter=asset_order)]
+        is_readjusted = np.zeros(len(last_date_asset_ids), dtype=bool)
+        for column in PRICE_MATRIX_COLUMNS:
+            cached_values = np.load(self._get_path(column), mmap_mode="r")[len(old_dates) - 1, asset_indexes]
+            # An empty cached value was only filled in, it wasn't re-adjusted
+            is_readjusted |= ~np.isnan(cached_values) & ~np.isclose(cached_values, row_values[column][is_last_date_row])
+        return [int(asset_id) for asset_id in last_date_asset_ids[is_readjusted]]
+
+    def refresh_assets(self, asset_ids: list[int]) -> None:
+        # Re-read the whole history of assets whose stored history was re-adjusted (splits, dividends, corrections)
+        old_dates, old_asset_ids = self._load_axes()
+        # Without a cache there is nothing to refresh in place, the whole cache is built
+        if len(old_dates) == 0:
+            self.rebuild()
+            return None
+        row_asset_ids, row_dates, row_values = self._get_rows([asset_id for asset_id in asset_ids if asset_id in old_asset_ids])
+        if not np.isin(row_dates, old_dates).all():
+            self.rebuild()
+            return None
+        self._write_matrices(old_dates, old_asset_ids, old_dates, old_asset_ids, row_asset_ids, row_dates, row_values)
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
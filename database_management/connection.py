@@ -136,6 +136,31 @@ class DatabaseConnection:
         else:
             raise DatabaseConnectionError(self, "Database connection is closed")
 
+    def execute_many_query(self, sql_query: str, params_list: list[tuple]) -> sqlite3.Cursor:
+        """Executes a single parameterized SQL statement once for every set of parameters in the list.
+
+        Args:
+            sql_query (str): The SQL query to be executed.
+            params_list (list[tuple]): The sequence of parameters, one tuple per execution.
+
+        Returns:
+            (sqlite3.Cursor): The cursor used to execute the statement.
+
+        Raises:
+            DatabaseConnectionError: If the database connection is closed.
+            DatabaseQueryExecutionError: If there is an error executing the query.
+        """
+        if self._db_connection is not None:
+            try:
+                cursor = self._db_connection.cursor()
+                result = cursor.executemany(sql_query, params_list)
+                logging.debug(f"Query executed successfully for {len(params_list)} rows: {sql_query}")
+                return result
+            except sqlite3.Error as e:
+                raise DatabaseQueryExecutionError(self, "Error executing SQL query", e)
+        else:
+            raise DatabaseConnectionError(self, "Database connection is closed")
+
     def commit_transaction(self) -> None:
             if self._db_connection is not None:
                 try:
@@ -14,6 +14,7 @@ from database_management.connection import DatabaseConnection, DatabaseConnectio
 from session_management.session_manager import SessionManager
 from database_management.query.query_executor import QueryExecutor
 from database_management.schema.schema import DatabaseSchema
+from database_management.schema.schema_migration import SchemaMigration
 from database_management.backup import BackupManager
 
 # Configure logging
@@ -43,6 +44,8 @@ class Database: # TODO prevent SQL injections in all SQL queries!!!
                 logging.info("Backup file does not exist.")
                 # Create a new backup database file and initialize it
                 self._backup_manager.create_backup()
+            # Add the columns, tables and indexes the existing database file is missing
+            SchemaMigration(self.query_executor, self._db_schema_filename).migrate_database()
         else:
             print("Database file does not exist.")
             logging.info("Database file does not exist.")
@@ -52,6 +55,8 @@ class Database: # TODO prevent SQL injections in all SQL queries!!!
                 logging.info("Backup file exists.")
                 # Restore from the backup file
                 self._backup_manager.restore_from_backup()
+                # The backup can be older than the schema file
+                SchemaMigration(self.query_executor, self._db_schema_filename).migrate_database()
             else:
                 print("Initializing new database file...")
                 logging.info("Initializing new database file...")
@@ -70,7 +70,9 @@ FROM (
     FROM (
         SELECT
             ai.symbol,
-            SUM(at.quantity) AS total_buy_qty,
+            -- Quantities are restated in post-split shares with the first cached split factor after the transaction date
+            SUM(at.quantity * COALESCE((SELECT paf.split_factor FROM price_adjustment_factor AS paf
+                WHERE paf.asset_id = at.asset_id AND paf.date > date(at.transaction_date) ORDER BY paf.date LIMIT 1), 1)) AS total_buy_qty,
             SUM(at.total) AS total_buy_amnt
         FROM
             asset_transaction AS at
@@ -85,7 +87,8 @@ FROM (
         SELECT
             ai.symbol,
             AVG(at.avg_price) AS avg_sell_price,
-            SUM(at.quantity) AS total_sell_qty,
+            SUM(at.quantity * COALESCE((SELECT paf.split_factor FROM price_adjustment_factor AS paf
+                WHERE paf.asset_id = at.asset_id AND paf.date > date(at.transaction_date) ORDER BY paf.date LIMIT 1), 1)) AS total_sell_qty,
             SUM(at.total) AS total_sell_amnt
         FROM
             asset_transaction AS at
@@ -136,7 +139,9 @@ FROM
     LEFT JOIN (
         SELECT
             at.asset_id,
-            SUM(at.quantity) AS total_buy_qty,
+            -- Quantities are restated in post-split shares with the first cached split factor after the transaction date
+            SUM(at.quantity * COALESCE((SELECT paf.split_factor FROM price_adjustment_factor AS paf
+                WHERE paf.asset_id = at.asset_id AND paf.date > date(at.transaction_date) ORDER BY paf.date LIMIT 1), 1)) AS total_buy_qty,
             SUM(at.total) AS total_buy_amnt
         FROM
             asset_transaction at
@@ -151,7 +156,8 @@ FROM
         SELECT
             at.asset_id,
             AVG(at.avg_price) AS avg_sell_price,
-            SUM(at.quantity) AS total_sell_qty,
+            SUM(at.quantity * COALESCE((SELECT paf.split_factor FROM price_adjustment_factor AS paf
+                WHERE paf.asset_id = at.asset_id AND paf.date > date(at.transaction_date) ORDER BY paf.date LIMIT 1), 1)) AS total_sell_qty,
             SUM(at.total) AS total_sell_amnt
         FROM
             asset_transaction at
@@ -175,3 +181,39 @@ FROM
             AND tt.name = 'dividend'
         GROUP BY at.asset_id
     ) AS div ON ai.id = div.asset_id;
+
+
+-- market_value_of_current_holdings: Select the current holdings valued at their latest stored quotes
+SELECT
+    ai.symbol,
+    holdings.net_qty,
+    ROUND(holdings.net_cost, 2) AS net_cost,
+    lq.price,
+    ROUND(holdings.net_qty * lq.price, 2) AS market_value,
+    ROUND(holdings.net_qty * lq.price - holdings.net_cost, 2) AS unrealized_gain,
+    ROUND((lq.price - lq.previous_close) * holdings.net_qty, 2) AS day_change,
+    lq.quote_date
+FROM (
+    SELECT
+        at.asset_id,
+        SUM(CASE
+            WHEN tt.name LIKE '%buy%' THEN 1
+            WHEN tt.name LIKE '%sell%' THEN -1
+            ELSE 0
+        END * at.quantity * COALESCE((SELECT paf.split_factor FROM price_adjustment_factor AS paf
+            WHERE paf.asset_id = at.asset_id AND paf.date > date(at.transaction_date) ORDER BY paf.date LIMIT 1), 1)) AS net_qty,
+        SUM(CASE
+            WHEN tt.name LIKE '%buy%' THEN at.total
+            WHEN tt.name LIKE '%sell%' THEN -at.total
+            ELSE 0
+        END) AS net_cost
+    FROM
+        asset_transaction AS at
+    JOIN transaction_type AS tt ON at.transaction_type_id = tt.id
+    GROUP BY
+        at.asset_id
+) AS holdings
+JOIN asset_info AS ai ON holdings.asset_id = ai.id
+LEFT JOIN latest_quote AS lq ON holdings.asset_id = lq.asset_id
+WHERE
+    holdings.net_qty > 0;
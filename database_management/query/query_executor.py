@@ -7,16 +7,25 @@ import sqlite3
 import pandas as pd
 
 # Local Modules
-from account_management.accounts import UserAccount, EmailAccount
+from account_management.accounts import UserAccount, EmailAccount, EmailFolderSyncState
 from database_management.connection import DatabaseConnection, DatabaseConnectionError
-from database_management.schema.asset_dataclass import AssetTransaction
+from database_management.schema.asset_dataclass import AssetTransactionBatch
 from session_management.session_manager import SessionManager
-from database_management.schema.asset_dataclass import AssetInfoWithIDs
+from database_management.schema.asset_dataclass import AssetInfoWithIDs, AssetInfoWithIDsBatch
 
 # Configure logging
 import logging
 
 
+# Global variables
+# SQLite expressions for the first day of the week (Monday), month and year containing a date, keyed by rollup granularity
+PRICE_ROLLUP_PERIOD_START_EXPRESSIONS: dict[str, str] = {
+    "week": "date({date}, '-' || ((CAST(strftime('%w', {date}) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "strftime('%Y-%m-01', {date})",
+    "year": "strftime('%Y-01-01', {date})"
+}
+
+
 # QueryExecutor class for executing SQL statements
 class QueryExecutor:
     def __init__(self, db_connection: DatabaseConnection, session_manager: SessionManager):
@@ -74,6 +83,24 @@ class QueryExecutor:
         else:
             logging.error("Dataframe is None.")
 
+    def upsert_dataframes_into_sql_tables(self, upserts: list[tuple[pd.DataFrame, str, list[str]]]) -> list[int]:
+        # Build one INSERT ... ON CONFLICT DO UPDATE statement per (dataframe, table_name, conflict_columns)
+        statements = []
+        for dataframe, table_name, conflict_columns in upserts:
+            columns = list(dataframe.columns)
+            update_columns = [column for column in columns if column not in conflict_columns]
+            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) " \
+                f"ON CONFLICT ({', '.join(conflict_columns)}) DO "
+            query += f"UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in update_columns)}" if update_columns else "NOTHING"
+            # Convert to object first so numpy scalars are passed to sqlite3 as Python ints and floats
+            params_list = list(dataframe.astype(object).itertuples(index=False, name=None))
+            statements.append((query, params_list))
+        # Execute the queries, all tables are written in a single transaction
+        rowcounts = self.execute_transaction(statements)
+        for (dataframe, table_name, conflict_columns), rowcount in zip(upserts, rowcounts):
+            logging.info(f"{rowcount} rows upserted into the '{table_name}' table.")
+        return rowcounts
+
     def execute_query(self, query: str, params: tuple | None=None) -> list[tuple] | None:
         with self._db_connection as connection:
             connection.begin_transaction()
@@ -82,6 +109,35 @@ class QueryExecutor:
             connection.commit_transaction()
             return result
 
+    def execute_transaction(self, statements: list[tuple[str, list[tuple]]]) -> list[int]:
+        """Executes several parameterized statements atomically, in a single transaction and a single commit.
+
+        Args:
+            statements (list[tuple[str, list[tuple]]]): Pairs of (SQL query, list of parameter tuples). Each query
+                is executed once per parameter tuple using executemany.
+
+        Returns:
+            (list[int]): The number of rows modified by each statement, in the same order as the statements.
+
+        Raises:
+            DatabaseConnectionError: If the database connection is closed.
+            DatabaseQueryExecutionError: If any statement fails, in which case the whole transaction is rolled back.
+        """
+        with self._db_connection as connection:
+            connection.begin_transaction()
+            rowcounts = []
+            try:
+                for query, params_list in statements:
+                    if len(params_list) > 0:
+                        rowcounts.append(connection.execute_many_query(query, params_list).rowcount)
+                    else:
+                        rowcounts.append(0)
+            except Exception:
+                connection.rollback_transaction()
+                raise
+            connection.commit_transaction()
+            return rowcounts
+
     def __find_complex_query_by_title(self, queries: str, query_title: str) -> str | None:
         individual_queries = queries.split(";")
         for i, query in enumerate(individual_queries):
@@ -418,6 +474,19 @@ class QueryExecutor:
 
 
 
+    #####################
+    # SCHEMA MIGRATIONS #
+    #####################
+
+    def get_table_column_names(self, table_name: str) -> list[str]:
+        # Define the query parameters
+        query_type = "PRAGMA"
+        get_table_column_names_query = f"{query_type} table_info({table_name})"
+        # Execute the query, a table that doesn't exist has no columns
+        result = self.execute_query(get_table_column_names_query)
+        return [row[1] for row in result] if result is not None else []
+
+
     ###########################
     # USER ACCOUNT OPERATIONS #
     ###########################
@@ -929,8 +998,521 @@ class QueryExecutor:
         print(f"{asset_info_with_ids.symbol} successfully inserted into database for exchange_id {asset_info_with_ids.exchange_id}.")
         logging.info(f"{asset_info_with_ids.symbol} successfully inserted into database for exchange_id {asset_info_with_ids.exchange_id}.")
 
+    def insert_asset_info_with_ids_batch(self, asset_info_with_ids_batch: AssetInfoWithIDsBatch, update_existing: bool=False) -> int:
+        # Define the query parameters
+        query_type = "INSERT"
+        insert_asset_info_query = f"{query_type} INTO asset_info (asset_class_id, asset_subclass_id, " \
+            f"sector_id, industry_id, country_id, city_id, financial_currency_id, exchange_currency_id, " \
+            f"exchange_id, symbol, security_name, business_summary, website, logo_url) " \
+            f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (exchange_id, symbol) DO "
+        # Existing rows are left alone unless they're being updated (e.g. a renamed security)
+        if update_existing:
+            insert_asset_info_query += "UPDATE SET asset_class_id = excluded.asset_class_id, asset_subclass_id = excluded.asset_subclass_id, " \
+                "sector_id = excluded.sector_id, industry_id = excluded.industry_id, country_id = excluded.country_id, city_id = excluded.city_id, " \
+                "financial_currency_id = excluded.financial_currency_id, exchange_currency_id = excluded.exchange_currency_id, " \
+                "security_name = excluded.security_name, business_summary = excluded.business_summary, website = excluded.website, " \
+                "logo_url = excluded.logo_url, delisted_date = NULL"
+        else:
+            insert_asset_info_query += "NOTHING"
+        # The batch's fields are in the same order as the inserted columns
+        params_list = asset_info_with_ids_batch.to_params()
+        # Execute the query, the whole batch is written in a single transaction
+        rowcount = self.execute_transaction([(insert_asset_info_query, params_list)])[0]
+        logging.info(f"{rowcount} rows {'upserted' if update_existing else 'inserted'} into the asset_info table.")
+        return rowcount
+
+    def get_asset_listings_by_exchange_id(self, exchange_id: int) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_asset_listings_query = f"{query_type} symbol, security_name, delisted_date FROM asset_info WHERE exchange_id = ?"
+        params = (exchange_id,)
+        # Execute the query
+        result = self.execute_query(get_asset_listings_query, params)
+        return result if result is not None else []
+
+    def get_asset_info_init_journal_rows(self, exchange_id: int, statuses: list[str]) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_journal_rows_query = f"{query_type} asset_class_name, asset_subclass_name, exchange_currency_id, exchange_id, symbol, security_name " \
+            f"FROM asset_info_init_journal WHERE exchange_id = ? AND status IN ({', '.join('?' * len(statuses))}) ORDER BY id"
+        params = (exchange_id, *statuses)
+        # Execute the query
+        result = self.execute_query(get_journal_rows_query, params)
+        return result if result is not None else []
+
+    def update_asset_info_init_journal(self, exchange_id: int, journal_entries: list[tuple[str, str, str | None, bool]]) -> None:
+        # Define the query parameters
+        query_type = "UPDATE"
+        # Each entry is (symbol, status, error, new_attempt), entries are applied in order so a symbol's last entry wins
+        update_journal_query = f"{query_type} asset_info_init_journal SET status = ?, last_error = ?, " \
+            f"attempts = attempts + ?, updated_at = CURRENT_TIMESTAMP WHERE exchange_id = ? AND symbol = ?"
+        params_list = [(status, error, int(new_attempt), exchange_id, symbol) for symbol, status, error, new_attempt in journal_entries]
+        # Execute the query
+        self.execute_transaction([(update_journal_query, params_list)])
+
+    def get_asset_info_init_journal_status_counts(self, exchange_id: int) -> dict[str, int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_journal_status_counts_query = f"{query_type} status, COUNT(*) FROM asset_info_init_journal WHERE exchange_id = ? GROUP BY status"
+        params = (exchange_id,)
+        # Execute the query
+        result = self.execute_query(get_journal_status_counts_query, params)
+        return {row[0]: row[1] for row in result} if result is not None else {}
+
+    def get_exchange_acronyms_with_failed_asset_info_init(self) -> list[str]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_exchange_acronyms_query = f"{query_type} DISTINCT exchange.acronym FROM asset_info_init_journal " \
+            f"JOIN exchange ON exchange.id = asset_info_init_journal.exchange_id WHERE asset_info_init_journal.status = 'failed' ORDER BY exchange.acronym"
+        # Execute the query
+        result = self.execute_query(get_exchange_acronyms_query)
+        return [row[0] for row in result] if result is not None else []
+
+    def update_asset_info_delisted_dates(self, exchange_id: int, symbols: list[str], delisted_date: str | None) -> int:
+        # Define the query parameters
+        query_type = "UPDATE"
+        # A NULL delisted_date marks the symbol as listed again
+        update_delisted_dates_query = f"{query_type} asset_info SET delisted_date = ? WHERE exchange_id = ? AND symbol = ?"
+        params_list = [(delisted_date, exchange_id, symbol) for symbol in symbols]
+        # Execute the query
+        return self.execute_transaction([(update_delisted_dates_query, params_list)])[0]
+
+    def get_yfinance_info_cache_entries(self, yfinance_symbol: str) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_cache_entries_query = f"{query_type} field_group, payload, fetched_at FROM yfinance_info_cache WHERE yfinance_symbol = ?"
+        params = (yfinance_symbol,)
+        # Execute the query
+        result = self.execute_query(get_cache_entries_query, params)
+        return result if result is not None else []
+
+    def get_stale_yfinance_info_symbols(self, cutoffs: dict[str, str], limit: int | None=None) -> list[str]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # A symbol is stale if any of its field groups was fetched before that group's cutoff
+        get_stale_symbols_query = f"{query_type} DISTINCT yfinance_symbol FROM yfinance_info_cache WHERE " \
+            f"{' OR '.join('(field_group = ? AND fetched_at < ?)' for _ in cutoffs)} ORDER BY yfinance_symbol"
+        params = tuple(value for field_group, cutoff in cutoffs.items() for value in (field_group, cutoff))
+        if limit is not None:
+            get_stale_symbols_query += " LIMIT ?"
+            params += (limit,)
+        # Execute the query
+        result = self.execute_query(get_stale_symbols_query, params)
+        return [row[0] for row in result] if result is not None else []
+
+    def delete_yfinance_info_cache_entries(self, yfinance_symbols: list[str]) -> int:
+        # Define the query parameters
+        delete_cache_entries_query = "DELETE FROM yfinance_info_cache WHERE yfinance_symbol = ?"
+        params_list = [(yfinance_symbol,) for yfinance_symbol in yfinance_symbols]
+        # Execute the query
+        return self.execute_transaction([(delete_cache_entries_query, params_list)])[0]
+
+
+
+
+    ##################
+    # INDEX HOLDINGS #
+    ##################
+
+    def get_index_info_rows(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_index_info_rows_query = f"{query_type} index_info.id, index_info.name, index_info.symbol, index_info.website_url, " \
+            f"index_info.table_index, index_info.symbol_column, exchange.country_id FROM index_info " \
+            f"JOIN exchange ON exchange.id = index_info.exchange_id ORDER BY index_info.id"
+        # Execute the query
+        result = self.execute_query(get_index_info_rows_query)
+        return result if result is not None else []
+
+    def get_asset_ids_and_symbols_by_country_id(self, country_id: int) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Listed assets come first so they win over delisted assets with the same symbol
+        get_asset_ids_and_symbols_query = f"{query_type} asset_info.id, asset_info.symbol FROM asset_info " \
+            f"JOIN exchange ON exchange.id = asset_info.exchange_id WHERE exchange.country_id = ? " \
+            f"ORDER BY asset_info.delisted_date IS NOT NULL, asset_info.id"
+        params = (country_id,)
+        # Execute the query
+        result = self.execute_query(get_asset_ids_and_symbols_query, params)
+        return result if result is not None else []
+
+    def get_index_holdings_asset_ids(self, index_id: int) -> list[int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_index_holdings_asset_ids_query = f"{query_type} asset_id FROM index_holdings WHERE index_id = ?"
+        params = (index_id,)
+        # Execute the query
+        result = self.execute_query(get_index_holdings_asset_ids_query, params)
+        return [row[0] for row in result] if result is not None else []
+
+    def set_missing_index_holdings_added_dates(self, added_date: str) -> None:
+        # Define the query parameters
+        query_type = "UPDATE"
+        set_missing_index_holdings_added_dates_query = f"{query_type} index_holdings SET added_date = ? WHERE added_date IS NULL"
+        params = (added_date,)
+        # Execute the query
+        self.execute_query(set_missing_index_holdings_added_dates_query, params)
+
+    def update_index_holdings(self, index_id: int, added_asset_ids: list[int], removed_asset_ids: list[int], change_date: str) -> None:
+        # Define the query parameters
+        query_type = "INSERT"
+        insert_index_holdings_query = f"{query_type} INTO index_holdings (index_id, asset_id, added_date) VALUES (?, ?, ?) " \
+            f"ON CONFLICT (index_id, asset_id) DO NOTHING"
+        delete_index_holdings_query = "DELETE FROM index_holdings WHERE index_id = ? AND asset_id = ?"
+        insert_index_holdings_change_query = f"{query_type} INTO index_holdings_change (index_id, asset_id, change, change_date) VALUES (?, ?, ?, ?)"
+        # Execute the queries, the holdings and their change history are written in a single transaction
+        self.execute_transaction([
+            (insert_index_holdings_query, [(index_id, asset_id, change_date) for asset_id in added_asset_ids]),
+            (delete_index_holdings_query, [(index_id, asset_id) for asset_id in removed_asset_ids]),
+            (insert_index_holdings_change_query, [(index_id, asset_id, "added", change_date) for asset_id in added_asset_ids]
+                + [(index_id, asset_id, "removed", change_date) for asset_id in removed_asset_ids])
+        ])
+
+    def get_index_holdings_summary(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_index_holdings_summary_query = f"{query_type} index_info.name, index_info.symbol, " \
+            f"(SELECT COUNT(*) FROM index_holdings WHERE index_holdings.index_id = index_info.id), " \
+            f"(SELECT MAX(change_date) FROM index_holdings_change WHERE index_holdings_change.index_id = index_info.id) " \
+            f"FROM index_info ORDER BY index_info.id"
+        # Execute the query
+        result = self.execute_query(get_index_holdings_summary_query)
+        return result if result is not None else []
+
+
+    #################
+    # PRICE HISTORY #
+    #################
+
+    def get_asset_ids_and_symbols_by_exchange_acronym(self, exchange_acronym: str | None=None) -> list[tuple] | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_asset_ids_and_symbols_query = f"{query_type} asset_info.id, exchange.acronym, asset_info.symbol FROM asset_info " \
+            f"JOIN exchange ON exchange.id = asset_info.exchange_id"
+        params = None
+        # Only get the assets of the given exchange, all assets otherwise
+        if exchange_acronym is not None:
+            get_asset_ids_and_symbols_query += " WHERE exchange.acronym = ?"
+            params = (exchange_acronym,)
+        # Execute the query
+        return self.execute_query(get_asset_ids_and_symbols_query, params)
+
+    def get_last_price_history_dates_by_exchange_acronym(self, exchange_acronym: str | None=None) -> list[tuple] | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Only assets with stored price history, the ones without any are downloaded by the price history backfill queue
+        get_last_price_history_dates_query = f"{query_type} asset_info.id, exchange.acronym, asset_info.symbol, MAX(asset_price_history.date) " \
+            f"FROM asset_info JOIN exchange ON exchange.id = asset_info.exchange_id " \
+            f"JOIN asset_price_history ON asset_price_history.asset_id = asset_info.id"
+        params = None
+        # Only get the assets of the given exchange, all assets otherwise
+        if exchange_acronym is not None:
+            get_last_price_history_dates_query += " WHERE exchange.acronym = ?"
+            params = (exchange_acronym,)
+        get_last_price_history_dates_query += " GROUP BY asset_info.id"
+        # Execute the query
+        return self.execute_query(get_last_price_history_dates_query, params)
+
+    def get_last_index_price_history_dates(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Indexes without any price history get a NULL last date
+        get_last_index_price_history_dates_query = f"{query_type} index_info.id, index_info.symbol, MAX(index_price_history.date) " \
+            f"FROM index_info LEFT JOIN index_price_history ON index_price_history.index_id = index_info.id GROUP BY index_info.id"
+        # Execute the query
+        result = self.execute_query(get_last_index_price_history_dates_query)
+        return result if result is not None else []
+
+    def get_closing_prices_by_asset_ids_and_date(self, asset_ids: list[int], date: str) -> dict[int, tuple[float, float]]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_closing_prices_query = f"{query_type} asset_id, close, adj_close FROM asset_price_history " \
+            f"WHERE date = ? AND asset_id IN ({', '.join('?' * len(asset_ids))})"
+        params = (date, *asset_ids)
+        # Execute the query
+        result = self.execute_query(get_closing_prices_query, params)
+        # Map each asset_id to its (close, adj_close)
+        return {row[0]: (row[1], row[2]) for row in result} if result is not None else {}
+
+    def get_asset_ids_with_price_history(self) -> list[int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_asset_ids_with_price_history_query = f"{query_type} DISTINCT asset_id FROM asset_price_history ORDER BY asset_id"
+        # Execute the query
+        result = self.execute_query(get_asset_ids_with_price_history_query)
+        return [row[0] for row in result] if result is not None else []
+
+    def get_closing_price_history_by_asset_ids(self, asset_ids: list[int], start_date: str | None=None) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        rows = []
+        # Query the assets in chunks to stay under SQLite's limit on the number of parameters
+        for i in range(0, len(asset_ids), 900):
+            asset_ids_chunk = asset_ids[i:i + 900]
+            get_closing_price_history_query = f"{query_type} asset_id, date, close, adj_close FROM asset_price_history " \
+                f"WHERE asset_id IN ({', '.join('?' * len(asset_ids_chunk))})"
+            params = tuple(asset_ids_chunk)
+            # Only get the dates from the start date onwards, if given
+            if start_date is not None:
+                get_closing_price_history_query += " AND date >= ?"
+                params += (start_date,)
+            # Execute the query
+            result = self.execute_query(get_closing_price_history_query, params)
+            if result is not None:
+                rows += result
+        return rows
+
+    def refresh_price_history_rollups(self, source: str, start_dates: dict[int, str] | None=None) -> list[int]:
+        # source is "asset" or "index", start_dates maps asset/index ids to their earliest new or changed date (None rebuilds everything)
+        history_table_name = f"{source}_price_history"
+        rollup_table_name = f"{source}_price_rollup"
+        id_column = f"{source}_id"
+        # Define the query parameters
+        query_type = "INSERT"
+        if start_dates is None:
+            changed_query = f"SELECT {id_column}, MIN(date) FROM {history_table_name} GROUP BY {id_column}"
+            params_list = [()]
+        else:
+            changed_query = "SELECT ?, ?"
+            params_list = list(start_dates.items())
+        statements = []
+        for granularity, period_start_expression in PRICE_ROLLUP_PERIOD_START_EXPRESSIONS.items():
+            # Re-aggregate every period from the one containing the start date onwards, open and close come from the period's first and last bars
+            refresh_rollup_query = f"WITH changed (source_id, start_date) AS ({changed_query}), " \
+                f"bars AS (SELECT history.{id_column} AS source_id, {period_start_expression.format(date='history.date')} AS period_start, " \
+                f"history.date, history.high, history.low, history.volume FROM {history_table_name} AS history " \
+                f"JOIN changed ON history.{id_column} = changed.source_id " \
+                f"WHERE history.date >= {period_start_expression.format(date='changed.start_date')}), " \
+                f"periods AS (SELECT source_id, period_start, MIN(date) AS first_date, MAX(date) AS last_date, MAX(high) AS high, " \
+                f"MIN(low) AS low, SUM(volume) AS volume, COUNT(*) AS bar_count FROM bars GROUP BY source_id, period_start) " \
+                f"{query_type} INTO {rollup_table_name} ({id_column}, granularity, period_start, last_date, open, high, low, close, adj_close, volume, bar_count) " \
+                f"SELECT periods.source_id, '{granularity}', periods.period_start, periods.last_date, first_bar.open, periods.high, periods.low, " \
+                f"last_bar.close, last_bar.adj_close, periods.volume, periods.bar_count FROM periods " \
+                f"JOIN {history_table_name} AS first_bar ON first_bar.{id_column} = periods.source_id AND first_bar.date = periods.first_date " \
+                f"JOIN {history_table_name} AS last_bar ON last_bar.{id_column} = periods.source_id AND last_bar.date = periods.last_date " \
+                f"WHERE true ON CONFLICT ({id_column}, granularity, period_start) DO UPDATE SET last_date = excluded.last_date, " \
+                f"open = excluded.open, high = excluded.high, low = excluded.low, close = excluded.close, adj_close = excluded.adj_close, " \
+                f"volume = excluded.volume, bar_count = excluded.bar_count"
+            statements.append((refresh_rollup_query, params_list))
+        # Execute the queries, all granularities are refreshed in a single transaction
+        return self.execute_transaction(statements)
+
+    def get_price_history_bars(self, source: str, source_id: int, granularity: str, start_date: str, end_date: str) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        if granularity == "day":
+            get_price_history_bars_query = f"{query_type} date, open, high, low, close, adj_close, volume FROM {source}_price_history " \
+                f"WHERE {source}_id = ? AND date >= ? AND date <= ? ORDER BY date"
+            params = (source_id, start_date, end_date)
+        else:
+            # Rollup bars are dated by the start of their period, so include the period the start date falls in
+            get_price_history_bars_query = f"{query_type} period_start, open, high, low, close, adj_close, volume FROM {source}_price_rollup " \
+                f"WHERE {source}_id = ? AND granularity = ? AND last_date >= ? AND period_start <= ? ORDER BY period_start"
+            params = (source_id, granularity, start_date, end_date)
+        # Execute the query
+        result = self.execute_query(get_price_history_bars_query, params)
+        return result if result is not None else []
+
+    def get_current_user_held_asset_ids_and_symbols(self) -> list[tuple] | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        current_user_id = self._session_manager.get_current_user_id()
+        # Assets the current user bought more of than they sold
+        get_held_assets_query = f"{query_type} asset_info.id, exchange.acronym, asset_info.symbol FROM asset_transaction " \
+            f"JOIN asset_info ON asset_info.id = asset_transaction.asset_id " \
+            f"JOIN exchange ON exchange.id = asset_info.exchange_id " \
+            f"JOIN transaction_type ON transaction_type.id = asset_transaction.transaction_type_id " \
+            f"WHERE asset_transaction.user_id = ? GROUP BY asset_info.id " \
+            f"HAVING SUM(CASE WHEN transaction_type.name LIKE '%buy%' THEN asset_transaction.quantity " \
+            f"WHEN transaction_type.name LIKE '%sell%' THEN -asset_transaction.quantity ELSE 0 END) > 0"
+        params = (current_user_id,)
+        # Execute the query
+        return self.execute_query(get_held_assets_query, params)
+
+    def get_latest_quotes_by_asset_ids(self, asset_ids: list[int]) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_latest_quotes_query = f"{query_type} asset_id, price, previous_close, quote_date, updated_at FROM latest_quote " \
+            f"WHERE asset_id IN ({{asset_id_placeholders}})"
+        # Execute the query
+        return self.__execute_query_by_asset_id_chunks(get_latest_quotes_query, asset_ids)
+
+    def downsample_intraday_prices(self, cutoff_timestamp: int) -> tuple[dict[int, str], int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Earliest UTC date downsampled per asset, used to refresh the rollups afterwards
+        get_downsampled_start_dates_query = f"{query_type} asset_id, date(MIN(timestamp), 'unixepoch') FROM asset_intraday_price " \
+            f"WHERE timestamp < ? GROUP BY asset_id"
+        result = self.execute_query(get_downsampled_start_dates_query, (cutoff_timestamp,))
+        start_dates = {row[0]: row[1] for row in result} if result is not None else {}
+        # Each day is built from its finest interval only, so 1 and 5 minute bars of the same day aren't counted twice
+        # Days already in asset_price_history are kept as they are, the daily download is the better source
+        insert_daily_bars_query = "WITH day_intervals AS (SELECT asset_id, date(timestamp, 'unixepoch') AS day, MIN(interval_minutes) AS interval_minutes " \
+            "FROM asset_intraday_price WHERE timestamp < ? GROUP BY asset_id, day), " \
+            "days AS (SELECT bars.asset_id, bars.interval_minutes, day_intervals.day, MIN(bars.timestamp) AS first_timestamp, " \
+            "MAX(bars.timestamp) AS last_timestamp, MAX(bars.high) AS high, MIN(bars.low) AS low, SUM(bars.volume) AS volume " \
+            "FROM asset_intraday_price AS bars JOIN day_intervals ON bars.asset_id = day_intervals.asset_id " \
+            "AND bars.interval_minutes = day_intervals.interval_minutes AND date(bars.timestamp, 'unixepoch') = day_intervals.day " \
+            "WHERE bars.timestamp < ? GROUP BY bars.asset_id, day_intervals.day) " \
+            "INSERT INTO asset_price_history (asset_id, date, open, high, low, close, adj_close, volume) " \
+            "SELECT days.asset_id, days.day, first_bar.open, days.high, days.low, last_bar.close, last_bar.close, days.volume FROM days " \
+            "JOIN asset_intraday_price AS first_bar ON first_bar.asset_id = days.asset_id " \
+            "AND first_bar.interval_minutes = days.interval_minutes AND first_bar.timestamp = days.first_timestamp " \
+            "JOIN asset_intraday_price AS last_bar ON last_bar.asset_id = days.asset_id " \
+            "AND last_bar.interval_minutes = days.interval_minutes AND last_bar.timestamp = days.last_timestamp " \
+            "WHERE true ON CONFLICT (asset_id, date) DO NOTHING"
+        delete_intraday_prices_query = "DELETE FROM asset_intraday_price WHERE timestamp < ?"
+        # Execute the queries, the daily bars are written and the intraday rows purged in a single transaction
+        rowcounts = self.execute_transaction([
+            (insert_daily_bars_query, [(cutoff_timestamp, cutoff_timestamp)]),
+            (delete_intraday_prices_query, [(cutoff_timestamp,)])
+        ])
+        return start_dates, rowcounts[1]
+
+    def enqueue_price_history_backfill(self) -> None:
+        # Define the query parameters
+        query_type = "INSERT"
+        # Held assets first, then index constituents, then everything else, finished assets are never queued again
+        enqueue_price_history_backfill_query = f"{query_type} INTO price_history_backfill_queue (asset_id, priority) " \
+            f"SELECT asset_info.id, CASE " \
+            f"WHEN asset_info.id IN (SELECT asset_id FROM asset_transaction) THEN 0 " \
+            f"WHEN asset_info.id IN (SELECT asset_id FROM index_holdings) THEN 1 " \
+            f"ELSE 2 END FROM asset_info WHERE true " \
+            f"ON CONFLICT (asset_id) DO UPDATE SET priority = excluded.priority WHERE price_history_backfill_queue.status != 'done'"
+        # Execute the query
+        self.execute_query(enqueue_price_history_backfill_query)
+
+    def reset_in_progress_price_history_backfill(self) -> None:
+        # Define the query parameters
+        query_type = "UPDATE"
+        # Assets claimed by a run that didn't finish are picked up again
+        reset_in_progress_query = f"{query_type} price_history_backfill_queue SET status = 'pending', updated_at = CURRENT_TIMESTAMP " \
+            f"WHERE status = 'in_progress'"
+        # Execute the query
+        self.execute_query(reset_in_progress_query)
+
+    def claim_price_history_backfill_batch(self, batch_size: int) -> list[tuple]:
+        # Define the first query parameters
+        query_type = "SELECT"
+        get_pending_backfill_query = f"{query_type} asset_info.id, exchange.acronym, asset_info.symbol FROM price_history_backfill_queue " \
+            f"JOIN asset_info ON asset_info.id = price_history_backfill_queue.asset_id JOIN exchange ON exchange.id = asset_info.exchange_id " \
+            f"WHERE price_history_backfill_queue.status = 'pending' ORDER BY price_history_backfill_queue.priority, price_history_backfill_queue.id LIMIT ?"
+        # Execute the query
+        result = self.execute_query(get_pending_backfill_query, (batch_size,))
+        if result is None or len(result) == 0:
+            return []
+        # Define the second query parameters
+        query_type = "UPDATE"
+        claim_backfill_query = f"{query_type} price_history_backfill_queue SET status = 'in_progress', attempts = attempts + 1, " \
+            f"updated_at = CURRENT_TIMESTAMP WHERE asset_id = ?"
+        # Execute the query
+        self.execute_transaction([(claim_backfill_query, [(row[0],) for row in result])])
+        return result
+
+    def finish_price_history_backfill(self, asset_ids: list[int], error: str | None=None, max_attempts: int=3) -> None:
+        # Define the query parameters
+        query_type = "UPDATE"
+        if error is None:
+            finish_backfill_query = f"{query_type} price_history_backfill_queue SET status = 'done', last_error = NULL, " \
+                f"updated_at = CURRENT_TIMESTAMP WHERE asset_id = ?"
+            params_list = [(asset_id,) for asset_id in asset_ids]
+        else:
+            # Failed assets are retried on a later claim until they run out of attempts
+            finish_backfill_query = f"{query_type} price_history_backfill_queue SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, " \
+                f"last_error = ?, updated_at = CURRENT_TIMESTAMP WHERE asset_id = ?"
+            params_list = [(max_attempts, error, asset_id) for asset_id in asset_ids]
+        # Execute the query
+        self.execute_transaction([(finish_backfill_query, params_list)])
+
+    def get_price_history_backfill_status_counts(self) -> dict[str, int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_backfill_status_counts_query = f"{query_type} status, COUNT(*) FROM price_history_backfill_queue GROUP BY status"
+        # Execute the query
+        result = self.execute_query(get_backfill_status_counts_query)
+        return {row[0]: row[1] for row in result} if result is not None else {}
 
+    ######################
+    # ADJUSTMENT FACTORS #
+    ######################
+
+    def __execute_query_by_asset_id_chunks(self, query: str, asset_ids: list[int], params: tuple=()) -> list[tuple]:
+        # The query has an "{asset_id_placeholders}" field, it's run per chunk to stay under SQLite's limit on the number of parameters
+        rows = []
+        for i in range(0, len(asset_ids), 900):
+            asset_ids_chunk = asset_ids[i:i + 900]
+            result = self.execute_query(query.format(asset_id_placeholders=", ".join("?" * len(asset_ids_chunk))), (*asset_ids_chunk, *params))
+            if result is not None:
+                rows += result
+        return rows
+
+    def get_stale_price_adjustment_factor_asset_ids(self) -> list[int]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Assets with corporate actions whose factors were never computed or were invalidated since
+        get_stale_asset_ids_query = f"{query_type} asset_id FROM split_history UNION {query_type} asset_id FROM dividend_history " \
+            f"EXCEPT {query_type} asset_id FROM price_adjustment_factor_status"
+        # Execute the query
+        result = self.execute_query(get_stale_asset_ids_query)
+        return [row[0] for row in result] if result is not None else []
+
+    def get_split_history_by_asset_ids(self, asset_ids: list[int]) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_split_history_query = f"{query_type} asset_id, date, stock_split FROM split_history WHERE asset_id IN ({{asset_id_placeholders}})"
+        # Execute the query
+        return self.__execute_query_by_asset_id_chunks(get_split_history_query, asset_ids)
+
+    def get_dividend_history_with_previous_close_by_asset_ids(self, asset_ids: list[int]) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # The previous close is the last close before the ex-dividend date, NULL if the price history doesn't go back that far
+        get_dividend_history_query = f"{query_type} dividend_history.asset_id, dividend_history.date, dividend_history.dividend, " \
+            f"(SELECT close FROM asset_price_history WHERE asset_price_history.asset_id = dividend_history.asset_id " \
+            f"AND asset_price_history.date < dividend_history.date ORDER BY asset_price_history.date DESC LIMIT 1) " \
+            f"FROM dividend_history WHERE dividend_history.asset_id IN ({{asset_id_placeholders}})"
+        # Execute the query
+        return self.__execute_query_by_asset_id_chunks(get_dividend_history_query, asset_ids)
+
+    def get_price_adjustment_factors_by_asset_ids(self, asset_ids: list[int]) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_adjustment_factors_query = f"{query_type} asset_id, date, split_factor, dividend_factor FROM price_adjustment_factor " \
+            f"WHERE asset_id IN ({{asset_id_placeholders}})"
+        # Execute the query
+        return self.__execute_query_by_asset_id_chunks(get_adjustment_factors_query, asset_ids)
+
+    def replace_price_adjustment_factors(self, asset_ids: list[int], adjustment_factors: list[tuple]) -> None:
+        # Define the query parameters
+        delete_adjustment_factors_query = "DELETE FROM price_adjustment_factor WHERE asset_id = ?"
+        insert_adjustment_factors_query = "INSERT INTO price_adjustment_factor (asset_id, date, split_factor, dividend_factor) VALUES (?, ?, ?, ?)"
+        mark_computed_query = "INSERT INTO price_adjustment_factor_status (asset_id) VALUES (?) " \
+            "ON CONFLICT (asset_id) DO UPDATE SET computed_at = CURRENT_TIMESTAMP"
+        asset_id_params = [(asset_id,) for asset_id in asset_ids]
+        # Execute the queries, the old factors are replaced and the assets marked up to date in a single transaction
+        self.execute_transaction([
+            (delete_adjustment_factors_query, asset_id_params),
+            (insert_adjustment_factors_query, adjustment_factors),
+            (mark_computed_query, asset_id_params)
+        ])
+
+    def invalidate_price_adjustment_factors(self, asset_ids: list[int]) -> None:
+        # Define the query parameters
+        query_type = "DELETE"
+        # The cached factors stay usable until they're recomputed, only the status is removed
+        invalidate_adjustment_factors_query = f"{query_type} FROM price_adjustment_factor_status WHERE asset_id = ?"
+        # Execute the query
+        self.execute_transaction([(invalidate_adjustment_factors_query, [(asset_id,) for asset_id in asset_ids])])
 
+    def get_current_user_asset_transaction_quantities(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        current_user_id = self._session_manager.get_current_user_id()
+        get_transaction_quantities_query = f"{query_type} id, asset_id, transaction_date, quantity, avg_price FROM asset_transaction WHERE user_id = ?"
+        params = (current_user_id,)
+        # Execute the query
+        result = self.execute_query(get_transaction_quantities_query, params)
+        return result if result is not None else []
 
     ######################
     # ASSET TRANSACTIONS #
@@ -961,7 +1543,7 @@ class QueryExecutor:
                 # Define the second query parameters
                 query_type = "SELECT"
                 get_last_uid_by_email_address_and_folder_name_query = f"{query_type} last_uid FROM imported_email_log WHERE user_id = ? \
-                    AND email_id = ? AND folder_name = ? ORDER BY last_uid DESC LIMIT 1;"
+                    AND email_id = ? AND folder_name = ? ORDER BY id DESC LIMIT 1;"
                 params = (current_user_id, email_id, folder_name)
                 # Execute the query
                 result = self.execute_query(get_last_uid_by_email_address_and_folder_name_query, params)
@@ -995,6 +1577,97 @@ class QueryExecutor:
                 # Execute the query
                 self.execute_query(insert_uid_by_email_address_and_folder_name_query, params)
 
+    def get_import_email_id_by_email_address(self, email_address: str) -> int | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_import_email_id_by_email_address_query = f"{query_type} id FROM email WHERE user_id = ? AND email_usage_id = " \
+            f"(SELECT id FROM email_usage WHERE usage = 'import') AND address = ?"
+        current_user_id = self._session_manager.get_current_user_id()
+        params = (current_user_id, email_address)
+        # Execute the query
+        result = self.execute_query(get_import_email_id_by_email_address_query, params)
+        # Check whether the result is None (None means the email doesn't exist)
+        if result is not None and len(result) > 0:
+            return result[0][0]
+        else:
+            return None
+
+    def get_email_folder_sync_state(self, email_id: int, folder_name: str) -> EmailFolderSyncState | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        # The latest row is the current state, UIDs can go down after a UIDVALIDITY reset so order by id
+        get_email_folder_sync_state_query = f"{query_type} last_uid, uid_validity, highest_modseq FROM imported_email_log " \
+            f"WHERE user_id = ? AND email_id = ? AND folder_name = ? ORDER BY id DESC LIMIT 1"
+        current_user_id = self._session_manager.get_current_user_id()
+        params = (current_user_id, email_id, folder_name)
+        # Execute the query
+        result = self.execute_query(get_email_folder_sync_state_query, params)
+        # Check whether the result is None (None means the folder has never been synced)
+        if result is not None and len(result) > 0:
+            return EmailFolderSyncState(result[0][0], result[0][1], result[0][2])
+        else:
+            return None
+
+    def get_asset_transactions_without_fingerprint(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_asset_transactions_without_fingerprint_query = f"{query_type} id, user_id, brokerage_id, investment_account_id, asset_id, " \
+            f"transaction_type_id, quantity, avg_price, transaction_date, imported_from FROM asset_transaction WHERE fingerprint IS NULL ORDER BY id"
+        # Execute the query
+        result = self.execute_query(get_asset_transactions_without_fingerprint_query)
+        return result if result is not None else []
+
+    def update_asset_transaction_fingerprints(self, fingerprints_by_id: list[tuple[str, int]]) -> None:
+        # Define the query parameters
+        query_type = "UPDATE"
+        update_asset_transaction_fingerprints_query = f"{query_type} asset_transaction SET fingerprint = ? WHERE id = ?"
+        # Execute the query, every fingerprint is written in one transaction
+        self.execute_transaction([(update_asset_transaction_fingerprints_query, fingerprints_by_id)])
+
+    def __get_insert_asset_transaction_query(self) -> str:
+        # Transactions whose fingerprint is already stored are ignored, so re-imports never create duplicates
+        query_type = "INSERT OR IGNORE"
+        return f"{query_type} INTO asset_transaction (user_id, asset_id, transaction_type_id, " \
+            f"brokerage_id, investment_account_id, quantity, avg_price, total, transaction_fee, transaction_date, " \
+            f"imported_from, import_date, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+    def insert_asset_transactions(self, asset_transactions: AssetTransactionBatch) -> int:
+        # Define the query parameters
+        insert_asset_transaction_query = self.__get_insert_asset_transaction_query()
+        asset_transaction_params = asset_transactions.to_params()
+        # Execute the query
+        inserted_count = self.execute_transaction([(insert_asset_transaction_query, asset_transaction_params)])[0]
+        logging.info(f"{inserted_count} asset transactions inserted, {len(asset_transactions) - inserted_count} duplicates ignored.")
+        return inserted_count
+
+    def insert_asset_transactions_and_last_uid(self, asset_transactions: AssetTransactionBatch, email_id: int, folder_name: str, last_uid: int,
+                                               uid_validity: int | None=None, highest_modseq: int | None=None) -> int:
+        # Define the query parameters
+        insert_asset_transaction_query = self.__get_insert_asset_transaction_query()
+        query_type = "INSERT"
+        insert_last_uid_query = f"{query_type} INTO imported_email_log (user_id, email_id, folder_name, last_uid, uid_validity, highest_modseq) " \
+            f"VALUES (?, ?, ?, ?, ?, ?)"
+        current_user_id = self._session_manager.get_current_user_id()
+        # The transactions and the UID checkpoint are committed together, so a UID is never recorded without its transactions
+        asset_transaction_params = asset_transactions.to_params()
+        last_uid_params = [(current_user_id, email_id, folder_name, last_uid, uid_validity, highest_modseq)]
+        # Execute the queries
+        inserted_count = self.execute_transaction([
+            (insert_asset_transaction_query, asset_transaction_params),
+            (insert_last_uid_query, last_uid_params)
+        ])[0]
+        logging.info(f"{inserted_count} asset transactions committed with last UID {last_uid} for folder '{folder_name}', " \
+            f"{len(asset_transactions) - inserted_count} duplicates ignored.")
+        return inserted_count
+
+    def get_asset_info_by_asset_symbol(self, asset_symbol: str) -> list[tuple] | None:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_asset_info_by_asset_symbol_query = f"{query_type} * FROM asset_info WHERE symbol = ?"
+        params = (asset_symbol,)
+        # Execute the query
+        return self.execute_query(get_asset_info_by_asset_symbol_query, params)
+
     def get_asset_id_by_asset_symbol(self, asset_symbol: str) -> int | None:
         # Define the query parameters
         query_type = "SELECT"
@@ -1071,6 +1744,43 @@ class QueryExecutor:
         else:
             return None
 
+    def get_investment_accounts(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_investment_accounts_query = f"{query_type} id, name FROM investment_account WHERE user_id = ?"
+        current_user_id = self._session_manager.get_current_user_id()
+        params = (current_user_id,)
+        # Execute the query
+        result = self.execute_query(get_investment_accounts_query, params)
+        return result if result is not None else []
+
+    def insert_investment_accounts(self, brokerage_id: int, investment_account_names: list[str]) -> int:
+        # Define the query parameters
+        query_type = "INSERT OR IGNORE"
+        insert_investment_accounts_query = f"{query_type} INTO investment_account (user_id, brokerage_id, name) VALUES (?, ?, ?)"
+        current_user_id = self._session_manager.get_current_user_id()
+        params_list = [(current_user_id, brokerage_id, investment_account_name) for investment_account_name in investment_account_names]
+        # Execute the query, all accounts are inserted in a single transaction
+        return self.execute_transaction([(insert_investment_accounts_query, params_list)])[0]
+
+    def get_transaction_types(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        get_transaction_types_query = f"{query_type} id, name FROM transaction_type"
+        # Execute the query
+        result = self.execute_query(get_transaction_types_query)
+        return result if result is not None else []
+
+    def get_asset_symbols_with_currency_iso_codes(self) -> list[tuple]:
+        # Define the query parameters
+        query_type = "SELECT"
+        # Delisted assets are included, statements cover transactions in assets that no longer trade
+        get_asset_symbols_query = f"{query_type} asset_info.id, asset_info.symbol, currency.iso_code, asset_info.delisted_date IS NOT NULL " \
+            f"FROM asset_info LEFT JOIN currency ON currency.id = asset_info.exchange_currency_id"
+        # Execute the query
+        result = self.execute_query(get_asset_symbols_query)
+        return result if result is not None else []
+
     # def insert_asset_transaction(self, asset_transaction: AssetTransaction) -> None:
     #     # Define the query parameters
     #     query_type = "INSERT"
@@ -1,9 +1,15 @@
 # Purpose: Asset Dataclass module for storing asset information prior to formatting and inserting into the database.
 
 # Standard Libraries
-from dataclasses import dataclass
+import hashlib
+from collections.abc import Iterator
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any
 
 # Third-party Libraries
+import numpy as np
+import pandas as pd
 
 # Local Modules
 
@@ -11,8 +17,31 @@ from dataclasses import dataclass
 import logging
 
 
+# Function to hash the fields that identify an asset transaction, so the same transaction always gets the same fingerprint
+def get_asset_transaction_fingerprint(user_id, brokerage_id, investment_account_id, asset_id, transaction_type_id,
+                                      quantity, avg_price, transaction_date, imported_from) -> str:
+    # Normalize the identifying fields so the same transaction always hashes the same, whatever it was imported from
+    try:
+        transaction_date = datetime.fromisoformat(str(transaction_date).strip()).isoformat()
+    except ValueError:
+        transaction_date = str(transaction_date).strip()
+    # The import_date, total and transaction_fee are left out, they don't identify the trade itself
+    fingerprint_fields = [
+        str(user_id),
+        str(brokerage_id),
+        str(investment_account_id),
+        str(asset_id),
+        str(transaction_type_id),
+        f"{float(str(quantity).replace(',', '')):.8f}",
+        f"{float(str(avg_price).replace(',', '')):.8f}",
+        transaction_date,
+        str(imported_from).strip().lower()
+    ]
+    return hashlib.sha256("|".join(fingerprint_fields).encode()).hexdigest()
+
+
 # ExchangeListingsInfo dataclass for storing exchange listing information prior to formatting and inserting into the database
-@dataclass
+@dataclass(slots=True)
 class ExchangeListingsInfo:
     asset_class_name: str
     asset_subclass_name: str
@@ -22,7 +51,7 @@ class ExchangeListingsInfo:
     security_name: str
 
     def __post_init__(self) -> None:
-        logging.debug(f"Created ExchangeListingInfo object: {self}")
+        logging.debug("Created ExchangeListingInfo object: %s", self)
     
     def __str__(self) -> str:
         return f"AssetInfo(asset_class_name={self.asset_class_name}, asset_subclass_name={self.asset_subclass_name}, " \
@@ -41,7 +70,7 @@ class ExchangeListingsInfo:
 
 
 # YFinanceAssetInfo dataclass for storing asset information with names prior to formatting and inserting into the database
-@dataclass
+@dataclass(slots=True)
 class YFinanceAssetInfo:
     asset_class_name: str
     sector_name: str
@@ -55,7 +84,7 @@ class YFinanceAssetInfo:
     logo_url: str
 
     def __post_init__(self) -> None:
-        logging.debug(f"Created AssetInfoWithNames object: {self}")
+        logging.debug("Created AssetInfoWithNames object: %s", self)
     
     def __str__(self) -> str:
         return f"AssetInfo(asset_class_name={self.asset_class_name}, sector_name={self.sector_name}," \
@@ -79,7 +108,7 @@ class YFinanceAssetInfo:
         }
 
 # AssetInfoWithNames dataclass for storing asset information with names prior to formatting and inserting into the database
-@dataclass
+@dataclass(slots=True)
 class AssetInfoWithNames:
     asset_class_name: str
     asset_subclass_name: str
@@ -97,7 +126,7 @@ class AssetInfoWithNames:
     logo_url: str
 
     def __post_init__(self) -> None:
-        logging.debug(f"Created AssetInfoWithNames object: {self}")
+        logging.debug("Created AssetInfoWithNames object: %s", self)
     
     def __str__(self) -> str:
         return f"AssetInfo(asset_class_name={self.asset_class_name}, asset_subclass_name={self.asset_subclass_name}, " \
@@ -127,7 +156,7 @@ class AssetInfoWithNames:
 
 
 # AssetInfoWithIDs dataclass for storing asset information that exactly matches the database schema
-@dataclass
+@dataclass(slots=True)
 class AssetInfoWithIDs:
     asset_class_id: int
     asset_subclass_id: int
@@ -145,7 +174,7 @@ class AssetInfoWithIDs:
     logo_url: str
 
     def __post_init__(self) -> None:
-        logging.debug(f"Created AssetInfoWithIDs object: {self}")
+        logging.debug("Created AssetInfoWithIDs object: %s", self)
     
     def __str__(self) -> str:
         return f"AssetInfo(asset_class_id={self.asset_class_id}, asset_subclass_id={self.asset_subclass_id}, " \
@@ -175,7 +204,7 @@ class AssetInfoWithIDs:
 
 
 # AssetTransaction dataclass for storing asset transaction data
-@dataclass
+@dataclass(slots=True)
 class AssetTransaction:
     user_id: int
     asset_id: int
@@ -191,7 +220,7 @@ class AssetTransaction:
     import_date: str
 
     def __post_init__(self) -> None:
-        logging.debug(f"Creating AssetTransaction object: {self}")
+        logging.debug("Creating AssetTransaction object: %s", self)
 
     def __str__(self) -> str:
         return f"AssetTransaction(user_id={self.user_id}, asset_id={self.asset_id}, " \
@@ -199,7 +228,11 @@ class AssetTransaction:
                f"investment_account_id={self.investment_account_id}, quantity={self.quantity}, avg_price={self.avg_price}, " \
                f"total={self.total}, transaction_fee={self.transaction_fee}, transaction_date={self.transaction_date}, " \
                f"imported_from={self.imported_from}, import_date={self.import_date})"
-    
+
+    def get_fingerprint(self) -> str:
+        return get_asset_transaction_fingerprint(self.user_id, self.brokerage_id, self.investment_account_id, self.asset_id,
+            self.transaction_type_id, self.quantity, self.avg_price, self.transaction_date, self.imported_from)
+
     def to_dict(self):
         return {
             "user_id": self.user_id,
@@ -213,9 +246,115 @@ class AssetTransaction:
             "transaction_fee": self.transaction_fee,
             "transaction_date": self.transaction_date,
             "imported_from": self.imported_from,
-            "import_date": self.import_date
+            "import_date": self.import_date,
+            "fingerprint": self.get_fingerprint()
         }
 
 
+# BatchParameters class for passing the rows of a columnar batch to executemany without building a list of tuples first
+class BatchParameters:
+    def __init__(self, columns: list[np.ndarray]) -> None:
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._columns[0]) if len(self._columns) > 0 else 0
+
+    def __iter__(self) -> Iterator[tuple]:
+        # tolist() turns numpy scalars into the Python ints, floats and strings sqlite3 accepts
+        return zip(*(column.tolist() for column in self._columns))
+
+
+# ColumnarBatch class for storing many records of the same dataclass as one array per field (struct of arrays)
+class ColumnarBatch:
+    record_type: type = object
+
+    def __init__(self, columns: dict[str, Any]) -> None:
+        self._columns: dict[str, np.ndarray] = {}
+        for field in fields(self.record_type):
+            values = columns[field.name]
+            # Numeric fields get a numeric array if every value fits, anything else (strings, None, mixed) stays an object array
+            dtype = {int: np.int64, float: np.float64}.get(field.type, object) # type: ignore
+            try:
+                self._columns[field.name] = np.asarray(values, dtype=dtype)
+            except (TypeError, ValueError):
+                self._columns[field.name] = np.asarray(values, dtype=object)
+        lengths = {len(column) for column in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"All columns of a {type(self).__name__} must have the same length.")
+
+    @classmethod
+    def from_records(cls, records: list):
+        return cls({field.name: [getattr(record, field.name) for record in records] for field in fields(cls.record_type)})
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        # Columns that already have the right dtype are used as they are, without copying
+        return cls({field.name: df[field.name].to_numpy() for field in fields(cls.record_type)})
+
+    def __len__(self) -> int:
+        return len(next(iter(self._columns.values()))) if len(self._columns) > 0 else 0
+
+    def __getitem__(self, index: int):
+        # Builds a single record on demand, bulk stages should use the columns instead
+        return self.record_type(**{name: column[index].item() if isinstance(column[index], np.generic) else column[index]
+                                   for name, column in self._columns.items()})
+
+    def __iter__(self) -> Iterator:
+        return (self[index] for index in range(len(self)))
+
+    def get_column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def filter(self, mask: np.ndarray):
+        # Boolean mask or index array, one value per row
+        batch = object.__new__(type(self))
+        batch._columns = {name: column[mask] for name, column in self._columns.items()}
+        return batch
+
+    def to_dataframe(self) -> pd.DataFrame:
+        # The DataFrame is built on the batch's arrays, numeric columns are shared without copying
+        return pd.DataFrame(self._columns, copy=False)
+
+    def to_params(self, columns: list[str] | None=None) -> BatchParameters:
+        # Parameter rows in field order (or the given column order) for executemany
+        return BatchParameters([self._columns[name] for name in (columns if columns is not None else self._columns)])
+
+
+# ExchangeListingsInfoBatch class for storing exchange listing information as one array per field
+class ExchangeListingsInfoBatch(ColumnarBatch):
+    record_type = ExchangeListingsInfo
+
+
+# YFinanceAssetInfoBatch class for storing Yahoo Finance asset information as one array per field
+class YFinanceAssetInfoBatch(ColumnarBatch):
+    record_type = YFinanceAssetInfo
+
+
+# AssetInfoWithNamesBatch class for storing asset information with names as one array per field
+class AssetInfoWithNamesBatch(ColumnarBatch):
+    record_type = AssetInfoWithNames
+
+
+# AssetInfoWithIDsBatch class for storing asset information that exactly matches the database schema as one array per field
+class AssetInfoWithIDsBatch(ColumnarBatch):
+    record_type = AssetInfoWithIDs
+
+
+# AssetTransactionBatch class for storing asset transactions as one array per field
+class AssetTransactionBatch(ColumnarBatch):
+    record_type = AssetTransaction
+
+    def get_fingerprints(self) -> np.ndarray:
+        fingerprint_columns = [self._columns[name].tolist() for name in ("user_id", "brokerage_id", "investment_account_id", "asset_id",
+            "transaction_type_id", "quantity", "avg_price", "transaction_date", "imported_from")]
+        return np.asarray([get_asset_transaction_fingerprint(*row) for row in zip(*fingerprint_columns)], dtype=object)
+
+    def to_params(self, columns: list[str] | None=None) -> BatchParameters:
+        # The fingerprint column is computed from the other fields, like AssetTransaction.to_dict()
+        if columns is None:
+            return BatchParameters([*self._columns.values(), self.get_fingerprints()])
+        return BatchParameters([self.get_fingerprints() if name == "fingerprint" else self._columns[name] for name in columns])
+
+
 if __name__ == "__main__":
     print("This module is not meant to be executed directly.")
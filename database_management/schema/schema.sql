@@ -52,11 +52,13 @@ CREATE TABLE IF NOT EXISTS imported_email_log (
     email_id INTEGER NOT NULL REFERENCES email (id),
     folder_name VARCHAR(255) NOT NULL,
     last_uid INT NOT NULL,
+    uid_validity INT,
+    highest_modseq INT,
     last_uid_updated_at VARCHAR(255) DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Trigger to ensure email_id references an email with 'import' usage
-CREATE TRIGGER enforce_import_email
+CREATE TRIGGER IF NOT EXISTS enforce_import_email
 BEFORE INSERT ON imported_email_log
 FOR EACH ROW
 BEGIN
@@ -154,9 +156,43 @@ CREATE TABLE IF NOT EXISTS asset_info (
     business_summary VARCHAR(1023),
     website VARCHAR(255),
     logo_url VARCHAR(255),
+    delisted_date DATE,
     UNIQUE (exchange_id, symbol)
 );
 
+-- Create index for looking up asset data by symbol only (e.g. when importing transactions)
+CREATE INDEX IF NOT EXISTS idx_asset_info_symbol ON asset_info (symbol);
+
+-- Create table for cached Yahoo Finance info payloads, one zlib-compressed JSON payload per symbol and field group
+CREATE TABLE IF NOT EXISTS yfinance_info_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    yfinance_symbol VARCHAR(255) NOT NULL,
+    field_group VARCHAR(255) NOT NULL,
+    payload BLOB NOT NULL,
+    fetched_at VARCHAR(255) NOT NULL,
+    UNIQUE (yfinance_symbol, field_group)
+);
+
+-- Create table for the asset info initialization journal, one row per listed symbol so an interrupted run resumes where it stopped
+-- (pending: not processed yet, fetched: Yahoo Finance info retrieved, failed: gave up with last_error, inserted: stored in asset_info)
+CREATE TABLE IF NOT EXISTS asset_info_init_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exchange_id INTEGER NOT NULL REFERENCES exchange (id),
+    symbol VARCHAR(255) NOT NULL,
+    security_name VARCHAR(255) NOT NULL,
+    asset_class_name VARCHAR(255),
+    asset_subclass_name VARCHAR(255),
+    exchange_currency_id INTEGER REFERENCES currency (id),
+    [status] VARCHAR(255) NOT NULL DEFAULT 'pending' CHECK ([status] IN ('pending', 'fetched', 'failed', 'inserted')),
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(1023),
+    updated_at VARCHAR(255) DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (exchange_id, symbol)
+);
+
+-- Create index for finding the unfinished symbols of an exchange
+CREATE INDEX IF NOT EXISTS idx_asset_info_init_journal_exchange_status ON asset_info_init_journal (exchange_id, [status]);
+
 -- Create table for asset price history data
 CREATE TABLE IF NOT EXISTS asset_price_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -171,6 +207,30 @@ CREATE TABLE IF NOT EXISTS asset_price_history (
     UNIQUE (asset_id, [date])
 );
 
+-- Create table for the latest quote of each asset, refreshed in batches by the quote service
+CREATE TABLE IF NOT EXISTS latest_quote (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id INTEGER NOT NULL UNIQUE REFERENCES asset_info (id),
+    price DECIMAL(10, 2) NOT NULL,
+    previous_close DECIMAL(10, 2),
+    quote_date DATE NOT NULL,
+    updated_at VARCHAR(255) NOT NULL
+);
+
+-- Create table for recent intraday asset price bars (1 and 5 minute), [timestamp] is the bar's start in Unix seconds (UTC)
+-- Keyed directly by (asset, interval, timestamp) without a rowid to keep the high-volume rows small, old rows are downsampled into asset_price_history
+CREATE TABLE IF NOT EXISTS asset_intraday_price (
+    asset_id INTEGER NOT NULL REFERENCES asset_info (id),
+    interval_minutes INT NOT NULL CHECK (interval_minutes IN (1, 5)),
+    [timestamp] INT NOT NULL,
+    [open] REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    [close] REAL NOT NULL,
+    volume INT NOT NULL,
+    PRIMARY KEY (asset_id, interval_minutes, [timestamp])
+) WITHOUT ROWID;
+
 -- Create table for asset dividend history data (not dividends earned by the user)
 CREATE TABLE IF NOT EXISTS dividend_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -189,6 +249,55 @@ CREATE TABLE IF NOT EXISTS split_history (
     UNIQUE (asset_id, [date])
 );
 
+-- Create table for cached cumulative adjustment factors, each row applies to every date before its [date]
+-- (split_factor: product of the splits on or after [date], dividend_factor: product of (1 - dividend / previous close) on or after [date])
+CREATE TABLE IF NOT EXISTS price_adjustment_factor (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id INTEGER NOT NULL REFERENCES asset_info (id),
+    [date] DATE NOT NULL,
+    split_factor DECIMAL(10, 6) NOT NULL,
+    dividend_factor DECIMAL(10, 6) NOT NULL,
+    UNIQUE (asset_id, [date])
+);
+
+-- Create table for the assets whose cached adjustment factors are up to date with their split and dividend history
+CREATE TABLE IF NOT EXISTS price_adjustment_factor_status (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id INTEGER NOT NULL UNIQUE REFERENCES asset_info (id),
+    computed_at VARCHAR(255) DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create table for weekly, monthly and yearly asset price bars rolled up from asset_price_history (period_start is the Monday, 1st of the month or 1st of the year)
+CREATE TABLE IF NOT EXISTS asset_price_rollup (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id INTEGER NOT NULL REFERENCES asset_info (id),
+    granularity VARCHAR(255) NOT NULL CHECK (granularity IN ('week', 'month', 'year')),
+    period_start DATE NOT NULL,
+    last_date DATE NOT NULL,
+    [open] DECIMAL(10, 2) NOT NULL,
+    high DECIMAL(10, 2) NOT NULL,
+    low DECIMAL(10, 2) NOT NULL,
+    [close] DECIMAL(10, 2) NOT NULL,
+    adj_close DECIMAL(10, 2) NOT NULL,
+    volume INT NOT NULL,
+    bar_count INT NOT NULL,
+    UNIQUE (asset_id, granularity, period_start)
+);
+
+-- Create table for the price history backfill queue (priority 0: held assets, 1: index constituents, 2: everything else)
+CREATE TABLE IF NOT EXISTS price_history_backfill_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset_id INTEGER NOT NULL UNIQUE REFERENCES asset_info (id),
+    priority INT NOT NULL,
+    [status] VARCHAR(255) NOT NULL DEFAULT 'pending' CHECK ([status] IN ('pending', 'in_progress', 'done', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(1023),
+    updated_at VARCHAR(255) DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create index for claiming the next pending assets in priority order
+CREATE INDEX IF NOT EXISTS idx_price_history_backfill_queue_status_priority ON price_history_backfill_queue ([status], priority, id);
+
 ------------------------
 -- ASSET TRANSACTIONS --
 ------------------------
@@ -241,9 +350,13 @@ CREATE TABLE IF NOT EXISTS asset_transaction (
     transaction_fee DECIMAL(10, 2) NOT NULL,
     transaction_date DATE NOT NULL,
     imported_from VARCHAR(255),
-    import_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    import_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fingerprint CHAR(64) NOT NULL
 );
 
+-- Unique index on the transaction fingerprint so re-imported transactions are ignored instead of duplicated
+CREATE UNIQUE INDEX IF NOT EXISTS idx_asset_transaction_fingerprint ON asset_transaction (fingerprint);
+
 ----------------
 -- INDEX DATA --
 ----------------
@@ -266,9 +379,25 @@ CREATE TABLE IF NOT EXISTS index_holdings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     index_id INTEGER NOT NULL REFERENCES index_info (id),
     asset_id INTEGER NOT NULL REFERENCES asset_info (id),
+    added_date DATE NOT NULL DEFAULT CURRENT_DATE,
     UNIQUE (index_id, asset_id)
 );
 
+-- Create index for looking up the indexes an asset belongs to
+CREATE INDEX IF NOT EXISTS idx_index_holdings_asset_id ON index_holdings (asset_id);
+
+-- Create table for the history of index constituent additions and removals
+CREATE TABLE IF NOT EXISTS index_holdings_change (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    index_id INTEGER NOT NULL REFERENCES index_info (id),
+    asset_id INTEGER NOT NULL REFERENCES asset_info (id),
+    change VARCHAR(255) NOT NULL CHECK (change IN ('added', 'removed')),
+    change_date DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+-- Create index for reading the change history of an index in date order
+CREATE INDEX IF NOT EXISTS idx_index_holdings_change_index_date ON index_holdings_change (index_id, change_date);
+
 -- Create table for index price history data
 CREATE TABLE IF NOT EXISTS index_price_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -283,6 +412,23 @@ CREATE TABLE IF NOT EXISTS index_price_history (
     UNIQUE (index_id, [date])
 );
 
+-- Create table for weekly, monthly and yearly index price bars rolled up from index_price_history
+CREATE TABLE IF NOT EXISTS index_price_rollup (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    index_id INTEGER NOT NULL REFERENCES index_info (id),
+    granularity VARCHAR(255) NOT NULL CHECK (granularity IN ('week', 'month', 'year')),
+    period_start DATE NOT NULL,
+    last_date DATE NOT NULL,
+    [open] DECIMAL(10, 2) NOT NULL,
+    high DECIMAL(10, 2) NOT NULL,
+    low DECIMAL(10, 2) NOT NULL,
+    [close] DECIMAL(10, 2) NOT NULL,
+    adj_close DECIMAL(10, 2) NOT NULL,
+    volume INT NOT NULL,
+    bar_count INT NOT NULL,
+    UNIQUE (index_id, granularity, period_start)
+);
+
 --------------------
 -- DATA IMPORTING --
 --------------------
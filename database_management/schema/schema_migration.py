@@ -0,0 +1,84 @@
+# Purpose: Schema Migration module for bringing existing database files up to date with the schema.sql file on startup.
+
+# Standard Libraries
+import hashlib
+from datetime import date
+from typing import Callable
+
+# Third-party Libraries
+
+# Local Modules
+from database_management.query.query_executor import QueryExecutor
+from database_management.schema.asset_dataclass import get_asset_transaction_fingerprint
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Columns added to existing tables since their first release, as (table name, column name, column definition)
+# SQLite can't add NOT NULL columns or non-constant defaults with ALTER TABLE, so those columns are added nullable and backfilled
+SCHEMA_COLUMN_MIGRATIONS: list[tuple[str, str, str]] = [
+    ("asset_transaction", "fingerprint", "CHAR(64)"),
+    ("imported_email_log", "uid_validity", "INT"),
+    ("imported_email_log", "highest_modseq", "INT"),
+    ("asset_info", "delisted_date", "DATE"),
+    ("index_holdings", "added_date", "DATE")
+]
+
+
+# SchemaMigration class for adding the columns, tables and indexes an existing database file is missing
+class SchemaMigration:
+    def __init__(self, query_executor: QueryExecutor, db_schema_filename: str) -> None:
+        self._query_executor = query_executor
+        self._db_schema_filename = db_schema_filename
+        # Backfills for the added columns whose existing rows can't be left NULL
+        self._column_backfills: dict[tuple[str, str], Callable[[], None]] = {
+            ("asset_transaction", "fingerprint"): self._backfill_asset_transaction_fingerprints,
+            ("index_holdings", "added_date"): self._backfill_index_holdings_added_dates
+        }
+
+    def migrate_database(self) -> None:
+        self._add_missing_columns()
+        # Every statement in the schema file is idempotent, re-running it creates the tables and indexes added since the database was created
+        # The columns have to be added first, some of the new indexes are on the new columns
+        self._query_executor.initialize_database_schema(self._db_schema_filename)
+
+    def _add_missing_columns(self) -> None:
+        for table_name, column_name, column_definition in SCHEMA_COLUMN_MIGRATIONS:
+            column_names = self._query_executor.get_table_column_names(table_name)
+            # Tables that don't exist yet are created with every column by the schema file
+            if len(column_names) == 0 or column_name in column_names:
+                continue
+            self._query_executor.add_column(table_name, column_name, column_definition)
+            logging.info(f"Added the {column_name} column to the {table_name} table.")
+            backfill = self._column_backfills.get((table_name, column_name))
+            if backfill is not None:
+                backfill()
+
+    def _backfill_asset_transaction_fingerprints(self) -> None:
+        fingerprints_by_id: list[tuple[str, int]] = []
+        seen_fingerprints: set[str] = set()
+        duplicate_count = 0
+        for transaction_id, *fingerprint_fields in self._query_executor.get_asset_transactions_without_fingerprint():
+            fingerprint = get_asset_transaction_fingerprint(*fingerprint_fields)
+            # Transactions imported twice before fingerprints existed are kept, the copies get a fingerprint of their own
+            # so the unique index can be created, re-imports are still matched against the first one
+            if fingerprint in seen_fingerprints:
+                duplicate_count += 1
+                fingerprint = hashlib.sha256(f"{fingerprint}|{transaction_id}".encode()).hexdigest()
+            seen_fingerprints.add(fingerprint)
+            fingerprints_by_id.append((fingerprint, transaction_id))
+        if len(fingerprints_by_id) > 0:
+            self._query_executor.update_asset_transaction_fingerprints(fingerprints_by_id)
+        if duplicate_count > 0:
+            logging.warning(f"{duplicate_count} asset transactions were already duplicated before fingerprints were added, they were kept.")
+        logging.info(f"Backfilled the fingerprints of {len(fingerprints_by_id)} asset transactions.")
+
+    def _backfill_index_holdings_added_dates(self) -> None:
+        # When the existing constituents were added isn't known, the migration date is the first date they're known to be held
+        self._query_executor.set_missing_index_holdings_added_dates(date.today().isoformat())
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,299 @@
+# Purpose: Email Sync Engine module for concurrently syncing several import email accounts and folders into the database.
+
+# Type Checking
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+# Standard Libraries
+import asyncio
+from dataclasses import dataclass, field
+
+# Third-party Libraries
+
+# Local Modules
+from import_modules.import_from_email_account import IMAPClient, AssetTransactionManager, parse_transaction_email, plan_folder_sync, EMAIL_IMPORT_BATCH_SIZE
+
+# Local modules imported for Type Checking purposes only
+if TYPE_CHECKING:
+    from database_management.database import Database
+    from account_management.accounts import EmailFolderSyncState
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Maximum number of simultaneous IMAP connections opened to the same server host
+MAX_CONNECTIONS_PER_SERVER: int = 4
+# Number of emails fetched per IMAP FETCH command
+EMAIL_FETCH_CHUNK_SIZE: int = 50
+# Maximum number of fetched emails waiting for the database writer
+EMAIL_QUEUE_SIZE: int = 500
+
+
+# EmailSyncTarget class for defining a single email account and folder to sync
+@dataclass
+class EmailSyncTarget:
+    email_address: str
+    email_password: bytes
+    folder_name: str
+    brokerage_name: str
+
+    def __str__(self) -> str:
+        return f"Email Address: {self.email_address}, Folder: {self.folder_name}, Brokerage: {self.brokerage_name}"
+
+
+# EmailSyncResult class for defining the outcome of syncing a single email account and folder
+@dataclass
+class EmailSyncResult:
+    email_address: str
+    folder_name: str
+    emails_fetched: int = 0
+    transactions_imported: int = 0
+    emails_skipped: int = 0
+    sync_mode: str | None = None
+    error: str | None = None
+
+    def __str__(self) -> str:
+        status = f"Error: {self.error}" if self.error is not None else ("Unchanged" if self.sync_mode == "unchanged" else "OK")
+        return (f"{self.email_address} [{self.folder_name}]: {self.emails_fetched} emails fetched, "
+                f"{self.transactions_imported} transactions imported, {self.emails_skipped} emails skipped, {status}")
+
+
+# _EmailSyncJob class for holding the database state of a target while it's being synced
+@dataclass
+class _EmailSyncJob:
+    target: EmailSyncTarget
+    result: EmailSyncResult
+    asset_transaction_manager: AssetTransactionManager
+    brokerage_id: int
+    email_id: int
+    sync_state: EmailFolderSyncState | None
+    imap_server_address: tuple[str, int] | None = None
+    import_failed: bool = False
+    imap_client: IMAPClient = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.imap_client = IMAPClient(self.target.email_address, self.target.email_password, self.imap_server_address)
+
+
+# EmailSyncEngine class for syncing several email accounts and folders concurrently through a single database writer
+class EmailSyncEngine:
+    def __init__(self, database: Database, max_connections_per_server: int=MAX_CONNECTIONS_PER_SERVER,
+                 fetch_chunk_size: int=EMAIL_FETCH_CHUNK_SIZE, batch_size: int=EMAIL_IMPORT_BATCH_SIZE,
+                 imap_server_address: tuple[str, int] | None=None) -> None:
+        self._database = database
+        # Overrides the IMAP server of every target, used to sync from a local stand-in server
+        self._imap_server_address = imap_server_address
+        self._max_connections_per_server = max_connections_per_server
+        self._fetch_chunk_size = fetch_chunk_size
+        self._batch_size = batch_size
+        self._server_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def sync(self, targets: list[EmailSyncTarget]) -> list[EmailSyncResult]:
+        return asyncio.run(self._sync(targets))
+
+    async def _sync(self, targets: list[EmailSyncTarget]) -> list[EmailSyncResult]:
+        # Resolve the database state of every target up front, the IMAP side never touches the database
+        jobs: list[_EmailSyncJob] = []
+        results: list[EmailSyncResult] = []
+        for target in targets:
+            result = EmailSyncResult(target.email_address, target.folder_name)
+            results.append(result)
+            job = self._create_job(target, result)
+            if job is not None:
+                jobs.append(job)
+
+        # Fetchers produce raw emails concurrently, a single writer consumes them in order of arrival
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+        writer = asyncio.create_task(self._write_emails(queue))
+        await asyncio.gather(*(self._fetch_emails(job, queue) for job in jobs))
+        # Signal the writer that no more emails are coming
+        await queue.put(None)
+        await writer
+
+        # Commit whatever is left in each job's batch, and record the new state of unchanged folders
+        for job in jobs:
+            if job.result.sync_mode == "unchanged" and job.sync_state is not None:
+                job.asset_transaction_manager.refresh_folder_sync_state(job.sync_state, job.email_id, job.target.folder_name)
+            # A job that failed to fetch or import an email didn't process the whole folder
+            self._commit_job(job, sync_complete=job.result.error is None and not job.import_failed)
+        return results
+
+    def _create_job(self, target: EmailSyncTarget, result: EmailSyncResult) -> _EmailSyncJob | None:
+        asset_transaction_manager = AssetTransactionManager(self._database)
+        brokerage_id = asset_transaction_manager.get_brokerage_id_or_insert(target.brokerage_name)
+        if brokerage_id is None:
+            result.error = f"Failed to get brokerage ID for {target.brokerage_name}."
+            return None
+        email_id = self._database.query_executor.get_import_email_id_by_email_address(target.email_address)
+        if email_id is None:
+            result.error = f"Failed to get email account ID for {target.email_address}."
+            return None
+        sync_state = self._database.query_executor.get_email_folder_sync_state(email_id, target.folder_name)
+        return _EmailSyncJob(target, result, asset_transaction_manager, brokerage_id, email_id, sync_state, self._imap_server_address)
+
+    def _get_server_semaphore(self, server_host: str) -> asyncio.Semaphore:
+        if server_host not in self._server_semaphores:
+            self._server_semaphores[server_host] = asyncio.Semaphore(self._max_connections_per_server)
+        return self._server_semaphores[server_host]
+
+    async def _fetch_emails(self, job: _EmailSyncJob, queue: asyncio.Queue) -> None:
+        server_host = job.imap_client.get_server_host()
+        if server_host is None:
+            job.result.error = "Email service provider not supported for import."
+            return
+        # Cap the number of open connections per server host
+        async with self._get_server_semaphore(server_host):
+            try:
+                # imaplib is blocking, so every IMAP command runs in a worker thread
+                mail = await asyncio.to_thread(job.imap_client.email_login)
+                if mail is None:
+                    job.result.error = "Failed to login to email account."
+                    return
+
+                # A single STATUS command tells whether anything changed since the last sync
+                folder_status = await asyncio.to_thread(job.imap_client.get_folder_status, job.target.folder_name)
+                sync_mode = plan_folder_sync(job.sync_state, folder_status)
+                job.asset_transaction_manager.set_folder_sync_state(folder_status)
+                job.result.sync_mode = sync_mode
+                if sync_mode == "unchanged":
+                    return
+                if sync_mode == "resync":
+                    logging.info(f"UIDVALIDITY changed for {job.target}, resyncing. Stored state: {job.sync_state}, current status: {folder_status}")
+
+                if not await asyncio.to_thread(job.imap_client.select_folder, job.target.folder_name):
+                    job.result.error = f"Failed to select folder: {job.target.folder_name}"
+                    return
+
+                # Search for emails with a UID greater than the last processed email in the folder
+                last_uid = job.sync_state.last_uid if sync_mode == "incremental" and job.sync_state is not None else None
+                search_query = f"UID {last_uid + 1}:*" if last_uid is not None else "ALL"
+                uids = await asyncio.to_thread(job.imap_client.search_emails, search_query)
+                # "UID n:*" always matches the newest email, even when it was already processed
+                uids = [uid for uid in uids if last_uid is None or int(uid) > last_uid]
+
+                for i in range(0, len(uids), self._fetch_chunk_size):
+                    emails = await asyncio.to_thread(job.imap_client.fetch_emails, uids[i:i + self._fetch_chunk_size])
+                    for uid, raw_email in emails:
+                        await queue.put((job, uid, raw_email))
+                    job.result.emails_fetched += len(emails)
+            except Exception as e:
+                logging.exception(f"Error syncing {job.target}")
+                job.result.error = str(e)
+            finally:
+                if job.imap_client.mail is not None:
+                    await asyncio.to_thread(job.imap_client.mail.logout)
+
+    async def _write_emails(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            job, uid, raw_email = item
+            # Once an email fails, the rest of the job is left for the next sync so the failed email is retried first
+            if job.import_failed:
+                continue
+            try:
+                self._import_email(job, raw_email)
+            except Exception as e:
+                logging.exception(f"Error importing email UID {uid} from {job.target}")
+                job.result.error = str(e)
+                job.import_failed = True
+                continue
+            job.asset_transaction_manager.checkpoint_uid(uid)
+            # Commit the accumulated transactions and UID checkpoint once a full batch of emails has been processed
+            if job.asset_transaction_manager.get_pending_email_count() >= self._batch_size:
+                self._commit_job(job)
+
+    def _import_email(self, job: _EmailSyncJob, raw_email: bytes) -> None:
+        asset_transaction_manager = job.asset_transaction_manager
+        df_data = parse_transaction_email(raw_email)
+        if df_data is None:
+            job.result.emails_skipped += 1
+            return
+
+        investment_account_name = df_data["investment_account"][0].lower().replace(' ', '_')
+        investment_account_id = asset_transaction_manager.get_investment_account_id_or_insert(job.brokerage_id, investment_account_name)
+        if investment_account_id is None:
+            raise ValueError(f"Investment account {investment_account_name} not found.")
+
+        # The sync runs unattended, so listings that can't be resolved automatically are logged and skipped
+        asset_info = asset_transaction_manager.find_asset_info(df_data["symbol"][0])
+        if asset_info is None or len(asset_info) == 0:
+            logging.info(f"Asset listing not found for symbol: {df_data['symbol'][0]}")
+            job.result.emails_skipped += 1
+            return
+        if len(asset_info) > 1:
+            selected_asset_info = asset_transaction_manager.select_asset_info_by_currency(asset_info, df_data["currency"][0])
+            if selected_asset_info is None:
+                logging.info(f"Multiple exchange listings found for symbol: {df_data['symbol'][0]}, skipping email.")
+                job.result.emails_skipped += 1
+                return
+        else:
+            selected_asset_info = asset_info[0]
+
+        transaction_type = df_data["transaction_type"][0].lower().replace(' ', '_')
+        transaction_type_id = asset_transaction_manager.get_transaction_type_id(transaction_type)
+        if transaction_type_id is None:
+            raise ValueError(f"Transaction type {transaction_type} not found.")
+
+        asset_transaction_manager.append_asset_transaction(asset_transaction_manager.create_asset_transaction(
+            df_data,
+            selected_asset_info[0], # selected_asset_info[0] is the asset_id
+            transaction_type_id,
+            job.brokerage_id,
+            investment_account_id
+        ))
+
+    def _commit_job(self, job: _EmailSyncJob, sync_complete: bool=False) -> None:
+        # Count what was actually inserted, transactions that were already imported are ignored by the database
+        job.result.transactions_imported += job.asset_transaction_manager.commit_pending_asset_transactions(job.email_id, job.target.folder_name, sync_complete)
+
+
+# Function to prompt the user for the accounts and folders to sync, then sync them all at once
+def sync_from_email_accounts(database: Database) -> int:
+    from user_interface.user_input import UserInput
+    from account_management.account_operations import UserAccountOperation, EmailAccountOperation
+    from access_management.account_authenticator import AccountAuthenticator
+    user_input = UserInput()
+    # Fetch all email addresses of usage "import" from the user
+    import_email_accounts = database.query_executor.get_user_email_accounts_by_usage("import")
+
+    # Check if any import email addresses are found
+    if import_email_accounts is None or len(import_email_accounts) <= 0:
+        print("No email accounts for importing portfolios found.")
+        print("Please add an email account in the account settings.")
+        return 1
+
+    account_authenticator = AccountAuthenticator(UserAccountOperation(database), EmailAccountOperation(database))
+    targets: list[EmailSyncTarget] = []
+    for email_account in import_email_accounts:
+        print(f"\n{email_account.address}")
+        provided_password = user_input.password_prompt(prompt="Verify your email credentials by entering your email password: ", confirm=False)
+        if not account_authenticator.validate_email_credentials(email_account.address, provided_password):
+            print(f"Skipping {email_account.address}.")
+            continue
+        folder_names = input("Enter the folder names to sync, separated by commas: ").strip()
+        brokerage_name = input("Enter the brokerage name: ").strip()
+        for folder_name in folder_names.split(","):
+            if folder_name.strip():
+                targets.append(EmailSyncTarget(email_account.address, provided_password, folder_name.strip(), brokerage_name))
+
+    if len(targets) == 0:
+        print("No email accounts or folders to sync.")
+        return 1
+
+    print(f"Syncing {len(targets)} email folders...")
+    results = EmailSyncEngine(database).sync(targets)
+
+    title = "SYNC SUMMARY:"
+    print(f"\n{title}")
+    print("-" * len(title))
+    for result in results:
+        print(result)
+    return 0 if all(result.error is None for result in results) else 1
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -2,19 +2,33 @@
 
 # Standard Libraries
 import csv
-import io
 import os
+from typing import Iterator
 
 # Third-party Libraries
 import pandas as pd
 
 # Local Modules
 from import_modules.web_scraper import WebScraper
+from import_modules.file_management.delimited_stream_loader import read_delimited_stream
+from import_modules.file_management.row_hash_index import get_row_hash, get_row_hash_index
 
 # Configure logging
 import logging
 
 
+# Function to get the row key of a CSV row, fields are joined the way csv.writer would stringify them
+def _get_csv_row_key(row: list) -> str:
+    return "\x1f".join("" if field is None else str(field) for field in row)
+
+
+# Function to stream the row keys of every row in a CSV file, used to rebuild its row hash index
+def _read_csv_row_keys(file_path: str) -> Iterator[str]:
+    with open(file_path, mode="r", newline="") as csv_file:
+        for row in csv.reader(csv_file):
+            yield _get_csv_row_key(row)
+
+
 # CSVFileManager class for handling CSV file operations
 class CSVFileManager:
     def __init__(self):
@@ -22,6 +36,9 @@ class CSVFileManager:
         self._data: list[list[str]] = []
         self._first_column_in_header: str | None = None
         self._web_scraper = WebScraper(user_agent=True)
+        self._dtypes: dict[str, str] | None = None
+        self._footer_prefix: str | None = None
+        self._dataframe: pd.DataFrame | None = None
     
     def get_header(self) -> list[str]:
         return self._header
@@ -41,6 +58,13 @@ class CSVFileManager:
     def set_data(self, data: list[list[str]]) -> None:
         self._data = data
 
+    def set_dtypes(self, dtypes: dict[str, str]) -> None:
+        # Only the columns in the map are kept, all of them are read as strings if no map is set
+        self._dtypes = dtypes
+
+    def set_footer_prefix(self, footer_prefix: str) -> None:
+        self._footer_prefix = footer_prefix
+
     def _find_header_row(self, csv_content: list[list[str]]) -> int | None:
         for i, row in enumerate(csv_content):
             if row and row[0] == self._first_column_in_header:
@@ -65,64 +89,58 @@ class CSVFileManager:
 
     def write_csv_file(self, file_path: str, mode: str="append_unique") -> None:
         file_exists = os.path.exists(file_path)
-        if file_exists and mode == "append_unique":
-            existing_data = self.read_csv_file(file_path)
-            new_data = [row for row in self._data if row not in existing_data]
-        else:
-            new_data = self._data
+        row_hash_index = get_row_hash_index(file_path, _read_csv_row_keys)
+        write_header = not file_exists or mode == "overwrite"
+        rows = [self._header] + self._data if write_header else self._data
+        if mode == "append_unique":
+            # Only the rows whose hash isn't in the row hash index are appended
+            rows, row_hashes = row_hash_index.select_new_rows(rows, map(_get_csv_row_key, rows))
+        elif mode == "overwrite":
+            row_hash_index.reset()
+            row_hashes = [get_row_hash(_get_csv_row_key(row)) for row in rows]
 
         with open(file_path, mode="w" if mode == "overwrite" else "a") as csv_file:
             writer = csv.writer(csv_file)
-            if not file_exists or mode == "overwrite":
-                writer.writerow(self._header)
-            for row in new_data:
-                writer.writerow(row)
+            writer.writerows(rows)
+        # Plain appends leave the index stale, it's rebuilt on the next unique append
+        if mode in ("append_unique", "overwrite"):
+            row_hash_index.record_rows(row_hashes)
     
     def append_unique_entry_to_csv_file(self, file_path: str, entry: list) -> None:
         file_exists = os.path.exists(file_path)
-        if file_exists:
-            existing_data = self.read_csv_file(file_path)
-            if entry not in existing_data:
-                with open(file_path, mode="a") as csv_file:
-                    writer = csv.writer(csv_file)
-                    writer.writerow(entry)
-        else:
-            with open(file_path, mode="w") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerow(self._header)
-                writer.writerow(entry)
+        row_hash_index = get_row_hash_index(file_path, _read_csv_row_keys)
+        rows = [entry] if file_exists else [self._header, entry]
+        rows, row_hashes = row_hash_index.select_new_rows(rows, map(_get_csv_row_key, rows))
+        if not rows:
+            return None
+        with open(file_path, mode="a" if file_exists else "w") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerows(rows)
+        row_hash_index.record_rows(row_hashes)
     
     def read_csv_from_url(self, url: str) -> None:
-        # Read the CSV file from the URL
-        content = self._web_scraper.get_html_content_as_text(url)
-        # Convert the CSV file to a list of lists
-        csv_file = io.StringIO(content)
-        # Read the CSV file into a list of lists
-        reader = csv.reader(csv_file)
-        data = [row for row in reader]
-
-        # Find the header row
-        header_index = self._find_header_row(data)
-
-        # Check if the header row was found
-        if header_index is None:
-            raise ValueError(f"Header row with first column '{self._first_column_in_header}' not found.")
-        
-        # Remove all rows before the header row
-        if header_index > 0:
-            logging.debug(f"Removing {header_index} rows before the header row.")
-            logging.debug(f"Data: {data[:header_index]}")
-            data = data[header_index:]
-        self._header = data.pop(0)
-        self._data = data
+        if self._first_column_in_header is None:
+            raise ValueError("First column in header must be specified.")
+        # Stream the CSV file from the URL straight into the parser
+        stream = self._web_scraper.get_content_as_stream(url)
+        if stream is None:
+            raise ValueError(f"CSV file could not be retrieved from {url}.")
+        with stream:
+            self._dataframe = read_delimited_stream(stream, ",", self._first_column_in_header, self._dtypes, self._footer_prefix)
+        self._header = list(self._dataframe.columns)
         logging.debug(f"Header: {self._header}")
-        logging.debug(f"Data: {data}")
 
     def sort_data_by_column(self, column_name: str) -> None:
+        if self._dataframe is not None:
+            self._dataframe = self._dataframe.sort_values(column_name, kind="stable", ignore_index=True)
+            return None
         column_index = self._header.index(column_name)
         self._data.sort(key=lambda row: row[column_index])
 
     def to_dataframe(self) -> pd.DataFrame:
+        # Files read from a URL are already parsed into a DataFrame
+        if self._dataframe is not None:
+            return self._dataframe
         df = pd.DataFrame(self._data, columns=self._header)
         return df
 
@@ -0,0 +1,91 @@
+# Purpose: Delimited Stream Loader module for parsing delimited text streams (CSV, pipe-delimited TXT) straight into DataFrames with pandas' native parsers.
+
+# Standard Libraries
+import csv
+from typing import BinaryIO, Iterator
+
+# Third-party Libraries
+import pandas as pd
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# Global variables
+# pyarrow's multithreaded parser is used when it's installed, pandas' C parser otherwise
+try:
+    import pyarrow # noqa: F401
+    DELIMITED_PARSER_ENGINE: str = "pyarrow"
+except ImportError:
+    DELIMITED_PARSER_ENGINE: str = "c"
+# Pipe-delimited files (NASDAQ Trader) don't quote their fields, a stray quote character is part of the value
+UNQUOTED_DELIMITERS: set[str] = {"|"}
+
+
+# Function to find the header row of a stream, only the lines up to and including the header are read in Python
+def _read_header_row(stream: BinaryIO, delimiter: str, first_column_in_header: str, encoding: str) -> list[str]:
+    skipped_row_count = 0
+    for line in iter(stream.readline, b""):
+        quoting = csv.QUOTE_NONE if delimiter in UNQUOTED_DELIMITERS else csv.QUOTE_MINIMAL
+        row = next(csv.reader([line.decode(encoding, errors="replace").rstrip("\r\n")], delimiter=delimiter, quoting=quoting), [])
+        if row and row[0] == first_column_in_header:
+            if skipped_row_count > 0:
+                logging.debug(f"Skipped {skipped_row_count} rows before the header row.")
+            return row
+        skipped_row_count += 1
+    raise ValueError(f"Header row with first column '{first_column_in_header}' not found.")
+
+
+# Function to parse a delimited stream into a DataFrame, trimming the lines before the header and the footer lines after the data
+# dtypes maps the columns to keep to their dtype ("str" or a numeric dtype), every column is kept as strings if it's None
+def read_delimited_stream(stream: BinaryIO, delimiter: str, first_column_in_header: str, dtypes: dict[str, str] | None=None,
+                          footer_prefix: str | None=None, encoding: str="utf-8") -> pd.DataFrame:
+    header = _read_header_row(stream, delimiter, first_column_in_header, encoding)
+
+    # The rest of the stream goes straight to the native parser, every cell is read as a string
+    # and nothing is turned into NaN, so symbols like "NA" or "NULL" and empty cells are kept as they are
+    read_csv_kwargs = {"sep": delimiter, "header": None, "names": header, "dtype": str, "keep_default_na": False, "encoding": encoding}
+    # Columns that aren't needed are skipped by the parser instead of being turned into Python strings
+    if dtypes is not None:
+        read_csv_kwargs["usecols"] = [column for column in header if column in dtypes or column == header[0]]
+    # pyarrow can't turn quoting off, unquoted files always go through the C parser
+    engine = "c" if delimiter in UNQUOTED_DELIMITERS else DELIMITED_PARSER_ENGINE
+    if engine == "c":
+        read_csv_kwargs.update({"index_col": False, "encoding_errors": "replace"})
+    if delimiter in UNQUOTED_DELIMITERS:
+        read_csv_kwargs["quoting"] = csv.QUOTE_NONE
+    df = pd.read_csv(stream, engine=engine, **read_csv_kwargs)
+
+    # Trim the footer lines (e.g. "File Creation Time: ...") at the end of the data
+    if footer_prefix is not None and len(df) > 0:
+        is_footer_row = df[header[0]].str.startswith(footer_prefix).to_numpy()
+        footer_row_count = 0
+        while footer_row_count < len(df) and is_footer_row[len(df) - 1 - footer_row_count]:
+            footer_row_count += 1
+        if footer_row_count > 0:
+            df = df.iloc[:len(df) - footer_row_count]
+
+    # Cast the non-string columns once the footer is gone, empty and invalid numbers become missing values
+    if dtypes is not None:
+        for column, dtype in dtypes.items():
+            if column in df.columns and dtype != "str":
+                df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+    logging.debug(f"Parsed {len(df)} rows with the {engine} engine, columns {list(df.columns)}.")
+    return df
+
+
+# Function to parse a delimited stream into DataFrames of at most chunk_size rows, only one chunk is held in memory at a time
+def iter_delimited_stream_chunks(stream: BinaryIO, delimiter: str, first_column_in_header: str, chunk_size: int,
+                                 encoding: str="utf-8") -> Iterator[pd.DataFrame]:
+    header = _read_header_row(stream, delimiter, first_column_in_header, encoding)
+    # pyarrow doesn't support chunked reads, so the C parser is always used here
+    quoting = csv.QUOTE_NONE if delimiter in UNQUOTED_DELIMITERS else csv.QUOTE_MINIMAL
+    with pd.read_csv(stream, sep=delimiter, header=None, names=header, dtype=str, keep_default_na=False, encoding=encoding,
+                     engine="c", index_col=False, encoding_errors="replace", quoting=quoting, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,136 @@
+# Purpose: Row Hash Index module for keeping a persistent sidecar index of row hashes so unique appends to CSV and TXT files don't re-read the whole file.
+
+# Standard Libraries
+import hashlib
+import os
+from typing import Callable, Iterable, Iterator
+
+# Third-party Libraries
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# Global variables
+ROW_HASH_INDEX_SUFFIX: str = ".rowhash"
+ROW_HASH_DIGEST_SIZE: int = 16
+# Row hash indexes already loaded in this process, keyed by the absolute path of the data file
+_row_hash_indexes: dict[str, "RowHashIndex"] = {}
+
+
+# Function to hash a row key (the canonical string form of a row)
+def get_row_hash(row_key: str) -> str:
+    return hashlib.blake2b(row_key.encode("utf-8"), digest_size=ROW_HASH_DIGEST_SIZE).hexdigest()
+
+
+# Function to get the row hash index of a data file, loaded indexes are reused across file manager instances
+def get_row_hash_index(file_path: str, read_row_keys: Callable[[str], Iterator[str]]) -> "RowHashIndex":
+    absolute_file_path = os.path.abspath(file_path)
+    row_hash_index = _row_hash_indexes.get(absolute_file_path)
+    if row_hash_index is None:
+        row_hash_index = RowHashIndex(absolute_file_path, read_row_keys)
+        _row_hash_indexes[absolute_file_path] = row_hash_index
+    return row_hash_index
+
+
+# RowHashIndex class for tracking the hashes of the rows already in a data file
+# Every line of the data file is indexed, header included. The sidecar file holds one "<row hash>\t<data file size>" line per row,
+# only the size on the last line matters. If it doesn't match the data file (edited by hand, interrupted write) the index is rebuilt.
+class RowHashIndex:
+    def __init__(self, file_path: str, read_row_keys: Callable[[str], Iterator[str]]) -> None:
+        self._file_path = file_path
+        self._index_path = f"{file_path}{ROW_HASH_INDEX_SUFFIX}"
+        self._read_row_keys = read_row_keys
+        self._row_hashes: set[str] = set()
+        # Size of the data file the in-memory hashes match, None until the index is loaded
+        self._synced_file_size: int | None = None
+
+    def __len__(self) -> int:
+        self._ensure_synced()
+        return len(self._row_hashes)
+
+    def _get_file_size(self) -> int:
+        try:
+            return os.path.getsize(self._file_path)
+        except OSError:
+            return 0
+
+    def _ensure_synced(self) -> None:
+        file_size = self._get_file_size()
+        # A stat is enough when nothing else touched the data file since the last append
+        if self._synced_file_size == file_size:
+            return None
+        if file_size == 0:
+            self.reset()
+            return None
+        if not self._load_index_file(file_size):
+            self.rebuild()
+
+    def _load_index_file(self, file_size: int) -> bool:
+        if not os.path.exists(self._index_path):
+            return False
+        row_hashes: set[str] = set()
+        indexed_file_size: int | None = None
+        with open(self._index_path, mode="r") as index_file:
+            for line in index_file:
+                row_hash, _, size = line.rstrip("\n").partition("\t")
+                if row_hash:
+                    row_hashes.add(row_hash)
+                indexed_file_size = int(size) if size.isdigit() else None
+        if indexed_file_size != file_size:
+            logging.debug(f"Row hash index of {self._file_path} is stale ({indexed_file_size} != {file_size} bytes).")
+            return False
+        self._row_hashes = row_hashes
+        self._synced_file_size = file_size
+        return True
+
+    def reset(self) -> None:
+        # Forget every row, called when the data file is missing, empty or about to be overwritten
+        if os.path.exists(self._index_path):
+            os.remove(self._index_path)
+        self._row_hashes = set()
+        self._synced_file_size = 0
+
+    def rebuild(self) -> None:
+        # Hash every row of the data file once and rewrite the sidecar file
+        row_hashes = {get_row_hash(row_key) for row_key in self._read_row_keys(self._file_path)} if os.path.exists(self._file_path) else set()
+        file_size = self._get_file_size()
+        with open(self._index_path, mode="w") as index_file:
+            for row_hash in row_hashes:
+                index_file.write(f"{row_hash}\t{file_size}\n")
+        self._row_hashes = row_hashes
+        self._synced_file_size = file_size
+        logging.debug(f"Rebuilt the row hash index of {self._file_path} with {len(row_hashes)} rows.")
+
+    def select_new_rows(self, rows: Iterable[list], row_keys: Iterable[str]) -> tuple[list[list], list[str]]:
+        # Keep the rows that aren't in the data file yet, duplicates within the rows are only kept once
+        self._ensure_synced()
+        new_rows = []
+        new_row_hashes = []
+        seen_row_hashes = set()
+        for row, row_key in zip(rows, row_keys):
+            row_hash = get_row_hash(row_key)
+            if row_hash in self._row_hashes or row_hash in seen_row_hashes:
+                continue
+            seen_row_hashes.add(row_hash)
+            new_rows.append(row)
+            new_row_hashes.append(row_hash)
+        return new_rows, new_row_hashes
+
+    def record_rows(self, row_hashes: list[str]) -> None:
+        # Called once the rows are written to the data file, stamps the sidecar lines with the new data file size
+        file_size = self._get_file_size()
+        with open(self._index_path, mode="a") as index_file:
+            for row_hash in row_hashes:
+                index_file.write(f"{row_hash}\t{file_size}\n")
+            # A line without a hash keeps the sidecar in sync when the data file changed without new rows
+            if not row_hashes and file_size != self._synced_file_size:
+                index_file.write(f"\t{file_size}\n")
+        self._row_hashes.update(row_hashes)
+        self._synced_file_size = file_size
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -1,19 +1,28 @@
 # Purpose: TXT File Manager module for handling TXT file operations.
 
 # Standard Libraries
-import io
 import os
+from typing import Iterator
 
 # Third-party Libraries
 import pandas as pd
 
 # Local Modules
 from import_modules.web_scraper import WebScraper
+from import_modules.file_management.delimited_stream_loader import read_delimited_stream
+from import_modules.file_management.row_hash_index import get_row_hash, get_row_hash_index
 
 # Configure logging
 import logging
 
 
+# Function to stream the row keys (the lines without their line ending) of a TXT file, used to rebuild its row hash index
+def _read_txt_row_keys(file_path: str) -> Iterator[str]:
+    with open(file_path, mode="r") as txt_file:
+        for line in txt_file:
+            yield line.rstrip("\r\n")
+
+
 # TXTFileManager class for handling TXT file operations
 class TXTFileManager:
     def __init__(self):
@@ -22,6 +31,9 @@ class TXTFileManager:
         self._first_column_in_header: str | None = None
         self._delimiter: str | None = None
         self._web_scraper = WebScraper(user_agent=True)
+        self._dtypes: dict[str, str] | None = None
+        self._footer_prefix: str | None = None
+        self._dataframe: pd.DataFrame | None = None
     
     def get_header(self) -> list[str]:
         return self._header
@@ -44,6 +56,13 @@ class TXTFileManager:
     def set_data(self, data: list[list[str]]) -> None:
         self._data = data
 
+    def set_dtypes(self, dtypes: dict[str, str]) -> None:
+        # Only the columns in the map are kept, all of them are read as strings if no map is set
+        self._dtypes = dtypes
+
+    def set_footer_prefix(self, footer_prefix: str) -> None:
+        self._footer_prefix = footer_prefix
+
     def _find_header_row(self, txt_content: list[list[str]]) -> int | None:
         for i, row in enumerate(txt_content):
             if row and row[0] == self._first_column_in_header:
@@ -68,70 +87,57 @@ class TXTFileManager:
         self._data = data
         return data
 
+    def _resolve_delimiter(self, row: list[str]) -> str:
+        # Guess the delimiter from the first row written if it wasn't set
+        if self._delimiter is None:
+            self._delimiter = "\t" if "\t" in row else ","
+        return self._delimiter
+
     def write_txt_file(self, file_path: str, mode: str="append_unique") -> None:
         file_exists = os.path.exists(file_path)
-        if file_exists and mode == "append_unique":
-            existing_data = self.read_txt_file(file_path)
-            new_data = [row for row in self._data if row not in existing_data]
-        else:
-            new_data = self._data
+        row_hash_index = get_row_hash_index(file_path, _read_txt_row_keys)
+        write_header = not file_exists or mode == "overwrite"
+        rows = [self._header] + self._data if write_header else self._data
+        if not rows:
+            return None
+        delimiter = self._resolve_delimiter(rows[0])
+        lines = [delimiter.join(row) for row in rows]
+        if mode == "append_unique":
+            # Only the lines whose hash isn't in the row hash index are appended
+            lines, row_hashes = row_hash_index.select_new_rows(lines, lines)
+        elif mode == "overwrite":
+            row_hash_index.reset()
+            row_hashes = [get_row_hash(line) for line in lines]
 
         with open(file_path, mode="w" if mode == "overwrite" else "a") as txt_file:
-            if not file_exists or mode == "overwrite":
-                if self._delimiter is None:
-                    self._delimiter = "\t" if "\t" in self._header else ","
-                txt_file.write(self._delimiter.join(self._header) + "\n")
-            for row in new_data:
-                if self._delimiter is None:
-                    self._delimiter = "\t" if "\t" in row else ","
-                txt_file.write(self._delimiter.join(row) + "\n")
+            for line in lines:
+                txt_file.write(line + "\n")
+        # Plain appends leave the index stale, it's rebuilt on the next unique append
+        if mode in ("append_unique", "overwrite"):
+            row_hash_index.record_rows(row_hashes)
     
     def append_unique_entry_to_txt_file(self, file_path: str, entry: list) -> None:
         file_exists = os.path.exists(file_path)
-        if file_exists:
-            existing_data = self.read_txt_file(file_path)
-            if entry not in existing_data:
-                with open(file_path, mode="a") as txt_file:
-                    if self._delimiter is None:
-                        self._delimiter = "\t" if "\t" in entry else ","
-                    txt_file.write(self._delimiter.join(entry) + "\n")
-        else:
-            with open(file_path, mode="w") as txt_file:
-                if self._delimiter is None:
-                    self._delimiter = "\t" if "\t" in entry else ","
-                txt_file.write(self._delimiter.join(entry) + "\n")
+        row_hash_index = get_row_hash_index(file_path, _read_txt_row_keys)
+        line = self._resolve_delimiter(entry).join(entry)
+        lines, row_hashes = row_hash_index.select_new_rows([line], [line])
+        if not lines:
+            return None
+        with open(file_path, mode="a" if file_exists else "w") as txt_file:
+            txt_file.write(line + "\n")
+        row_hash_index.record_rows(row_hashes)
     
     def read_txt_from_url(self, url: str) -> None:
-        # Read the TXT file from the URL
-        content = self._web_scraper.get_html_content_as_text(url)
-        # logging.debug(f"Content: {content}")
-        # Convert the TXT file to a list of lists
-        txt_file = io.StringIO(content)
-        # Read the TXT file into a list of lists
-        data = []
-        # logging.debug(f"Delimiter: {self._delimiter}")
-        for row in txt_file:
-            # logging.debug(f"Row: {row}")
-            row_data = row.strip().split(self._delimiter)
-            data.append(row_data)
-
-        # Find the header row
-        # logging.debug(f"First row in data: {data[0]}")
-        header_index = self._find_header_row(data)
-
-        # Check if the header row was found
-        if header_index is None:
-            raise ValueError(f"Header row with first column '{self._first_column_in_header}' not found.")
-        
-        # Remove all rows before the header row
-        if header_index > 0:
-            # logging.debug(f"Removing {header_index} rows before the header row.")
-            # logging.debug(f"Data: {data[:header_index]}")
-            data = data[header_index:]
-        self._header = data.pop(0)
-        self._data = data
-        # logging.debug(f"Header: {self._header}")
-        # logging.debug(f"Data: {data}")
+        if self._first_column_in_header is None:
+            raise ValueError("First column in header must be specified.")
+        # Stream the TXT file from the URL straight into the parser
+        stream = self._web_scraper.get_content_as_stream(url)
+        if stream is None:
+            raise ValueError(f"TXT file could not be retrieved from {url}.")
+        with stream:
+            self._dataframe = read_delimited_stream(stream, self._delimiter, self._first_column_in_header, self._dtypes, self._footer_prefix)
+        self._header = list(self._dataframe.columns)
+        logging.debug(f"Header: {self._header}")
 
     # def sort_data_by_column(self, column_name: str) -> None:
     #     column_index = self._header.index(column_name)
@@ -148,6 +154,9 @@ class TXTFileManager:
     #                 break
 
     def to_dataframe(self) -> pd.DataFrame:
+        # Files read from a URL are already parsed into a DataFrame
+        if self._dataframe is not None:
+            return self._dataframe
         df = pd.DataFrame(self._data, columns=self._header)
         return df
 
@@ -0,0 +1,70 @@
+# Purpose: Workbook Stream Loader module for streaming the worksheets of Excel workbooks (XLSX) into DataFrames without loading the whole workbook.
+
+# Standard Libraries
+from typing import Any, Iterator
+
+# Third-party Libraries
+import pandas as pd
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# Function to find the header row of a worksheet, the rows before it are consumed from the row iterator
+def _read_worksheet_header_row(rows: Iterator[tuple[Any, ...]], first_column_in_header: str) -> list[str] | None:
+    for row in rows:
+        if len(row) > 0 and isinstance(row[0], str) and row[0].strip() == first_column_in_header:
+            # Trailing empty header cells are formatting, not columns
+            header = list(row)
+            while len(header) > 0 and header[-1] is None:
+                header.pop()
+            return [str(cell).strip() if cell is not None else f"Unnamed: {i}" for i, cell in enumerate(header)]
+    return None
+
+
+# Function to parse the worksheets of a workbook into DataFrames of at most chunk_size rows, only one chunk is held in memory at a time
+# Every worksheet with a header row is read, the others (summaries, notes) are skipped. Cells keep the types stored in the workbook.
+def iter_workbook_chunks(file_path: str, first_column_in_header: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # openpyxl is only needed for Excel files, so it's imported here instead of for every import
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("openpyxl is needed to read Excel files, install it with 'pip install openpyxl'.") from e
+
+    # Read-only mode parses the worksheet XML as the rows are iterated instead of building every cell up front,
+    # data_only reads the values cached for formulas instead of the formulas
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        header_found = False
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            header = _read_worksheet_header_row(rows, first_column_in_header)
+            if header is None:
+                logging.debug(f"No header row with first column '{first_column_in_header}' in worksheet '{worksheet.title}', skipping it.")
+                continue
+            header_found = True
+            column_count = len(header)
+            chunk: list[tuple[Any, ...]] = []
+            for row in rows:
+                # Rows are cut or padded to the header, read-only worksheets don't always report their dimensions
+                row = row[:column_count] + (None,) * (column_count - len(row))
+                # Empty rows between sections or left by formatting aren't statement rows
+                if all(cell is None for cell in row):
+                    continue
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame.from_records(chunk, columns=header)
+                    chunk = []
+            if len(chunk) > 0:
+                yield pd.DataFrame.from_records(chunk, columns=header)
+        if not header_found:
+            raise ValueError(f"Header row with first column '{first_column_in_header}' not found in any worksheet.")
+    finally:
+        # Read-only workbooks keep the file open until they're closed
+        workbook.close()
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
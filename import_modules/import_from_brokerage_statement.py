@@ -0,0 +1,296 @@
+# Purpose: Import From Brokerage Statement module for importing brokerage statement exports into the asset_transaction table in chunks.
+
+# Type Checking
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+# Standard Libraries
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+# Third-party Libraries
+import numpy as np
+import pandas as pd
+
+# Local Modules
+from database_management.database import Database
+from database_management.schema.asset_dataclass import AssetTransactionBatch
+from import_modules.file_management.delimited_stream_loader import iter_delimited_stream_chunks
+from import_modules.file_management.workbook_stream_loader import iter_workbook_chunks
+
+# Local modules imported for Type Checking purposes only
+if TYPE_CHECKING:
+    from user_interface.user_input import UserInput
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Number of statement rows mapped, resolved and inserted together in a single transaction
+BROKERAGE_IMPORT_CHUNK_SIZE: int = 10000
+# Fields every mapped statement row needs, investment_account can also come from the profile's default
+REQUIRED_STATEMENT_FIELDS: list[str] = ["transaction_date", "transaction_type", "symbol", "quantity", "avg_price", "total"]
+
+
+# BrokerageMappingProfile dataclass for mapping the columns and values of a brokerage's statement export to the asset_transaction fields
+@dataclass(slots=True)
+class BrokerageMappingProfile:
+    # Brokerage the transactions are imported into, None for exports shared by several brokerages, the user is asked for it instead
+    brokerage_name: str | None
+    # First column of the header row, the lines above it (account details, titles) are skipped
+    first_column_in_header: str
+    # Statement column to asset_transaction field, the fields are transaction_date, transaction_type, symbol, investment_account,
+    # quantity, avg_price, total, transaction_fee and currency
+    columns: dict[str, str]
+    # Statement transaction types (lowercase) to transaction_type names, unmapped types are lowercased with spaces replaced by underscores
+    transaction_types: dict[str, str] = field(default_factory=dict)
+    # strptime format of the transaction dates, inferred if None
+    date_format: str | None = None
+    default_investment_account: str | None = None
+    default_currency: str | None = None
+
+
+# Mapping profiles of the supported brokerage statement exports, keyed by the name shown to the user
+BROKERAGE_MAPPING_PROFILES: dict[str, BrokerageMappingProfile] = {
+    # Columns named after the asset_transaction fields
+    "Generic": BrokerageMappingProfile(
+        brokerage_name=None,
+        first_column_in_header="transaction_date",
+        columns={"transaction_date": "transaction_date", "transaction_type": "transaction_type", "symbol": "symbol",
+                 "investment_account": "investment_account", "quantity": "quantity", "avg_price": "avg_price", "total": "total",
+                 "transaction_fee": "transaction_fee", "currency": "currency"}
+    ),
+    # Same fields as the Wealthsimple trade confirmation emails
+    "Wealthsimple": BrokerageMappingProfile(
+        brokerage_name="Wealthsimple",
+        first_column_in_header="Date (UTC)",
+        columns={"Date (UTC)": "transaction_date", "Type": "transaction_type", "Symbol": "symbol", "Account": "investment_account",
+                 "Quantity": "quantity", "Average price": "avg_price", "Total": "total", "Currency": "currency"},
+        transaction_types={"buy": "market_buy", "sell": "market_sell"}
+    )
+}
+
+
+# Function to parse statement amounts such as "$1,234.50" or "(12.00)", invalid amounts become NaN
+def _parse_amounts(values: pd.Series) -> pd.Series:
+    values = values.astype(str).str.strip()
+    amounts = pd.to_numeric(values, errors="coerce")
+    # Most amounts are plain numbers, only the others go through the regular expressions
+    needs_cleaning = amounts.isna() & (values != "")
+    if needs_cleaning.any():
+        formatted_values = values[needs_cleaning]
+        # Accounting exports write negative amounts in parentheses
+        formatted_values = formatted_values.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+        # Currency symbols, codes and thousands separators are dropped
+        amounts[needs_cleaning] = pd.to_numeric(formatted_values.str.replace(r"[^0-9.\-]", "", regex=True), errors="coerce")
+    return amounts
+
+
+# BrokerageStatementImporter class for mapping, resolving and inserting the rows of a brokerage statement one chunk at a time
+class BrokerageStatementImporter:
+    def __init__(self, database: Database, profile: BrokerageMappingProfile, brokerage_name: str | None=None,
+                 chunk_size: int=BROKERAGE_IMPORT_CHUNK_SIZE) -> None:
+        self._database = database
+        self._profile = profile
+        self._brokerage_name = brokerage_name if brokerage_name is not None else profile.brokerage_name
+        if self._brokerage_name is None:
+            raise ValueError("A brokerage name is needed for mapping profiles that don't name their brokerage.")
+        self._chunk_size = chunk_size
+        self._brokerage_id: int | None = None
+        # Reference tables, loaded once per import and joined against every chunk
+        self._assets: pd.DataFrame | None = None
+        self._transaction_type_ids: pd.Series | None = None
+        self._investment_account_ids: pd.Series | None = None
+
+    def _load_reference_tables(self) -> None:
+        brokerage_id = self._database.query_executor.get_brokerage_id_by_brokerage_name(self._brokerage_name)
+        if brokerage_id is None:
+            self._database.query_executor.insert_brokerage(self._brokerage_name)
+            logging.info(f"Brokerage {self._brokerage_name} not found. Inserted into the database.")
+            brokerage_id = self._database.query_executor.get_brokerage_id_by_brokerage_name(self._brokerage_name)
+        if brokerage_id is None:
+            raise ValueError(f"Brokerage {self._brokerage_name} could not be inserted.")
+        self._brokerage_id = brokerage_id
+        self._assets = pd.DataFrame(self._database.query_executor.get_asset_symbols_with_currency_iso_codes(),
+                                    columns=["asset_id", "symbol", "asset_currency", "is_delisted"])
+        transaction_types = self._database.query_executor.get_transaction_types()
+        self._transaction_type_ids = pd.Series({name: transaction_type_id for transaction_type_id, name in transaction_types}, dtype="float64")
+        self._load_investment_account_ids()
+
+    def _load_investment_account_ids(self) -> None:
+        # Investment account names are unique, an account already held at another brokerage is the same account
+        investment_accounts = self._database.query_executor.get_investment_accounts()
+        self._investment_account_ids = pd.Series({name: investment_account_id for investment_account_id, name in investment_accounts}, dtype="float64")
+
+    def _map_chunk(self, df_statement: pd.DataFrame) -> pd.DataFrame:
+        # Rename the profile's columns to the asset_transaction fields and drop the others
+        df = df_statement[[column for column in self._profile.columns if column in df_statement.columns]].rename(columns=self._profile.columns)
+        missing_fields = [field_name for field_name in REQUIRED_STATEMENT_FIELDS if field_name not in df.columns]
+        if len(missing_fields) > 0:
+            raise ValueError(f"Statement is missing the columns for {missing_fields} of the mapping profile.")
+        df = df.reset_index(drop=True)
+
+        df["symbol"] = df["symbol"].astype(str).str.strip().str.upper()
+        transaction_types = df["transaction_type"].astype(str).str.strip().str.lower()
+        df["transaction_type"] = transaction_types.map(self._profile.transaction_types).fillna(transaction_types.str.replace(" ", "_"))
+        if "investment_account" not in df.columns:
+            df["investment_account"] = self._profile.default_investment_account
+        # Same naming as the email import, so both imports share the same investment accounts
+        df["investment_account"] = df["investment_account"].astype("string").str.strip().str.lower().str.replace(" ", "_").replace("", pd.NA)
+        if "currency" not in df.columns:
+            df["currency"] = self._profile.default_currency
+        df["currency"] = df["currency"].astype("string").str.strip().str.upper().replace("", pd.NA)
+
+        dates = pd.to_datetime(df["transaction_date"], format=self._profile.date_format, errors="coerce", utc=True)
+        df["transaction_date"] = dates.dt.strftime("%Y-%m-%d")
+        # Sells and fees are negative in some exports, the transaction type carries the direction
+        for amount_field in ("quantity", "avg_price", "total"):
+            df[amount_field] = _parse_amounts(df[amount_field]).abs()
+        df["transaction_fee"] = _parse_amounts(df["transaction_fee"]).abs().fillna(0.0) if "transaction_fee" in df.columns else 0.0
+        return df
+
+    def _resolve_asset_ids(self, df: pd.DataFrame) -> pd.Series:
+        # Join every row against every listing with its symbol
+        matches = pd.DataFrame({"row": np.arange(len(df)), "symbol": df["symbol"], "currency": df["currency"]}).merge(self._assets, on="symbol") # type: ignore
+        matches["is_currency_match"] = (matches["asset_currency"] == matches["currency"]).fillna(False).astype(bool)
+        matches["is_listed"] = ~matches["is_delisted"].fillna(False).astype(bool)
+        # Rows with several listings keep the ones trading in the transaction's currency, then the ones still listed,
+        # each preference only applies to the rows with at least one candidate satisfying it (e.g. not to a blank currency)
+        for preference_column in ("is_currency_match", "is_listed"):
+            has_preferred_match = matches.groupby("row")[preference_column].transform("any")
+            matches = matches[matches[preference_column] | ~has_preferred_match]
+        # Rows still matching several listings are ambiguous and left unresolved
+        matches = matches[matches["row"].map(matches["row"].value_counts()) == 1]
+        return pd.Series(matches["asset_id"].to_numpy(), index=matches["row"].to_numpy(), dtype="float64").reindex(np.arange(len(df)))
+
+    def _resolve_investment_account_ids(self, df: pd.DataFrame) -> pd.Series:
+        # New accounts are inserted together, once per chunk
+        account_names = df["investment_account"].dropna().unique()
+        new_account_names = [name for name in account_names if name not in self._investment_account_ids.index] # type: ignore
+        if len(new_account_names) > 0:
+            self._database.query_executor.insert_investment_accounts(self._brokerage_id, new_account_names) # type: ignore
+            logging.info(f"Investment accounts {new_account_names} not found. Inserted into the database.")
+            self._load_investment_account_ids()
+            # The names are unique across users, an ignored insert means another user already has the account
+            ignored_account_names = [name for name in new_account_names if name not in self._investment_account_ids.index] # type: ignore
+            if len(ignored_account_names) > 0:
+                raise ValueError(f"Investment accounts {ignored_account_names} could not be inserted, the names are already used by another user.")
+        return df["investment_account"].map(self._investment_account_ids).astype("float64")
+
+    def _resolve_chunk(self, df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+        # Returns the resolved rows and the rejection reason of every rejected row
+        df["asset_id"] = self._resolve_asset_ids(df).to_numpy()
+        df["transaction_type_id"] = df["transaction_type"].map(self._transaction_type_ids).astype("float64")
+        df["investment_account_id"] = self._resolve_investment_account_ids(df).to_numpy()
+
+        rejection_reasons = pd.Series(pd.NA, index=df.index, dtype="string")
+        # The first failing check of each row is its reason
+        for reason, is_rejected in reversed([
+            ("invalid date", df["transaction_date"].isna()),
+            ("invalid amount", df[["quantity", "avg_price", "total"]].isna().any(axis=1)),
+            ("unknown or ambiguous symbol", df["asset_id"].isna()),
+            ("unknown transaction type", df["transaction_type_id"].isna()),
+            ("missing investment account", df["investment_account_id"].isna())
+        ]):
+            rejection_reasons[is_rejected] = reason
+        return df[rejection_reasons.isna()], rejection_reasons.dropna()
+
+    def _insert_chunk(self, df: pd.DataFrame, imported_from: str) -> int:
+        df_transactions = pd.DataFrame({
+            "user_id": self._database.session_manager.get_current_user_id(),
+            "asset_id": df["asset_id"].astype("int64").to_numpy(),
+            "transaction_type_id": df["transaction_type_id"].astype("int64").to_numpy(),
+            "brokerage_id": self._brokerage_id,
+            "investment_account_id": df["investment_account_id"].astype("int64").to_numpy(),
+            "quantity": df["quantity"].to_numpy(),
+            "avg_price": df["avg_price"].to_numpy(),
+            "total": df["total"].to_numpy(),
+            "transaction_fee": df["transaction_fee"].to_numpy(),
+            "transaction_date": df["transaction_date"].to_numpy(dtype=object),
+            "imported_from": imported_from,
+            "import_date": datetime.now(timezone.utc).isoformat()
+        })
+        # The whole chunk is inserted in one transaction, already imported transactions are ignored by their fingerprint
+        return self._database.query_executor.insert_asset_transactions(AssetTransactionBatch.from_dataframe(df_transactions))
+
+    def import_chunks(self, statement_chunks: Iterable[pd.DataFrame], imported_from: str) -> dict[str, int]:
+        # Shared by every statement format, each chunk only needs the profile's columns, with the cells as read from the file
+        if self._assets is None:
+            self._load_reference_tables()
+        summary = {"rows": 0, "inserted": 0, "duplicates": 0, "rejected": 0}
+        rejection_counts: dict[str, int] = {}
+        for df_statement in statement_chunks:
+            df_resolved, rejection_reasons = self._resolve_chunk(self._map_chunk(df_statement))
+            inserted_count = self._insert_chunk(df_resolved, imported_from) if len(df_resolved) > 0 else 0
+            summary["rows"] += len(df_statement)
+            summary["inserted"] += inserted_count
+            summary["duplicates"] += len(df_resolved) - inserted_count
+            summary["rejected"] += len(rejection_reasons)
+            for reason, count in rejection_reasons.value_counts().items():
+                rejection_counts[str(reason)] = rejection_counts.get(str(reason), 0) + int(count)
+            print(f"{summary['rows']} rows processed, {summary['inserted']} transactions inserted.")
+        if len(rejection_counts) > 0:
+            logging.warning(f"Rejected statement rows by reason: {rejection_counts}")
+        logging.info(f"Brokerage statement import from {imported_from} finished: {summary}")
+        return summary
+
+    def import_csv_file(self, file_path: str, delimiter: str=",") -> dict[str, int]:
+        # The file is streamed, only one chunk of rows is parsed and held in memory at a time
+        with open(file_path, mode="rb") as csv_file:
+            # utf-8-sig drops the byte order mark spreadsheet programs put at the start of exported files
+            statement_chunks = iter_delimited_stream_chunks(csv_file, delimiter, self._profile.first_column_in_header, self._chunk_size, "utf-8-sig")
+            return self.import_chunks(statement_chunks, "csv")
+
+    def import_excel_file(self, file_path: str) -> dict[str, int]:
+        # Every worksheet with the profile's header row is streamed in read-only mode, one chunk of rows at a time
+        statement_chunks = iter_workbook_chunks(file_path, self._profile.first_column_in_header, self._chunk_size)
+        return self.import_chunks(statement_chunks, "excel")
+
+
+# Function to prompt the user for the mapping profile of the brokerage statement
+def _select_brokerage_mapping_profile(user_input: UserInput) -> BrokerageMappingProfile:
+    profile_names = list(BROKERAGE_MAPPING_PROFILES)
+    for i, profile_name in enumerate(profile_names, start=1):
+        print(f"{i}: {profile_name}")
+    choice = user_input.get_valid_menu_choice(len(profile_names), "Choose the brokerage of the statement (0 for Generic): ")
+    return BROKERAGE_MAPPING_PROFILES[profile_names[choice - 1]] if choice > 0 else BROKERAGE_MAPPING_PROFILES["Generic"]
+
+
+# Function to prompt the user for a brokerage statement file and import it with the chosen mapping profile
+def _import_statement_file(database: Database, file_type: str) -> int:
+    # Import the UserInput class here to avoid circular import
+    from user_interface.user_input import UserInput
+    file_path = input(f"Enter the path of the {file_type} file: ").strip().strip("\"'")
+    if not os.path.isfile(file_path):
+        print(f"File {file_path} not found.")
+        return 1
+    profile = _select_brokerage_mapping_profile(UserInput())
+    # Prompt the user for the brokerage if the profile doesn't name it
+    brokerage_name = profile.brokerage_name
+    if brokerage_name is None:
+        brokerage_name = input("Enter the brokerage name: ").strip()
+        if brokerage_name == "":
+            print("No brokerage name entered.")
+            return 1
+    importer = BrokerageStatementImporter(database, profile, brokerage_name)
+    summary = importer.import_excel_file(file_path) if file_type == "Excel" else importer.import_csv_file(file_path)
+    print(f"Import complete! {summary['inserted']} transactions inserted, {summary['duplicates']} already imported, "
+          f"{summary['rejected']} rows rejected out of {summary['rows']}.")
+    return 0
+
+
+# Function to import a brokerage statement CSV file chosen by the user
+def import_from_csv_file(database: Database) -> int:
+    return _import_statement_file(database, "CSV")
+
+
+# Function to import a brokerage statement Excel file chosen by the user
+def import_from_excel_file(database: Database) -> int:
+    return _import_statement_file(database, "Excel")
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
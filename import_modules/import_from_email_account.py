@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING
 # Standard Libraries
 import email
 import imaplib
+import re
 from datetime import datetime, timezone
 
 # Third-party Libraries
@@ -15,14 +16,14 @@ from html.parser import HTMLParser
 
 # Local Modules
 from database_management.database import Database
-from database_management.schema.asset_dataclass import AssetInfoWithNames, AssetInfoWithIDs, AssetTransaction
+from database_management.schema.asset_dataclass import AssetInfoWithNames, AssetInfoWithIDs, AssetTransaction, AssetTransactionBatch
 from account_management.account_operations import UserAccountOperation, EmailAccountOperation
 from access_management.account_authenticator import AccountAuthenticator
 from import_modules.web_scraper import WebScraper
 
 # Local modules imported for Type Checking purposes only
 if TYPE_CHECKING:
-    from account_management.accounts import UserAccount, EmailAccount
+    from account_management.accounts import UserAccount, EmailAccount, EmailFolderSyncState
 
 # Configure logging
 import logging
@@ -30,14 +31,20 @@ import logging
 
 # Global variables
 last_uid_cache: int | None = None
+# Number of processed emails to accumulate before committing their transactions and UID checkpoint together
+EMAIL_IMPORT_BATCH_SIZE: int = 100
 
     
 # Class to handle IMAP connection and login
 class IMAPClient:
-    def __init__(self, email_address: str, email_account_password_hash: bytes) -> None:
+    def __init__(self, email_address: str, email_account_password_hash: bytes, server_address: tuple[str, int] | None=None) -> None:
         self.email_address = email_address
         self.email_account_password_hash = email_account_password_hash
+        # Optional (host, port) of a plain IMAP server to use instead of the email service provider, e.g. a local stand-in server
+        self.server_address = server_address
         self.mail = None
+        self.selected_folder: str | None = None
+        self.condstore_supported: bool | None = None
         self.server_hosts = {
             "outlook": "outlook.office365.com",
             "gmail": "imap.gmail.com",
@@ -46,12 +53,31 @@ class IMAPClient:
             "icloud": "imap.mail.me.com"
         }
 
+    def get_server_host(self) -> str | None:
+        if self.server_address is not None:
+            return self.server_address[0]
+        # Get the IMAP server host from the email address, None if the email service provider isn't supported
+        email_service_host = self.email_address.split("@")[-1].split(".")[0]
+        return self.server_hosts.get(email_service_host)
+
     def email_login(self) -> imaplib.IMAP4_SSL | None:
         # Need to check if email address and password are None for decode() to work
         if self.email_address is None or self.email_account_password_hash is None:
             print("Please set email account first.")
             return None
 
+        # Connect to the given server without SSL, it's only used for local servers
+        if self.server_address is not None:
+            try:
+                self.mail = imaplib.IMAP4(*self.server_address)
+                self.mail.login(self.email_address, self.email_account_password_hash.decode())
+                self.condstore_supported = None
+                return self.mail
+            except imaplib.IMAP4.error:
+                print("Failed to login. Please check your credentials.")
+                self.mail = None
+                return None
+
         # Get the email type from the email address
         email_service_host = self.email_address.split("@")[-1].split(".")[0]
         if email_service_host not in self.server_hosts:
@@ -61,6 +87,8 @@ class IMAPClient:
             try:
                 self.mail = imaplib.IMAP4_SSL(self.server_hosts[email_service_host])
                 self.mail.login(self.email_address, self.email_account_password_hash.decode())
+                # Capabilities can change after login, so they're checked again on first use
+                self.condstore_supported = None
                 return self.mail
             except imaplib.IMAP4.error:
                 print("Failed to login. Please check your credentials.")
@@ -98,6 +126,7 @@ class IMAPClient:
         if self.mail is not None:
             try:
                 typ, data = self.mail.select(folder_name)
+                self.selected_folder = folder_name
                 return data[0]
             except imaplib.IMAP4.abort:
                 print("Failed to select folder. Attempting re-login...")
@@ -110,6 +139,39 @@ class IMAPClient:
             print("Please login first.")
             return None
 
+    # Method to check whether the server supports CONDSTORE, which reports a folder's HIGHESTMODSEQ
+    def supports_condstore(self) -> bool:
+        if self.mail is None:
+            return False
+        if self.condstore_supported is None:
+            # Servers often only advertise CONDSTORE once logged in, so ask again instead of using the greeting capabilities
+            typ, capability_data = self.mail.capability()
+            self.condstore_supported = typ == "OK" and b"CONDSTORE" in capability_data[0].upper().split()
+        return self.condstore_supported
+
+    # Method to get the UIDNEXT, UIDVALIDITY and HIGHESTMODSEQ of a folder with a single STATUS command
+    def get_folder_status(self, folder_name: str) -> dict[str, int]:
+        if self.mail is not None:
+            try:
+                status_items = "UIDNEXT UIDVALIDITY HIGHESTMODSEQ" if self.supports_condstore() else "UIDNEXT UIDVALIDITY"
+                typ, status_data = self.mail.status(folder_name, f"({status_items})")
+                if typ != "OK" or status_data[0] is None:
+                    logging.info(f"Error getting folder status, typ: {typ}")
+                    return {}
+                # The response looks like: "INBOX" (UIDNEXT 43 UIDVALIDITY 1 HIGHESTMODSEQ 9021)
+                status_items_data = status_data[0].rsplit(b"(", 1)[-1] # type: ignore
+                return {item.decode(): int(value) for item, value in re.findall(rb"([A-Z]+) (\d+)", status_items_data)}
+            except imaplib.IMAP4.abort:
+                print("Failed to get folder status. Attempting re-login...")
+                self.mail.logout()
+                self.mail = self.email_login()
+                if self.mail is None:
+                    return {}
+                return self.get_folder_status(folder_name)
+        else:
+            print("Please login first.")
+            return {}
+
     # Method to search for emails in a folder
     def search_emails(self, search_query: str) -> list:
         if self.mail is not None:
@@ -127,6 +189,34 @@ class IMAPClient:
             print("Please login first.")
             return []
 
+    # Method to fetch several emails from the selected folder in a single round trip
+    def fetch_emails(self, uids: list[bytes]) -> list[tuple[int, bytes]]:
+        if self.mail is not None:
+            try:
+                typ, fetch_data = self.mail.uid("FETCH", b",".join(uids).decode(), "(UID RFC822)")
+                if typ != "OK":
+                    logging.info(f"Error fetching emails, typ: {typ}")
+                    return []
+                # The response interleaves (envelope, message) tuples with closing b")" entries
+                emails = []
+                for response_part in fetch_data:
+                    if isinstance(response_part, tuple):
+                        uid_match = re.search(rb"UID (\d+)", response_part[0])
+                        if uid_match is not None:
+                            emails.append((int(uid_match.group(1)), response_part[1]))
+                return sorted(emails)
+            except imaplib.IMAP4.abort:
+                print("Failed to fetch emails. Attempting re-login...")
+                self.mail.logout()
+                self.mail = self.email_login()
+                if self.mail is None or self.selected_folder is None:
+                    return []
+                self.select_folder(self.selected_folder)
+                return self.fetch_emails(uids)
+        else:
+            print("Please login first.")
+            return []
+
 
 # Function to extract the data from the email body
 def extract_from_email(data: dict, email_body) -> pd.DataFrame:
@@ -235,16 +325,104 @@ class MyHTMLParser(HTMLParser):
         self.text += data
 
 
+# Function to parse a raw RFC822 email into transaction data, returns None if the email isn't a transaction email
+def parse_transaction_email(raw_email: bytes) -> pd.DataFrame | None:
+    # Parse the email
+    email_message = email.message_from_bytes(raw_email)
+
+    # Get the date
+    date = email_message.get("Date")
+
+    # Extract the body of the email based on the content type
+    body = ""
+    if email_message.get_content_type() == "text/plain":
+        # Get the charset of the email
+        charset = email_message.get_content_charset()
+        # Decode the email body
+        body = email_message.get_payload(decode=True).decode(charset) # type: ignore
+    elif email_message.get_content_type() == "text/html":
+        # Get the charset of the email
+        charset = email_message.get_content_charset()
+        # Decode the email body
+        html = email_message.get_payload(decode=True).decode(charset) # type: ignore
+        # Use an HTML parser to extract the text from the HTML content
+        parser = MyHTMLParser()
+        parser.feed(html)
+        body = parser.text
+    elif email_message.get_content_type() == "multipart/alternative":
+        for part in email_message.walk():
+            if part.get_content_type() == "text/plain":
+                # Get the charset of the email
+                charset = part.get_content_charset()
+                # Decode the email body
+                body = part.get_payload(decode=True).decode(charset) # type: ignore
+                break
+
+    # Check if the email subject matches one of the subject titles
+    subject = email_message["Subject"]
+
+    # Check if the email is a crypto or security email
+    if ("order" and "filled") in subject.lower():
+        logging.debug(f"Email subject matched 'order' and 'filled': {subject}")
+        logging.debug(f"Email body: {body}")
+        # Specify the desired order of the keys and initialize their values
+        data = {"Date (UTC)" : date, "Account" : "", "Type" : "", "Symbol" : "", "Quantity" : "", "Average price" : ""}
+        # Extract the data from the email body
+        return extract_from_email(data, body)
+    # Check if the email is a dividend email
+    elif ("You" and "a dividend") in subject.lower():
+        # Specify the desired order of the keys and initialize their values
+        data = {"Date (UTC)" : date, "Account" : "", "Type" : "dividend", "Symbol" : "", "Quantity" : "", "Average price" : "", "Amount" : ""}
+        # Extract the data from the email body
+        return extract_from_email(data, body)
+    else:
+        logging.info(f"Email subject did not match any of the expected subjects: {subject}")
+        return None
+
+
+# Function to decide how a folder needs to be synced by comparing its stored sync state with its current STATUS
+def plan_folder_sync(sync_state: EmailFolderSyncState | None, folder_status: dict[str, int]) -> str:
+    # Never synced before, every email in the folder needs to be imported
+    if sync_state is None:
+        return "full"
+    # A new UIDVALIDITY means the stored last UID no longer refers to the same email, so the folder is synced again from the start
+    uid_validity = folder_status.get("UIDVALIDITY")
+    if sync_state.uid_validity is not None and uid_validity is not None and uid_validity != sync_state.uid_validity:
+        return "resync"
+    # UIDs were assigned after the last processed email, they still need to be imported whatever HIGHESTMODSEQ says
+    if "UIDNEXT" in folder_status and folder_status["UIDNEXT"] > sync_state.last_uid + 1:
+        return "incremental"
+    # An unchanged HIGHESTMODSEQ means nothing in the folder changed since the last sync
+    if sync_state.uid_validity is not None and sync_state.highest_modseq is not None and folder_status.get("HIGHESTMODSEQ") == sync_state.highest_modseq:
+        return "unchanged"
+    # Without CONDSTORE, no new UIDs were assigned since the last processed email
+    if "UIDNEXT" in folder_status:
+        return "unchanged"
+    return "incremental"
+
+
 # AssetTransactionManager class for appending asset transactions, converting to DataFrame so they can be imported into the database
 class AssetTransactionManager:
     def __init__(self, database: Database):
         self._database = database
+        self._investment_account_ids: dict[tuple[int, str], int] = {}
+        self._asset_info_by_symbol: dict[str, list[tuple] | None] = {}
+        self._currency_ids: dict[str, int | None] = {}
+        self._transaction_type_ids: dict[str, int | None] = {}
+        self._pending_asset_transactions: list[AssetTransaction] = []
+        self._pending_last_uid: int | None = None
+        self._pending_email_count: int = 0
+        self._uid_validity: int | None = None
+        self._highest_modseq: int | None = None
 
     def get_asset_id(self, asset_symbol: str) -> int | None:
         return self._database.query_executor.get_asset_id_by_asset_symbol(asset_symbol)
 
     def get_transaction_type_id(self, transaction_type: str) -> int | None:
-        return self._database.query_executor.get_transaction_type_id_by_transaction_type_name(transaction_type)
+        # Check the cache first, every email has a transaction type and there are only a handful of them
+        if transaction_type not in self._transaction_type_ids:
+            self._transaction_type_ids[transaction_type] = self._database.query_executor.get_transaction_type_id_by_transaction_type_name(transaction_type)
+        return self._transaction_type_ids[transaction_type]
 
     def get_brokerage_id_or_insert(self, brokerage_name: str) -> int | None:
         brokerage_id = self._database.query_executor.get_brokerage_id_by_brokerage_name(brokerage_name)
@@ -256,24 +434,96 @@ class AssetTransactionManager:
         return brokerage_id
 
     def get_investment_account_id_or_insert(self, brokerage_id: int, investment_account_name: str) -> int | None:
+        # Check the cache first, investment accounts are resolved once per import
+        if (brokerage_id, investment_account_name) in self._investment_account_ids:
+            return self._investment_account_ids[(brokerage_id, investment_account_name)]
         investment_account_id = self._database.query_executor.get_investment_account_id_by_investment_account_name(brokerage_id, investment_account_name)
         if investment_account_id is None:
             self._database.query_executor.insert_investment_account(brokerage_id, investment_account_name)
             print(f"Investment account {investment_account_name.lower().replace(' ', '_')} not found. Inserted into the database.")
             logging.info(f"Investment account {investment_account_name.lower().replace(' ', '_')} not found. Inserted into the database.")
         investment_account_id = self._database.query_executor.get_investment_account_id_by_investment_account_name(brokerage_id, investment_account_name)
+        if investment_account_id is not None:
+            self._investment_account_ids[(brokerage_id, investment_account_name)] = investment_account_id
         return investment_account_id
 
     def find_asset_info(self, symbol: str) -> list[tuple] | None:
-        query = f"SELECT * FROM asset_info WHERE symbol = '{symbol}'"
-        asset_info = self._database.query_executor.execute_query(query)
-        return asset_info
+        # Check the cache first, the same symbols show up in many emails
+        if symbol not in self._asset_info_by_symbol:
+            self._asset_info_by_symbol[symbol] = self._database.query_executor.get_asset_info_by_asset_symbol(symbol)
+        return self._asset_info_by_symbol[symbol]
+
+    def get_currency_id(self, currency_iso_code: str) -> int | None:
+        if currency_iso_code not in self._currency_ids:
+            self._currency_ids[currency_iso_code] = self._database.query_executor.get_currency_id_by_currency_iso_code(currency_iso_code)
+        return self._currency_ids[currency_iso_code]
+
+    def select_asset_info_by_currency(self, asset_info: list[tuple], currency_iso_code: str) -> tuple | None:
+        # Resolve multiple exchange listings with the same symbol by their exchange currency, None if still ambiguous
+        currency_id = self.get_currency_id(currency_iso_code)
+        # asset[8] is the exchange_currency_id
+        matches = [asset for asset in asset_info if asset[8] == currency_id]
+        return matches[0] if len(matches) == 1 else None
+
+    def create_asset_transaction(self, df_data: pd.DataFrame, asset_id: int, transaction_type_id: int, brokerage_id: int, investment_account_id: int) -> AssetTransaction:
+        return AssetTransaction(
+            user_id=self._database.session_manager.get_current_user_id(),
+            asset_id=asset_id,
+            transaction_type_id=transaction_type_id,
+            brokerage_id=brokerage_id,
+            investment_account_id=investment_account_id,
+            quantity=df_data["quantity"].iloc[0],
+            avg_price=df_data["avg_price"].iloc[0],
+            total=df_data["total"].iloc[0],
+            transaction_fee=df_data["transaction_fee"].iloc[0] if "transaction_fee" in df_data else 0.00,
+            transaction_date=df_data["transaction_date"].iloc[0].isoformat(),
+            imported_from="email",
+            import_date=datetime.now(timezone.utc).isoformat()
+        )
 
     def insert_asset_transaction_to_database(self, asset_transaction: AssetTransaction) -> None:
-        # Convert the asset transaction to a dictionary
-        asset_transaction_dict = asset_transaction.to_dict()
-        # Insert asset transaction into the database
-        self._database.query_executor.dictionary_to_existing_sql_table(asset_transaction_dict, "asset_transaction")
+        # Insert asset transaction into the database, ignored if it was already imported
+        self._database.query_executor.insert_asset_transactions(AssetTransactionBatch.from_records([asset_transaction]))
+
+    def set_folder_sync_state(self, folder_status: dict[str, int]) -> None:
+        # The folder's UIDVALIDITY and HIGHESTMODSEQ are recorded with every UID checkpoint
+        self._uid_validity = folder_status.get("UIDVALIDITY")
+        self._highest_modseq = folder_status.get("HIGHESTMODSEQ")
+
+    def append_asset_transaction(self, asset_transaction: AssetTransaction) -> None:
+        # Hold the transaction until the next commit, together with the UID of the email it came from
+        self._pending_asset_transactions.append(asset_transaction)
+
+    def checkpoint_uid(self, uid: int) -> None:
+        # Record the UID of the last fully processed email, it's only written to the database on commit
+        self._pending_last_uid = uid
+        self._pending_email_count += 1
+
+    def refresh_folder_sync_state(self, sync_state: EmailFolderSyncState, email_id: int, folder_name: str) -> None:
+        # Nothing to record if the folder's UIDVALIDITY and HIGHESTMODSEQ are already stored
+        if sync_state.uid_validity == self._uid_validity and sync_state.highest_modseq == self._highest_modseq:
+            return None
+        # Record the new state against the same last UID, so the next sync of the unchanged folder stops at the STATUS command
+        self.checkpoint_uid(sync_state.last_uid)
+        self.commit_pending_asset_transactions(email_id, folder_name, sync_complete=True)
+
+    def get_pending_email_count(self) -> int:
+        return self._pending_email_count
+
+    def commit_pending_asset_transactions(self, email_id: int, folder_name: str, sync_complete: bool=False) -> int:
+        # Nothing to commit if no emails were processed since the last commit
+        if self._pending_last_uid is None:
+            return 0
+        # HIGHESTMODSEQ is only recorded once every email up to the STATUS snapshot was processed, a batch, failed or interrupted sync
+        # recording it would make the next sync see an unchanged folder and never import the remaining emails
+        highest_modseq = self._highest_modseq if sync_complete else None
+        # Commit the pending transactions and the advanced UID checkpoint in one database transaction, already imported transactions are ignored
+        inserted_count = self._database.query_executor.insert_asset_transactions_and_last_uid(AssetTransactionBatch.from_records(self._pending_asset_transactions), email_id, folder_name, self._pending_last_uid,
+            self._uid_validity, highest_modseq)
+        self._pending_asset_transactions = []
+        self._pending_last_uid = None
+        self._pending_email_count = 0
+        return inserted_count
 
 
 # TODO - make this function a class object???
@@ -355,6 +605,12 @@ def import_from_email_account(database: Database) -> int:
         print("Failed to get brokerage ID.")
         return 1
 
+    # Get the ID of the import email account, used for the UID checkpoints
+    email_id = database.query_executor.get_import_email_id_by_email_address(selected_import_email_account.address)
+    if email_id is None:
+        print("Failed to get email account ID.")
+        return 1
+
     print(f"Scanning '{brokerage_name}' emails from '{selected_import_email_account.address}' in the '{folder_name}' folder...")
 
 
@@ -366,11 +622,23 @@ def import_from_email_account(database: Database) -> int:
     # csv_file_crypto = "./old_data/ws-crypto.csv"
 
 
-    # Get the UID of the last email in the selected folder
-    last_uid = database.query_executor.get_last_uid_by_email_address_and_folder_name(selected_import_email_account.address, folder_name)
-    last_uid_cache = last_uid
+    # Compare the folder's stored sync state with its current status
+    sync_state = database.query_executor.get_email_folder_sync_state(email_id, folder_name)
+    folder_status = imap_client.get_folder_status(folder_name)
+    sync_mode = plan_folder_sync(sync_state, folder_status)
+    asset_transaction_manager.set_folder_sync_state(folder_status)
+
+    if sync_mode == "unchanged" and sync_state is not None:
+        asset_transaction_manager.refresh_folder_sync_state(sync_state, email_id, folder_name)
+        print("No new emails to process.")
+        mail.logout()
+        return 0
+    if sync_mode == "resync":
+        print(f"The '{folder_name}' folder was reset by the email server (UIDVALIDITY changed), scanning all emails again. Already imported transactions are ignored.")
+        logging.info(f"UIDVALIDITY changed for folder '{folder_name}', resyncing. Stored state: {sync_state}, current status: {folder_status}")
 
     # Search for emails with a UID greater than the last processed email in the selected folder
+    last_uid_cache = sync_state.last_uid if sync_mode == "incremental" and sync_state is not None else None
     if last_uid_cache is not None:
         search_query = f"UID {int(last_uid_cache) + 1}:*"
     else:
@@ -382,8 +650,12 @@ def import_from_email_account(database: Database) -> int:
         return 1
 
     for num in search_data:
-        if num.decode("utf-8") == last_uid_cache:
+        # "UID n:*" always matches the newest email, even when it was already processed
+        if last_uid_cache is not None and int(num) <= int(last_uid_cache):
             continue
+        # Commit the accumulated transactions and UID checkpoint once a full batch of emails has been processed
+        if asset_transaction_manager.get_pending_email_count() >= EMAIL_IMPORT_BATCH_SIZE:
+            asset_transaction_manager.commit_pending_asset_transactions(email_id, folder_name)
         # Get the email
         try:
             # RFC822 is a standard format for text messages that are sent using the Internet.
@@ -398,6 +670,7 @@ def import_from_email_account(database: Database) -> int:
         except imaplib.IMAP4.abort:
             mail = imap_client.email_login()
             if mail is None:
+                asset_transaction_manager.commit_pending_asset_transactions(email_id, folder_name)
                 return 1
             typ, data = mail.uid("FETCH", num, "(RFC822)")
 
@@ -419,69 +692,12 @@ def import_from_email_account(database: Database) -> int:
             logging.info(f"Error fetching email, data[0] is None")
             continue
 
-        # Parse the email
-        email_message = email.message_from_bytes(data[0][1]) # type: ignore
-
-        # Get the date
-        date = email_message.get("Date")
-
-        # Extract the body of the email based on the content type
-        body = ""
-        if email_message.get_content_type() == "text/plain":
-            # Get the charset of the email
-            charset = email_message.get_content_charset()
-            # Decode the email body
-            body = email_message.get_payload(decode=True).decode(charset)
-        elif email_message.get_content_type() == "text/html":
-            # Get the charset of the email
-            charset = email_message.get_content_charset()
-            # Decode the email body
-            html = email_message.get_payload(decode=True).decode(charset)
-            # Use an HTML parser to extract the text from the HTML content
-            parser = MyHTMLParser()
-            parser.feed(html)
-            body = parser.text
-        elif email_message.get_content_type() == "multipart/alternative":
-            for part in email_message.walk():
-                if part.get_content_type() == "text/plain":
-                    # Get the charset of the email
-                    charset = part.get_content_charset()
-                    # Decode the email body
-                    body = part.get_payload(decode=True).decode(charset)
-                    break
-
-        # Check if the email subject matches one of the subject titles
-        subject = email_message["Subject"]
-
-        # Initialize the raw_data dictionary and df_data DataFrame
-        data = {}
-        df_data = pd.DataFrame()
-
-        # Add the brokerage ID to the data dictionary
-        data["brokerage_id"] = brokerage_id
-
-        # Check if the email is a crypto or security email
-        if ("order" and "filled") in subject.lower():
-            logging.debug(f"Email subject matched 'order' and 'filled': {subject}")
-            logging.debug(f"Email body: {body}")
-            # Specify the desired order of the keys and initialize their values
-            data = {"Date (UTC)" : date, "Account" : "", "Type" : "", "Symbol" : "", "Quantity" : "", "Average price" : ""}
-            # Extract the data from the email body
-            df_data = extract_from_email(data, body)
-        # Check if the email is a dividend email
-        elif ("You" and "a dividend") in subject.lower():
-            # Specify the desired order of the keys and initialize their values
-            data = {"Date (UTC)" : date, "Account" : "", "Type" : "dividend", "Symbol" : "", "Quantity" : "", "Average price" : "", "Amount" : ""}
-            # Extract the data from the email body
-            df_data = extract_from_email(data, body)
-        else:
-            logging.info(f"Email subject did not match any of the expected subjects: {subject}")
-            # Save the UID of the last processed email to a file
+        # Parse the email into the extracted transaction data
+        df_data = parse_transaction_email(data[0][1]) # type: ignore
+        if df_data is None:
+            # Checkpoint the UID of the last processed email
             last_uid_cache = num.decode("utf-8")
-
-            # Update the last processed email UID in the database
-            if last_uid_cache is not None:
-                database.query_executor.insert_uid_by_email_address_and_folder_name(selected_import_email_account.address, folder_name, last_uid_cache)
+            asset_transaction_manager.checkpoint_uid(int(last_uid_cache))
             continue
 
         # Check the database for the account type
@@ -496,25 +712,18 @@ def import_from_email_account(database: Database) -> int:
         if asset_info is None or len(asset_info) == 0:
             logging.info(f"Asset listing not found for symbol: {df_data['symbol']}")
             
-            # Save the UID of the last processed email to a file
+            # Checkpoint the UID of the last processed email
             last_uid_cache = num.decode("utf-8")
-
-            # Update the last processed email UID in the database
-            if last_uid_cache is not None:
-                database.query_executor.insert_uid_by_email_address_and_folder_name(selected_import_email_account.address, folder_name, last_uid_cache)
+            asset_transaction_manager.checkpoint_uid(int(last_uid_cache))
             continue
             
         # If there are multiple exchange listings with the same symbol, automatically resolve, if not resolved, prompt the user to select the correct one
         if len(asset_info) > 1:
-            # Check whether the asset
-            matches = 0
-            for i, asset in enumerate(asset_info):
-                # asset[8] is the exchange_currency_id
-                if asset[8] == database.query_executor.get_currency_id_by_currency_iso_code(df_data["currency"][0]):
-                    matches += 1
-                if i == (len(asset_info) - 1) and matches == 1:
-                    asset_info = asset
-            if matches != 1:
+            # Check whether exactly one of the listings trades in the transaction's currency
+            matched_asset_info = asset_transaction_manager.select_asset_info_by_currency(asset_info, df_data["currency"][0])
+            if matched_asset_info is not None:
+                asset_info = matched_asset_info
+            else:
                 print(f"Multiple exchange listings found for symbol: {df_data['symbol']}")
                 # Print df_data exctracted from the email
                 print("Data extracted from the email:")
@@ -549,33 +758,21 @@ def import_from_email_account(database: Database) -> int:
         if transaction_type_id is None:
             raise ValueError(f"Transaction type {df_data['transaction_type'][0].lower().replace(' ', '_')} not found.")
         
-        # Get the investment account ID
-        investment_account_id = asset_transaction_manager.get_investment_account_id_or_insert(brokerage_id, df_data["investment_account"][0].lower().replace(' ', '_'))
-        if investment_account_id is None:
-            raise ValueError(f"Investment account {df_data['investment_account'][0].lower().replace(' ', '_')} not found.")
-        
-        # Append the transaction to the asset_transaction_manager
-        asset_transaction_manager.insert_asset_transaction_to_database(AssetTransaction(
-            user_id=database.session_manager.get_current_user_id(),
-            asset_id=asset_info[0], # type: ignore | asset_info[0] is the asset_id
-            transaction_type_id=transaction_type_id,
-            brokerage_id=brokerage_id,
-            investment_account_id=investment_account_id,
-            quantity=df_data["quantity"].iloc[0],
-            avg_price=df_data["avg_price"].iloc[0],
-            total=df_data["total"].iloc[0],
-            transaction_fee=df_data["transaction_fee"].iloc[0],
-            transaction_date=df_data["transaction_date"].iloc[0].isoformat(),
-            imported_from="email",
-            import_date=datetime.now(timezone.utc).isoformat()
+        # Append the transaction to the asset_transaction_manager, it's committed with the next UID checkpoint
+        asset_transaction_manager.append_asset_transaction(asset_transaction_manager.create_asset_transaction(
+            df_data,
+            asset_info[0], # type: ignore | asset_info[0] is the asset_id
+            transaction_type_id,
+            brokerage_id,
+            investment_account_id
         ))
 
-        # Save the UID of the last processed email to a file
+        # Checkpoint the UID of the last processed email
         last_uid_cache = num.decode("utf-8")
+        asset_transaction_manager.checkpoint_uid(int(last_uid_cache))
 
-        # Update the last processed email UID in the database
-        if last_uid_cache is not None:
-            database.query_executor.insert_uid_by_email_address_and_folder_name(selected_import_email_account.address, folder_name, last_uid_cache)
+    # Commit the remaining transactions and the final UID checkpoint, every email in the folder was processed
+    asset_transaction_manager.commit_pending_asset_transactions(email_id, folder_name, sync_complete=True)
 
     print("No new emails to process.")
     print("Import complete!")
@@ -1,13 +1,14 @@
 # Purpose: Asset Info Extractor module for extracting asset information from various sources.
 
 # Standard Libraries
+from collections.abc import Callable
 
 # Third-party Libraries
 import pandas as pd
 
 # Local Modules
 from database_management.database import Database
-from database_management.schema.asset_dataclass import ExchangeListingsInfo, YFinanceAssetInfo, AssetInfoWithNames, AssetInfoWithIDs
+from database_management.schema.asset_dataclass import ExchangeListingsInfo, YFinanceAssetInfo, AssetInfoWithNames, AssetInfoWithIDs, ExchangeListingsInfoBatch, AssetInfoWithIDsBatch
 from import_modules.import_market_data.exchange_listings_extractor import ExchangeListingsExtractor
 from import_modules.import_market_data.yfinance_data_extractor import YahooFinanceDataExtractor
 
@@ -15,10 +16,17 @@ from import_modules.import_market_data.yfinance_data_extractor import YahooFinan
 import logging
 
 
+# Global variables
+# Number of listed symbols that flow through fetch, clean, resolve IDs and write together
+ASSET_INFO_CHUNK_SIZE: int = 250
+
+
 # AssetInfoExtractor class for extracting asset information from various sources
 class AssetInfoExtractor:
-    def __init__(self, database: Database) -> None:
+    def __init__(self, database: Database, chunk_size: int=ASSET_INFO_CHUNK_SIZE) -> None:
         self._database = database
+        self._chunk_size = chunk_size
+        self._lookup_cache: dict[tuple, object] = {}
         self._exchange_acronym: str | None = None
         self._exchange_listings_info: ExchangeListingsInfo | None = None
         self._yfinance_data_extractor = YahooFinanceDataExtractor(self._database)
@@ -28,6 +36,12 @@ class AssetInfoExtractor:
         self._asset_info_with_ids: AssetInfoWithIDs | None = None
         # self._df_asset_info: pd.DataFrame | None = None
 
+    def _get_cached_lookup(self, lookup_name: str, key: tuple, lookup: Callable):
+        # Reference data (asset classes, sectors, currencies, ...) is looked up once per key and run instead of once per symbol
+        if (lookup_name, *key) not in self._lookup_cache:
+            self._lookup_cache[(lookup_name, *key)] = lookup(*key)
+        return self._lookup_cache[(lookup_name, *key)]
+
     def _replace_delisted_asset_info(self, asset_symbol: str) -> dict[str, str] | None:
         replacement_asset_info = {}
         if asset_symbol == "SJR-B":
@@ -49,10 +63,10 @@ class AssetInfoExtractor:
         self._yfinance_data_extractor.extract_asset_info_from_yfinance(exchange_acronym, asset_symbol)
         # Get the asset info with names
         yf_asset_info = self._yfinance_data_extractor.get_yfinance_asset_info()
+        self._yfinance_asset_info = yf_asset_info
         if yf_asset_info is None:
             logging.warning(f"Could not retrieve asset information for {asset_symbol} from Yahoo Finance.")
             return None
-        self._yfinance_asset_info = yf_asset_info
 
     def _cleanup_asset_info_with_names(self) -> None:
         if self._asset_info_with_names is None:
@@ -61,7 +75,7 @@ class AssetInfoExtractor:
         else:
             # Format the asset class name
             asset_class_name = self._asset_info_with_names.asset_class_name
-            available_asset_classes = self._database.query_executor.get_all_asset_class_names()
+            available_asset_classes = self._get_cached_lookup("asset_class_names", (), self._database.query_executor.get_all_asset_class_names)
             if available_asset_classes is None:
                 logging.error(f"Could not find any asset classes in the database.")
                 return None
@@ -75,7 +89,7 @@ class AssetInfoExtractor:
                 elif asset_class_name.upper() in available_asset_classes:
                     asset_class_name = asset_class_name.upper()
                 else:
-                    fund_asset_subclass_names = self._database.query_executor.get_asset_subclass_names_by_asset_class_name("fund")
+                    fund_asset_subclass_names = self._get_cached_lookup("asset_subclass_names", ("fund",), self._database.query_executor.get_asset_subclass_names_by_asset_class_name)
                     if fund_asset_subclass_names is None:
                         logging.error(f"Could not find any asset subclasses for asset class 'fund' in the database.")
                         return None
@@ -83,7 +97,7 @@ class AssetInfoExtractor:
                         asset_class_name = "fund"
 
             # Get the available asset subclasses from the database
-            available_asset_subclasses = self._database.query_executor.get_all_asset_subclass_names()
+            available_asset_subclasses = self._get_cached_lookup("all_asset_subclass_names", (), self._database.query_executor.get_all_asset_subclass_names)
             if available_asset_subclasses is None:
                 logging.error(f"Could not find any asset subclasses in the database.")
                 return None
@@ -93,7 +107,7 @@ class AssetInfoExtractor:
                 logging.error(f"Exchange Acronym must be extracted before asset info can be cleaned up.")
                 return None
             else:
-                exchange_id = self._database.query_executor.get_exchange_id_by_exchange_acronym(self._exchange_acronym)
+                exchange_id = self._get_cached_lookup("exchange_id", (self._exchange_acronym,), self._database.query_executor.get_exchange_id_by_exchange_acronym)
                 if exchange_id is None:
                     logging.error(f"Could not find exchange_id for {self._exchange_acronym} in the database.")
                     return None
@@ -149,7 +163,7 @@ class AssetInfoExtractor:
             
             # Financial currency is the currency used for financial statements
             if self._asset_info_with_names.financial_currency_iso_code.upper() == "NONE":
-                currency_iso_code = self._database.query_executor.get_currency_iso_code_by_currency_id(self._asset_info_with_names.exchange_currency_id)
+                currency_iso_code = self._get_cached_lookup("currency_iso_code", (self._asset_info_with_names.exchange_currency_id,), self._database.query_executor.get_currency_iso_code_by_currency_id)
                 if currency_iso_code is None:
                     logging.error(f"Could not find currency_iso_code for {self._asset_info_with_names.exchange_currency_id} in the database.")
                     return None
@@ -272,7 +286,7 @@ class AssetInfoExtractor:
         if asset_class_name is None:
             logging.error("Asset Class Name must be provided.")
             raise ValueError("Asset Class Name must be provided.")
-        asset_class_id = self._get_asset_class_id(asset_class_name)
+        asset_class_id = self._get_cached_lookup("asset_class_id", (asset_class_name,), self._get_asset_class_id)
         if asset_class_id is None:
             logging.error("Asset Class ID is None.")
             raise ValueError("Asset Class ID is None.")
@@ -281,7 +295,7 @@ class AssetInfoExtractor:
         if asset_subclass_name is None:
             logging.error("Asset Subclass Name must be provided.")
             raise ValueError("Asset Subclass Name must be provided.")
-        asset_subclass_id = self._get_asset_subclass_id(asset_subclass_name)
+        asset_subclass_id = self._get_cached_lookup("asset_subclass_id", (asset_subclass_name,), self._get_asset_subclass_id)
         if asset_subclass_id is None:
             logging.error("Asset Subclass ID is None.")
             raise ValueError("Asset Subclass ID is None.")
@@ -290,7 +304,7 @@ class AssetInfoExtractor:
         if sector_name is None:
             logging.error("Sector Name must be provided.")
             raise ValueError("Sector Name must be provided.")
-        sector_id = self._get_sector_id_or_insert(asset_class_id, sector_name)
+        sector_id = self._get_cached_lookup("sector_id", (asset_class_id, sector_name), self._get_sector_id_or_insert)
         if sector_id is None:
             logging.error("Sector ID is None.")
             raise ValueError("Sector ID is None.")
@@ -299,7 +313,7 @@ class AssetInfoExtractor:
         if industry_name is None:
             logging.error("Industry Name must be provided.")
             raise ValueError("Industry Name must be provided.")
-        industry_id = self._get_industry_id_or_insert(sector_id, industry_name)
+        industry_id = self._get_cached_lookup("industry_id", (sector_id, industry_name), self._get_industry_id_or_insert)
         if industry_id is None:
             logging.error("Industry ID is None.")
             raise ValueError("Industry ID is None.")
@@ -308,7 +322,7 @@ class AssetInfoExtractor:
         if country_name is None:
             logging.error("Country Name must be provided.")
             raise ValueError("Country Name must be provided.")
-        country_id = self._get_country_id(country_name)
+        country_id = self._get_cached_lookup("country_id", (country_name,), self._get_country_id)
         if country_id is None:
             logging.error("Country ID is None.")
             raise ValueError("Country ID is None.")
@@ -317,7 +331,7 @@ class AssetInfoExtractor:
         if city_name is None:
             logging.error("City Name must be provided.")
             raise ValueError("City Name must be provided.")
-        city_id = self._get_city_id_or_insert(city_name, country_name)
+        city_id = self._get_cached_lookup("city_id", (city_name, country_name), self._get_city_id_or_insert)
         if city_id is None:
             logging.error("City ID is None.")
             raise ValueError("City ID is None.")
@@ -326,7 +340,7 @@ class AssetInfoExtractor:
         if financial_currency_iso_code is None:
             logging.error("Financial Currency ISO Code must be provided.")
             raise ValueError("Financial Currency ISO Code must be provided.")
-        financial_currency_id = self._get_currency_id(financial_currency_iso_code)
+        financial_currency_id = self._get_cached_lookup("currency_id", (financial_currency_iso_code,), self._get_currency_id)
         if financial_currency_id is None:
             logging.error("Financial Currency ID is None.")
             raise ValueError("Financial Currency ID is None.")
@@ -364,72 +378,129 @@ class AssetInfoExtractor:
             logo_url
         )
 
-    def _insert_asset_info_to_database(self) -> None:
-        # Check if the asset info has been extracted
-        if self._asset_info_with_ids is None:
-            logging.error("Asset Info must be extracted and put into a data frame before inserting into the database.")
-            raise ValueError("Asset Info must be extracted and put into a data frame before inserting into the database.")
-        # Insert the asset info into the database
-        self._database.query_executor.insert_asset_info_with_ids(self._asset_info_with_ids)
+    def _journal_exchange_listings(self, df_exchange_listings_info: pd.DataFrame, reset: bool=False) -> None:
+        # Record every listed symbol in the run journal, symbols that are already journaled keep their status unless they're reset
+        journal_columns = ["exchange_id", "symbol", "security_name", "asset_class_name", "asset_subclass_name", "exchange_currency_id"]
+        df_journal = df_exchange_listings_info[journal_columns].copy()
+        if reset:
+            df_journal["status"] = "pending"
+            df_journal["attempts"] = 0
+            df_journal["last_error"] = None
+        self._database.query_executor.upsert_dataframes_into_sql_tables([(df_journal, "asset_info_init_journal", ["exchange_id", "symbol"])])
 
-    def initialize_asset_info(self, df_exchange_listings_info: pd.DataFrame, exchange_acronym: str) -> None:
-        logging.debug(f"df_exchange_listings_info: {df_exchange_listings_info}")
-        self._exchange_acronym = exchange_acronym
-        for index, row in df_exchange_listings_info.iterrows():
+    def _fetch_asset_info_chunk(self, df_chunk: pd.DataFrame, journal_entries: list[tuple]) -> list[tuple]:
+        # Fetch stage: the Yahoo Finance info of every symbol in the chunk, served from the info cache while it's fresh
+        fetched_asset_info = []
+        exchange_listings_info_batch = ExchangeListingsInfoBatch.from_dataframe(df_chunk)
+        for index, symbol in enumerate(exchange_listings_info_batch.get_column("symbol").tolist()):
             # Replace delisted asset info if applicable (only applies for known delisted assets)
-            replacement_symbol = self._replace_delisted_asset_info(row["symbol"])
-            if replacement_symbol is not None:
-                # Populate the exchange_listings_info datatype using the current row
-                self._exchange_listings_info = ExchangeListingsInfo(
-                    row["asset_class_name"],
-                    row["asset_subclass_name"],
-                    row["exchange_currency_id"],
-                    row["exchange_id"],
-                    replacement_symbol["symbol"],
-                    replacement_symbol["security_name"]
-                )
-                # Get asset info with names
-                self._extract_asset_info_from_yfinance(exchange_acronym, replacement_symbol["symbol"])
-                if self._asset_info_with_names is None:
-                    raise ValueError("Asset Info with names is None.")
-                self._asset_info_with_names.symbol = row["symbol"]
-                self._asset_info_with_names.security_name = replacement_symbol["security_name"]
-                self._asset_info_with_names.business_summary = replacement_symbol["business_summary"]
-            else:
-                # Populate the exchange_listings_info datatype using the current row
-                self._exchange_listings_info = ExchangeListingsInfo(
-                    row["asset_class_name"],
-                    row["asset_subclass_name"],
-                    row["exchange_currency_id"],
-                    row["exchange_id"],
-                    row["symbol"],
-                    row["security_name"]
-                )
-                # Get asset info with names
-                self._extract_asset_info_from_yfinance(exchange_acronym, self._exchange_listings_info.symbol)
-
-            # Merge exchange listings info and yfinance asset info
+            replacement_asset_info = self._replace_delisted_asset_info(symbol)
+            lookup_symbol = symbol if replacement_asset_info is None else replacement_asset_info["symbol"]
+            try:
+                self._extract_asset_info_from_yfinance(self._exchange_acronym, lookup_symbol)
+            except Exception as err:
+                logging.error(f"{type(err).__name__} occurred while fetching {symbol}: {err}")
+                journal_entries.append((symbol, "failed", str(err), True))
+                continue
             if self._yfinance_asset_info is None:
-                logging.warning(f"Could not retrieve asset information for {self._exchange_listings_info.symbol} from Yahoo Finance.")
+                journal_entries.append((symbol, "failed", "Could not retrieve asset information from Yahoo Finance.", True))
                 continue
-            else:
+            journal_entries.append((symbol, "fetched", None, True))
+            # Only the symbols that made it through the fetch get a record of their own
+            fetched_asset_info.append((exchange_listings_info_batch[index], self._yfinance_asset_info, replacement_asset_info))
+        return fetched_asset_info
+
+    def _clean_asset_info_chunk(self, fetched_asset_info: list[tuple], journal_entries: list[tuple]) -> list[AssetInfoWithNames]:
+        # Clean stage: merge the listing and Yahoo Finance info of each symbol and format it to match the database entries
+        cleaned_asset_info = []
+        for exchange_listings_info, yfinance_asset_info, replacement_asset_info in fetched_asset_info:
+            self._exchange_listings_info = exchange_listings_info
+            self._yfinance_asset_info = yfinance_asset_info
+            try:
                 self._merge_exchange_listings_info_and_yfinance_asset_info()
-                # Cleanup asset info with names
+                if self._asset_info_with_names is None:
+                    raise ValueError("Asset Info with names is None.")
+                # Known delisted assets keep their own symbol but describe the replacement
+                if replacement_asset_info is not None:
+                    self._asset_info_with_names.security_name = replacement_asset_info["security_name"]
+                    self._asset_info_with_names.business_summary = replacement_asset_info["business_summary"]
                 self._cleanup_asset_info_with_names()
-                try:
-                    # Convert asset info with names to asset info with IDs
-                    self._convert_asset_info_with_names_to_ids()
-                except ValueError as err:
-                    logging.error(f"ValueError occurred: {err}")
-                else:
-                    # Insert asset info into the database
-                    self._insert_asset_info_to_database()
-        if self._yfinance_asset_info is not None:
-            print(f"Asset Info for {exchange_acronym} has been initialized.")
-            logging.info(f"Asset Info for {exchange_acronym} has been initialized.")
-        else:
-            print(f"Asset Info for {exchange_acronym} could not be initialized.")
-            logging.info(f"Asset Info for {exchange_acronym} could not be initialized.")
+            except Exception as err:
+                logging.error(f"{type(err).__name__} occurred while cleaning {exchange_listings_info.symbol}: {err}")
+                journal_entries.append((exchange_listings_info.symbol, "failed", str(err), False))
+                continue
+            cleaned_asset_info.append(self._asset_info_with_names)
+        return cleaned_asset_info
+
+    def _resolve_asset_info_chunk_ids(self, cleaned_asset_info: list[AssetInfoWithNames], journal_entries: list[tuple]) -> AssetInfoWithIDsBatch:
+        # Resolve IDs stage: convert the names to IDs, inserting new sectors, industries and cities along the way
+        resolved_asset_info = []
+        for asset_info_with_names in cleaned_asset_info:
+            self._asset_info_with_names = asset_info_with_names
+            try:
+                self._convert_asset_info_with_names_to_ids()
+            except ValueError as err:
+                logging.error(f"ValueError occurred for {asset_info_with_names.symbol}: {err}")
+                journal_entries.append((asset_info_with_names.symbol, "failed", str(err), False))
+                continue
+            if self._asset_info_with_ids is not None:
+                resolved_asset_info.append(self._asset_info_with_ids)
+        return AssetInfoWithIDsBatch.from_records(resolved_asset_info)
+
+    def _write_asset_info_chunk(self, exchange_id: int, resolved_asset_info: AssetInfoWithIDsBatch, journal_entries: list[tuple], update_existing: bool) -> None:
+        # Write stage: the whole chunk in one transaction, then its journal entries so a restart picks up after the last written chunk
+        self._database.query_executor.insert_asset_info_with_ids_batch(resolved_asset_info, update_existing)
+        journal_entries.extend((symbol, "inserted", None, False) for symbol in resolved_asset_info.get_column("symbol").tolist())
+        self._database.query_executor.update_asset_info_init_journal(exchange_id, journal_entries)
+
+    def initialize_asset_info(self, df_exchange_listings_info: pd.DataFrame, exchange_acronym: str, update_existing: bool=False, retry_failed_only: bool=False) -> None:
+        logging.debug(f"df_exchange_listings_info: {len(df_exchange_listings_info)} rows, columns {list(df_exchange_listings_info.columns)}")
+        self._exchange_acronym = exchange_acronym
+        # Existing rows are enriched again from scratch, their cached Yahoo Finance profiles may describe the old security
+        if update_existing:
+            self._yfinance_data_extractor.invalidate_cached_asset_info(exchange_acronym, df_exchange_listings_info["symbol"].tolist())
+
+        # Only the symbols the journal hasn't finished are processed, so an interrupted run continues where it stopped
+        exchange_id = self._get_exchange_id(exchange_acronym)
+        if not retry_failed_only:
+            self._journal_exchange_listings(df_exchange_listings_info, reset=update_existing)
+        remaining_statuses = ["failed"] if retry_failed_only else ["pending", "fetched"]
+        remaining_symbols = {row[4] for row in self._database.query_executor.get_asset_info_init_journal_rows(exchange_id, remaining_statuses)}
+        is_remaining = df_exchange_listings_info["symbol"].isin(remaining_symbols).to_numpy()
+        remaining_count = int(is_remaining.sum())
+        if remaining_count < len(df_exchange_listings_info):
+            print(f"Skipping {len(df_exchange_listings_info) - remaining_count} {exchange_acronym} symbols already inserted or failed in a previous run.")
+
+        # Each chunk flows through fetch, clean, resolve IDs and write before the next one starts, so memory doesn't grow with the listing
+        processed_count = 0
+        for chunk_start in range(0, len(df_exchange_listings_info), self._chunk_size):
+            df_chunk = df_exchange_listings_info.iloc[chunk_start:chunk_start + self._chunk_size]
+            df_chunk = df_chunk[is_remaining[chunk_start:chunk_start + self._chunk_size]]
+            if len(df_chunk) == 0:
+                continue
+            journal_entries: list[tuple] = []
+            fetched_asset_info = self._fetch_asset_info_chunk(df_chunk, journal_entries)
+            cleaned_asset_info = self._clean_asset_info_chunk(fetched_asset_info, journal_entries)
+            resolved_asset_info = self._resolve_asset_info_chunk_ids(cleaned_asset_info, journal_entries)
+            self._write_asset_info_chunk(exchange_id, resolved_asset_info, journal_entries, update_existing)
+            processed_count += len(df_chunk)
+            print(f"Processed {processed_count}/{remaining_count} {exchange_acronym} symbols.")
+
+        status_counts = self._database.query_executor.get_asset_info_init_journal_status_counts(exchange_id)
+        print(f"Asset Info for {exchange_acronym}: {status_counts.get('inserted', 0)} inserted, {status_counts.get('failed', 0)} failed, "
+              f"{status_counts.get('pending', 0) + status_counts.get('fetched', 0)} remaining.")
+        logging.info(f"Asset Info for {exchange_acronym} journal status: {status_counts}")
+
+    def retry_failed_asset_info(self, exchange_acronym: str) -> None:
+        # Rebuild the listing rows of the failed symbols from the journal, the exchange listing doesn't need to be downloaded again
+        exchange_id = self._get_exchange_id(exchange_acronym)
+        df_failed_listings_info = pd.DataFrame(self._database.query_executor.get_asset_info_init_journal_rows(exchange_id, ["failed"]),
+            columns=["asset_class_name", "asset_subclass_name", "exchange_currency_id", "exchange_id", "symbol", "security_name"])
+        if len(df_failed_listings_info) == 0:
+            print(f"No failed {exchange_acronym} symbols to retry.")
+            return None
+        print(f"Retrying {len(df_failed_listings_info)} failed {exchange_acronym} symbols.")
+        self.initialize_asset_info(df_failed_listings_info, exchange_acronym, retry_failed_only=True)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 # Purpose: Exchange Listings Extractor module for extracting exchange listings data from various websites.
 
 # Standard Libraries
+from datetime import date
 
 # Third-party Libraries
 import pandas as pd
@@ -15,6 +16,16 @@ from import_modules.file_management.txt_file_manager import TXTFileManager
 import logging
 
 
+# Global variables
+# Columns kept from each NASDAQ Trader listing file and their dtypes, the other columns are skipped by the parser
+NASDAQ_TRADER_LISTING_DTYPES: dict[str, dict[str, str]] = {
+    "nasdaq": {"Symbol": "str", "Security Name": "str", "Test Issue": "str", "ETF": "str"},
+    "other": {"ACT Symbol": "str", "Security Name": "str", "Exchange": "str", "Test Issue": "str", "ETF": "str"}
+}
+# The NASDAQ Trader listing files end with a "File Creation Time: ..." line
+NASDAQ_TRADER_LISTING_FOOTER_PREFIX: str = "File Creation Time"
+
+
 # Website links:
 # http://ftp.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt
 # http://ftp.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt
@@ -103,13 +114,18 @@ class ExchangeListingsExtractor:
         # Convert the CSVFileManager object to a DataFrame
         self._df_exchange_listings_info = csv_file.to_dataframe()
     
-    def _txt_link_to_dataframe(self, first_column_in_header: str, delimiter: str) -> None: #, sort_by_column: str | None = None) -> None:
+    def _txt_link_to_dataframe(self, first_column_in_header: str, delimiter: str, dtypes: dict[str, str] | None = None, footer_prefix: str | None = None) -> None: #, sort_by_column: str | None = None) -> None:
         # Create a TXTFileManager object
         txt_file = TXTFileManager()
         # Set the first column in the header
         txt_file.set_first_column_in_header(first_column_in_header)
         # Set the delimiter
         txt_file.set_delimiter(delimiter)
+        # Set the column dtypes and the footer trimmed from the end of the file
+        if dtypes is not None:
+            txt_file.set_dtypes(dtypes)
+        if footer_prefix is not None:
+            txt_file.set_footer_prefix(footer_prefix)
         if self._base_url is None:
             raise ValueError("Base URL must be specified.")
         
@@ -466,6 +482,34 @@ class ExchangeListingsExtractor:
             self._df_exchange_listings_info.at[index, "asset_subclass_name"] = asset_subclass_name
             logging.debug(f"current df_exchange_listing entry:\n{self._df_exchange_listings_info.loc[index]}") # type: ignore
 
+    def _diff_exchange_listings_against_asset_info(self) -> None:
+        # Check if the exchange listings have been extracted
+        if self._df_exchange_listings_info is None:
+            raise ValueError("Exchange listings must be extracted before they can be compared to the stored asset info.")
+        if self._exchange_id is None:
+            raise ValueError("Exchange ID must be retrieved before the exchange listings can be compared to the stored asset info.")
+
+        # Compare the fresh listing to the asset_info rows of the same exchange by symbol
+        df_asset_listings = pd.DataFrame(self._database.query_executor.get_asset_listings_by_exchange_id(self._exchange_id),
+                                         columns=["symbol", "stored_security_name", "delisted_date"])
+        df_merged = self._df_exchange_listings_info.merge(df_asset_listings, on="symbol", how="outer", indicator=True)
+        is_new = df_merged["_merge"] == "left_only"
+        is_renamed = (df_merged["_merge"] == "both") & (df_merged["security_name"] != df_merged["stored_security_name"])
+        is_delisted = (df_merged["_merge"] == "right_only") & df_merged["delisted_date"].isna()
+        is_relisted = (df_merged["_merge"] == "both") & ~is_renamed & df_merged["delisted_date"].notna()
+
+        # Flag the symbols missing from the listing as delisted and clear the flag of those that came back
+        delisted_symbols = df_merged.loc[is_delisted, "symbol"].tolist()
+        relisted_symbols = df_merged.loc[is_relisted, "symbol"].tolist()
+        self._database.query_executor.update_asset_info_delisted_dates(self._exchange_id, delisted_symbols, date.today().isoformat())
+        self._database.query_executor.update_asset_info_delisted_dates(self._exchange_id, relisted_symbols, None)
+
+        # Only the new and renamed symbols are kept for enrichment, renamed ones update their existing row
+        self._df_exchange_listings_info = self._df_exchange_listings_info[self._df_exchange_listings_info["symbol"].isin(df_merged.loc[is_new | is_renamed, "symbol"])].copy()
+        self._df_exchange_listings_info["listing_change"] = self._df_exchange_listings_info["symbol"].isin(df_merged.loc[is_renamed, "symbol"]).map({True: "renamed", False: "new"})
+        print(f"{int(is_new.sum())} new, {int(is_renamed.sum())} renamed, {len(delisted_symbols)} delisted and {len(relisted_symbols)} relisted symbols found.")
+        logging.info(f"{int(is_new.sum())} new, {int(is_renamed.sum())} renamed, {len(delisted_symbols)} delisted and {len(relisted_symbols)} relisted symbols found for exchange_id {self._exchange_id}.")
+
     def _extract_nasdaq_trader_exchange_listings(self, exchange_in_url: str, exchange_filter: str | None = None) -> None:
         """
         Extracts the exchange listings from the nasdaqtrader.com website here:
@@ -488,7 +532,7 @@ class ExchangeListingsExtractor:
             raise ValueError(f"Exchange '{exchange_in_url}' is not supported.")
 
         # Extract the exchange listings from the website to a DataFrame
-        self._txt_link_to_dataframe(first_column_in_header, "|")
+        self._txt_link_to_dataframe(first_column_in_header, "|", NASDAQ_TRADER_LISTING_DTYPES[exchange_in_url], NASDAQ_TRADER_LISTING_FOOTER_PREFIX)
         # If other listings, filter by exchange
         if exchange_filter:
             self._filter_dataframe_by_exchange("Exchange", exchange_filter)
@@ -516,9 +560,6 @@ class ExchangeListingsExtractor:
             # Remove all rows where the Test Issue column is "Y"
             self._df_exchange_listings_info = self._df_exchange_listings_info[self._df_exchange_listings_info["Test Issue"] != "Y"]
 
-        # Remove "File Creation Time" entry at the end of the DataFrame
-        self._df_exchange_listings_info = self._df_exchange_listings_info[~self._df_exchange_listings_info[self._df_exchange_listings_info.columns[0]].str.contains("File Creation Time")]
-
         # Filter the desired columns
         desired_columns = ["exchange_currency_id", "exchange_id", self._df_exchange_listings_info.columns[0], "Security Name"]
         self._filter_dataframe_columns(desired_columns)
@@ -530,7 +571,7 @@ class ExchangeListingsExtractor:
         # Remove rows with duplicate values based on the symbol (first) column
         self._df_exchange_listings_info.drop_duplicates(subset=[self._df_exchange_listings_info.columns[0]])
 
-    def initialize_nasdaq_trader_market_data(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_in_url: str, exchange_filter: str | None) -> None:
+    def initialize_nasdaq_trader_market_data(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_in_url: str, exchange_filter: str | None, refresh: bool=False) -> None:
         # Get the exchange_id from the database, or insert it if it doesn't exist
         self._get_exchange_id_or_insert(country_iso_code, exchange_name, exchange_acronym)
         # Get the exchange listings from the website
@@ -539,6 +580,9 @@ class ExchangeListingsExtractor:
         self._add_static_columns_to_nasdaq_trader_dataframe()
         # Cleanup the exchange listings
         self._cleanup_nasdaq_trader_exchange_listings()
+        # Keep only the listing changes when refreshing an exchange that was already initialized
+        if refresh:
+            self._diff_exchange_listings_against_asset_info()
         # # Build the asset class and subclass lookup dictionary
         # if self._asset_class_lookup is None:
         #     self._build_asset_class_and_subclass_lookup()
@@ -606,13 +650,16 @@ class ExchangeListingsExtractor:
         # Remove rows with duplicate values based on the symbol (first) column
         self._df_exchange_listings_info.drop_duplicates(subset=[self._df_exchange_listings_info.columns[0]])
 
-    def initialize_cboe_canada_market_data(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_filter: str) -> None:
+    def initialize_cboe_canada_market_data(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_filter: str, refresh: bool=False) -> None:
         # Get the exchange_id from the database, or insert it if it doesn't exist
         self._get_exchange_id_or_insert(country_iso_code, exchange_name, exchange_acronym)
         # Get the exchange listings from the website
         self._extract_cboe_canada_exchange_listings(exchange_acronym, exchange_filter)
         # Cleanup the exchange listings
         self._cleanup_cboe_canada_exchange_listings()
+        # Keep only the listing changes when refreshing an exchange that was already initialized
+        if refresh:
+            self._diff_exchange_listings_against_asset_info()
         # # Build the asset class and subclass lookup dictionary
         # if self._asset_class_lookup is None:
         #     self._build_asset_class_and_subclass_lookup()
@@ -1,41 +1,242 @@
 # Purpose: Import Market Data module for importing market data, cleaning, and storing directly to the database.
 
 # Standard Libraries
+from datetime import date
 
 # Third-party Libraries
 import pandas as pd
 import yfinance as yf
 
 # Local Modules
-from import_modules.web_scraper import WebScraper
+from database_management.database import Database
+from import_modules.import_market_data.yfinance_data_extractor import YahooFinanceDataExtractor
 
 # Configure logging
 import logging
 
 
+# Global variables
+# Number of symbols requested together in a single yfinance download
+HISTORY_DOWNLOAD_CHUNK_SIZE: int = 100
+# Columns of the history tables, in the order the frames are built
+PRICE_HISTORY_COLUMNS: list[str] = ["asset_id", "date", "open", "high", "low", "close", "adj_close", "volume"]
+DIVIDEND_HISTORY_COLUMNS: list[str] = ["asset_id", "date", "dividend"]
+SPLIT_HISTORY_COLUMNS: list[str] = ["asset_id", "date", "stock_split"]
+# Relative difference between a stored and a re-downloaded close above which the stored history is considered re-adjusted
+READJUSTMENT_TOLERANCE: float = 1e-4
+
+
 # HistoricalDataExtractor class for extracting historical data
 class HistoricalDataExtractor:
-    def __init__(self, symbols: list[str]) -> None:
-        self._symbols = symbols
-
-    def get_historical_price_data(self, symbol: str) -> pd.DataFrame:
-        data = yf.download(symbol, period="max", interval="1d", actions=True)
-        # Reset index to get Date as a column instead of an index
-        data.reset_index(inplace=True)
-        return data[["Date", "Ticker", "Open", "High", "Low", "Close", "Adj Close", "Volume"]]
-
-    def get_historical_dividend_data(self, symbol: str) -> pd.DataFrame:
-        data = yf.download(symbol, period="max", interval="1d", actions=True)
-        # Reset index to get Date as a column instead of an index
-        data.reset_index(inplace=True)
-        return data[["Date", "Ticker", "Dividend"]]
-
-    def get_historical_split_data(self, symbol: str) -> pd.DataFrame:
-        data = yf.download(symbol, period="max", interval="1d", actions=True)
-        # Reset index to get Date as a column instead of an index
-        data.reset_index(inplace=True)
-        return data[["Date", "Ticker", "Stock Split"]]
-
-    
+    def __init__(self, database: Database) -> None:
+        self._database = database
+        self._yfinance_data_extractor = YahooFinanceDataExtractor(self._database)
+
+    def _download_history(self, yfinance_symbols: list[str], **period_kwargs) -> pd.DataFrame:
+        # One request for the whole chunk, prices, dividends and splits all come back in the same frame
+        return yf.download(yfinance_symbols, interval="1d", actions=True, auto_adjust=False, group_by="ticker",
+                           threads=True, progress=False, **period_kwargs)
+
+    def _get_symbol_history(self, data: pd.DataFrame, yfinance_symbol: str) -> pd.DataFrame | None:
+        # Multi-ticker downloads have a (ticker, field) column index, single-ticker downloads can have just the fields
+        if isinstance(data.columns, pd.MultiIndex):
+            if yfinance_symbol not in data.columns.get_level_values(0):
+                return None
+            symbol_history = data[yfinance_symbol]
+        else:
+            symbol_history = data
+        # Rows without a close are dates on which this asset didn't trade, rows without an adjusted close can't be stored either
+        symbol_history = symbol_history.dropna(subset=[column for column in ("Close", "Adj Close") if column in symbol_history])
+        # Early index and ADR history often only has closes, the missing open, high and low are filled with the close
+        # so a single incomplete row doesn't fail the NOT NULL constraints and roll back the whole chunk
+        missing_price_columns = [column for column in ("Open", "High", "Low") if column in symbol_history and symbol_history[column].isna().any()]
+        if len(missing_price_columns) > 0:
+            symbol_history = symbol_history.copy()
+            for column in missing_price_columns:
+                symbol_history[column] = symbol_history[column].fillna(symbol_history["Close"])
+        return symbol_history if not symbol_history.empty else None
+
+    def _split_history(self, data: pd.DataFrame, ids_by_yfinance_symbol: dict[str, int], id_column: str="asset_id") -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # id_column is "asset_id" for assets and "index_id" for indexes
+        price_frames = []
+        dividend_frames = []
+        split_frames = []
+        for yfinance_symbol, source_id in ids_by_yfinance_symbol.items():
+            symbol_history = self._get_symbol_history(data, yfinance_symbol)
+            if symbol_history is None:
+                logging.warning(f"No historical data found for {yfinance_symbol} on Yahoo Finance.")
+                continue
+            dates = pd.to_datetime(symbol_history.index).strftime("%Y-%m-%d")
+            price_frames.append(pd.DataFrame({
+                id_column: source_id,
+                "date": dates,
+                "open": symbol_history["Open"].to_numpy(),
+                "high": symbol_history["High"].to_numpy(),
+                "low": symbol_history["Low"].to_numpy(),
+                "close": symbol_history["Close"].to_numpy(),
+                "adj_close": symbol_history["Adj Close"].to_numpy(),
+                "volume": symbol_history["Volume"].fillna(0).astype("int64").to_numpy()
+            }))
+            # Dividends and splits are 0 on every day without an event
+            if "Dividends" in symbol_history:
+                dividend_mask = (symbol_history["Dividends"] != 0).to_numpy()
+                dividend_frames.append(pd.DataFrame({
+                    id_column: source_id,
+                    "date": dates[dividend_mask],
+                    "dividend": symbol_history["Dividends"].to_numpy()[dividend_mask]
+                }))
+            if "Stock Splits" in symbol_history:
+                split_mask = (symbol_history["Stock Splits"] != 0).to_numpy()
+                split_frames.append(pd.DataFrame({
+                    id_column: source_id,
+                    "date": dates[split_mask],
+                    "stock_split": symbol_history["Stock Splits"].to_numpy()[split_mask]
+                }))
+        return (self._concat_frames(price_frames, [id_column] + PRICE_HISTORY_COLUMNS[1:]),
+                self._concat_frames(dividend_frames, [id_column] + DIVIDEND_HISTORY_COLUMNS[1:]),
+                self._concat_frames(split_frames, [id_column] + SPLIT_HISTORY_COLUMNS[1:]))
+
+    def _concat_frames(self, frames: list[pd.DataFrame], columns: list[str]) -> pd.DataFrame:
+        frames = [frame for frame in frames if not frame.empty]
+        if len(frames) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def _get_asset_ids_by_yfinance_symbol(self, assets: list[tuple]) -> dict[str, int]:
+        # assets are (asset_id, exchange_acronym, symbol) tuples
+        return {self._yfinance_data_extractor.get_yfinance_symbol(exchange_acronym, symbol): asset_id
+                for asset_id, exchange_acronym, symbol in assets}
+
+    def download_historical_data(self, assets: list[tuple], **period_kwargs) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # Download the history of the given (asset_id, exchange_acronym, symbol) assets and split it into price, dividend and split frames
+        asset_ids_by_yfinance_symbol = self._get_asset_ids_by_yfinance_symbol(assets)
+        data = self._download_history(list(asset_ids_by_yfinance_symbol), **period_kwargs)
+        return self._split_history(data, asset_ids_by_yfinance_symbol)
+
+    def store_historical_data(self, df_price_history: pd.DataFrame, df_dividend_history: pd.DataFrame, df_split_history: pd.DataFrame) -> None:
+        # Upsert all three frames in a single transaction, re-downloaded dates overwrite the stored rows
+        self._database.query_executor.upsert_dataframes_into_sql_tables([
+            (df_price_history, "asset_price_history", ["asset_id", "date"]),
+            (df_dividend_history, "dividend_history", ["asset_id", "date"]),
+            (df_split_history, "split_history", ["asset_id", "date"])
+        ])
+        # New splits or dividends make the cached adjustment factors of their assets stale
+        corporate_action_asset_ids = set(df_split_history["asset_id"]) | set(df_dividend_history["asset_id"])
+        if len(corporate_action_asset_ids) > 0:
+            self._database.query_executor.invalidate_price_adjustment_factors([int(asset_id) for asset_id in corporate_action_asset_ids])
+        # Re-aggregate the weekly, monthly and yearly bars from each asset's earliest stored date onwards
+        if not df_price_history.empty:
+            start_dates = df_price_history.groupby("asset_id")["date"].min()
+            self._database.query_executor.refresh_price_history_rollups("asset", {int(asset_id): start_date for asset_id, start_date in start_dates.items()})
+
+    def extract_historical_data(self, exchange_acronym: str | None=None, chunk_size: int=HISTORY_DOWNLOAD_CHUNK_SIZE) -> None:
+        # Get the assets of the exchange, or every asset if no exchange is given
+        assets = self._database.query_executor.get_asset_ids_and_symbols_by_exchange_acronym(exchange_acronym)
+        if assets is None or len(assets) == 0:
+            print("No assets found to extract historical data for.")
+            return None
+
+        for i in range(0, len(assets), chunk_size):
+            chunk = assets[i:i + chunk_size]
+            df_price_history, df_dividend_history, df_split_history = self.download_historical_data(chunk, period="max")
+            self.store_historical_data(df_price_history, df_dividend_history, df_split_history)
+            print(f"Historical data stored for {min(i + chunk_size, len(assets))}/{len(assets)} assets.")
+        logging.info(f"Historical data extracted for {len(assets)} assets.")
+
+    def _find_readjusted_asset_ids(self, df_price_history: pd.DataFrame, df_dividend_history: pd.DataFrame,
+                                   df_split_history: pd.DataFrame, last_date: str) -> set[int]:
+        # A new split changes every earlier close, a new dividend changes every earlier adjusted close
+        readjusted_asset_ids = {int(asset_id) for asset_id in df_split_history.loc[df_split_history["date"] > last_date, "asset_id"]}
+        readjusted_asset_ids |= {int(asset_id) for asset_id in df_dividend_history.loc[df_dividend_history["date"] > last_date, "asset_id"]}
+        # Yahoo also re-adjusts history for corrections, so compare the overlapping day with what's stored
+        df_overlap = df_price_history[df_price_history["date"] == last_date]
+        stored_closing_prices = self._database.query_executor.get_closing_prices_by_asset_ids_and_date(
+            [int(asset_id) for asset_id in df_overlap["asset_id"]], last_date)
+        for asset_id, close, adj_close in df_overlap[["asset_id", "close", "adj_close"]].itertuples(index=False, name=None):
+            stored_close, stored_adj_close = stored_closing_prices.get(int(asset_id), (close, adj_close))
+            for stored_price, price in ((stored_close, close), (stored_adj_close, adj_close)):
+                if abs(price - stored_price) > READJUSTMENT_TOLERANCE * max(abs(stored_price), 1e-9):
+                    readjusted_asset_ids.add(int(asset_id))
+        return readjusted_asset_ids
+
+    def update_historical_data(self, exchange_acronym: str | None=None, chunk_size: int=HISTORY_DOWNLOAD_CHUNK_SIZE) -> None:
+        # Get the last stored date of every asset with price history, assets without any are left to the backfill queue
+        # so a freshly initialized exchange doesn't turn the update into a full download of its listings
+        assets = self._database.query_executor.get_last_price_history_dates_by_exchange_acronym(exchange_acronym)
+        if assets is None or len(assets) == 0:
+            print("No assets with price history found to update, run the price history backfill first.")
+            return None
+
+        # Group the assets by their last stored date so each group only downloads the missing range in shared requests
+        assets_by_last_date: dict[str, list[tuple]] = {}
+        for asset_id, asset_exchange_acronym, symbol, last_date in assets:
+            assets_by_last_date.setdefault(last_date, []).append((asset_id, asset_exchange_acronym, symbol))
+
+        today = date.today().isoformat()
+        readjusted_assets = []
+        for last_date, grouped_assets in assets_by_last_date.items():
+            if last_date >= today:
+                continue
+            for i in range(0, len(grouped_assets), chunk_size):
+                chunk = grouped_assets[i:i + chunk_size]
+                # Start on the last stored date, the overlapping day is used to detect re-adjusted history
+                df_price_history, df_dividend_history, df_split_history = self.download_historical_data(chunk, start=last_date)
+                readjusted_asset_ids = self._find_readjusted_asset_ids(df_price_history, df_dividend_history, df_split_history, last_date)
+                readjusted_assets += [asset for asset in chunk if asset[0] in readjusted_asset_ids]
+                # Only store the new rows of assets whose stored history is still valid
+                self.store_historical_data(
+                    df_price_history[~df_price_history["asset_id"].isin(readjusted_asset_ids)],
+                    df_dividend_history[~df_dividend_history["asset_id"].isin(readjusted_asset_ids)],
+                    df_split_history[~df_split_history["asset_id"].isin(readjusted_asset_ids)]
+                )
+
+        # Download the whole history again for assets with a new split, dividend or correction
+        for i in range(0, len(readjusted_assets), chunk_size):
+            self.store_historical_data(*self.download_historical_data(readjusted_assets[i:i + chunk_size], period="max"))
+        print(f"Historical data updated for {len(assets)} assets, {len(readjusted_assets)} re-adjusted.")
+        logging.info(f"Historical data updated for {len(assets)} assets, {len(readjusted_assets)} re-adjusted.")
+
+    def download_index_historical_data(self, indexes: list[tuple], **period_kwargs) -> pd.DataFrame:
+        # indexes are (index_id, symbol) tuples, index symbols are already Yahoo Finance symbols (e.g. "^GSPC")
+        index_ids_by_yfinance_symbol = {symbol: index_id for index_id, symbol in indexes}
+        data = self._download_history(list(index_ids_by_yfinance_symbol), **period_kwargs)
+        # Indexes have no dividends or splits, only the price frame is kept
+        df_index_price_history, _, _ = self._split_history(data, index_ids_by_yfinance_symbol, id_column="index_id")
+        return df_index_price_history
+
+    def store_index_historical_data(self, df_index_price_history: pd.DataFrame) -> None:
+        if df_index_price_history.empty:
+            return None
+        # Re-downloaded dates overwrite the stored rows
+        self._database.query_executor.upsert_dataframes_into_sql_tables([(df_index_price_history, "index_price_history", ["index_id", "date"])])
+        # Re-aggregate the weekly, monthly and yearly bars from each index's earliest stored date onwards
+        start_dates = df_index_price_history.groupby("index_id")["date"].min()
+        self._database.query_executor.refresh_price_history_rollups("index", {int(index_id): start_date for index_id, start_date in start_dates.items()})
+
+    def update_index_historical_data(self, chunk_size: int=HISTORY_DOWNLOAD_CHUNK_SIZE) -> None:
+        # Get the last stored date of every index in index_info
+        indexes = self._database.query_executor.get_last_index_price_history_dates()
+        if len(indexes) == 0:
+            print("No indexes found to update historical data for.")
+            return None
+
+        # Group the indexes by their last stored date so each group only downloads the missing range in shared requests
+        indexes_by_last_date: dict[str | None, list[tuple]] = {}
+        for index_id, symbol, last_date in indexes:
+            indexes_by_last_date.setdefault(last_date, []).append((index_id, symbol))
+
+        today = date.today().isoformat()
+        for last_date, grouped_indexes in indexes_by_last_date.items():
+            if last_date is not None and last_date >= today:
+                continue
+            for i in range(0, len(grouped_indexes), chunk_size):
+                chunk = grouped_indexes[i:i + chunk_size]
+                # Indexes without any history need all of it, the others start on their last stored date
+                period_kwargs = {"period": "max"} if last_date is None else {"start": last_date}
+                self.store_index_historical_data(self.download_index_historical_data(chunk, **period_kwargs))
+        print(f"Historical data updated for {len(indexes)} indexes.")
+        logging.info(f"Historical data updated for {len(indexes)} indexes.")
+
+
 if __name__ == "__main__":
     print("This module is not meant to be executed directly...")
@@ -1,22 +1,58 @@
-# Purpose: 
+# Purpose: Index Data Extractor module for extracting the constituents of the configured indexes into the index_info and index_holdings tables.
 
 # Standard Libraries
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
 from typing import TypedDict
 
 # Third-party Libraries
 import pandas as pd
 
 # Local Modules
+from database_management.database import Database
 from import_modules.web_scraper import WebScraper
 
 # Configure logging
 import logging
 
-# Website links:
-# https://en.wikipedia.org/wiki/Dow_Jones_Industrial_Average
-# https://en.wikipedia.org/wiki/S&P/TSX_Composite_Index#List_of_companies
-# https://en.wikipedia.org/wiki/List_of_S%26P_500_companies
 
+# Global variables
+# Maximum number of index pages downloaded and parsed at the same time
+INDEX_EXTRACTION_MAX_WORKERS: int = 4
+WIKIPEDIA_URL: str = "https://en.wikipedia.org/wiki/"
+# Indexes stored in index_info by default, the table_index is only a hint, the first table with the symbol_column is used if it's wrong
+# The Russell 2000 isn't included, its Wikipedia page doesn't list the constituents
+DEFAULT_INDEXES: list["DefaultIndexData"] = [
+    {
+        "name": "S&P 500", "symbol": "^GSPC", "exchange_acronym": "NYSE",
+        "description": "Large-cap U.S. equities, 500 leading companies weighted by float-adjusted market capitalization.",
+        "website_url": WIKIPEDIA_URL + "List_of_S%26P_500_companies", "table_index": 0, "symbol_column": "Symbol"
+    },
+    {
+        "name": "NASDAQ 100", "symbol": "^NDX", "exchange_acronym": "NASDAQ",
+        "description": "The 100 largest non-financial companies listed on the NASDAQ Stock Market.",
+        "website_url": WIKIPEDIA_URL + "Nasdaq-100", "table_index": 4, "symbol_column": "Ticker"
+    },
+    {
+        "name": "Dow Jones Industrial Average", "symbol": "^DJI", "exchange_acronym": "NYSE",
+        "description": "Price-weighted index of 30 prominent companies listed on U.S. stock exchanges.",
+        "website_url": WIKIPEDIA_URL + "Dow_Jones_Industrial_Average", "table_index": 2, "symbol_column": "Symbol"
+    },
+    {
+        "name": "S&P/TSX 60", "symbol": "^TX60", "exchange_acronym": "TSX",
+        "description": "60 large companies listed on the Toronto Stock Exchange.",
+        "website_url": WIKIPEDIA_URL + "S%26P/TSX_60", "table_index": 0, "symbol_column": "Symbol"
+    },
+    {
+        "name": "S&P/TSX Composite Index", "symbol": "^GSPTSE", "exchange_acronym": "TSX",
+        "description": "Benchmark Canadian index of the largest companies listed on the Toronto Stock Exchange.",
+        "website_url": WIKIPEDIA_URL + "S%26P/TSX_Composite_Index", "table_index": 3, "symbol_column": "Ticker"
+    }
+]
+
+
+# IndexData class for the fields needed to extract the constituents of an index
 class IndexData(TypedDict):
     name: str
     symbol: str
@@ -25,56 +61,129 @@ class IndexData(TypedDict):
     symbol_column: str
 
 
+# DefaultIndexData class for the default indexes stored in index_info
+class DefaultIndexData(IndexData):
+    exchange_acronym: str
+    description: str
+
+
+# Function to normalize index constituent and asset symbols so they can be matched against each other
+def _normalize_symbols(symbols: pd.Series) -> pd.Series:
+    # Wikipedia and the exchange listings don't agree on share class separators or exchange suffixes (e.g. "BRK.B", "BRK-B", "RCI.B.TO")
+    symbols = symbols.astype(str).str.strip().str.upper()
+    symbols = symbols.str.replace(r"\.(TO|V|CN|NE)$", "", regex=True)
+    return symbols.str.replace(r"[-/ ]", ".", regex=True)
+
+
+# IndexHoldingsExtractor class for extracting the constituents of an index from its website
 class IndexHoldingsExtractor:
     def __init__(self, index_data: IndexData) -> None:
         self._index_data = index_data
 
     def get_holdings_from_index(self) -> pd.DataFrame | None:
-        # Reate the HTML text from the specified URL
+        # Read the HTML text from the specified URL
         html_text = WebScraper(user_agent=True).get_html_content_as_text(self._index_data["website_url"])
         if html_text is None:
             return None
         # Extract the tables from the HTML text
-        html_tables = pd.read_html(html_text)
-        # Access the specific table based on the table_index
-        index_table = html_tables[self._index_data["table_index"]]
-        # Extract the column indicated by "ticker_column" and convert to a list
-        index_holdings = index_table[self._index_data["symbol_column"]].tolist()
-        # Create a DataFrame from the list of tickers
-        index_holdings_df = pd.DataFrame(index_holdings, columns=["symbol"])
+        html_tables = pd.read_html(io.StringIO(html_text))
+        symbol_column = self._index_data["symbol_column"]
+        # Access the specific table based on the table_index, pages get edited so fall back to the first table with the symbol column
+        table_index = self._index_data["table_index"]
+        if table_index < len(html_tables) and symbol_column in html_tables[table_index].columns:
+            index_table = html_tables[table_index]
+        else:
+            index_table = next((html_table for html_table in html_tables if symbol_column in html_table.columns), None)
+        if index_table is None:
+            logging.error(f"No table with a '{symbol_column}' column found for the {self._index_data['name']} index.")
+            return None
+        # Extract the column indicated by "symbol_column", without blanks or duplicates
+        index_holdings = index_table[symbol_column].dropna().astype(str).str.strip()
+        index_holdings = index_holdings[index_holdings != ""].drop_duplicates()
+        # Create a DataFrame from the list of symbols
+        index_holdings_df = pd.DataFrame({"symbol": index_holdings.tolist()})
         return index_holdings_df
 
 
-def main():
-    # TODO - grab all info for each stock from yfinance and store in the database
-
-    wiki = "https://en.wikipedia.org/wiki/"
-
-    sp500 = "List_of_S&P_500_companies"
-    nasdaq100 = "NASDAQ-100"
-    dow30 = "Dow_Jones_Industrial_Average"
-    russell2000 = "Russell_2000_Index"
-    tsx60 = "S&P/TSX_60"
-    tsx_composite = "S&P/TSX_Composite_Index"
+# IndexConstituentsExtractor class for extracting the constituents of every index in index_info and storing them as diffs
+class IndexConstituentsExtractor:
+    def __init__(self, database: Database, max_workers: int=INDEX_EXTRACTION_MAX_WORKERS) -> None:
+        self._database = database
+        self._max_workers = max_workers
+        # Normalized symbol to asset_id maps, loaded once per country for the whole run
+        self._asset_ids_by_country_id: dict[int, pd.Series] = {}
+
+    def store_default_indexes(self) -> None:
+        # Only the indexes whose exchange is already initialized can be stored, index_info needs the exchange_id
+        rows = []
+        for index_data in DEFAULT_INDEXES:
+            exchange_id = self._database.query_executor.get_exchange_id_by_exchange_acronym(index_data["exchange_acronym"])
+            if exchange_id is None:
+                logging.warning(f"Exchange '{index_data['exchange_acronym']}' not initialized, skipping the {index_data['name']} index.")
+                continue
+            rows.append({
+                "exchange_id": exchange_id, "name": index_data["name"], "symbol": index_data["symbol"],
+                "description": index_data["description"], "website_url": index_data["website_url"],
+                "table_index": index_data["table_index"], "symbol_column": index_data["symbol_column"]
+            })
+        if len(rows) > 0:
+            self._database.query_executor.upsert_dataframes_into_sql_tables([(pd.DataFrame(rows), "index_info", ["name"])])
+
+    def _get_asset_ids_by_symbol(self, country_id: int) -> pd.Series:
+        if country_id not in self._asset_ids_by_country_id:
+            df_assets = pd.DataFrame(self._database.query_executor.get_asset_ids_and_symbols_by_country_id(country_id), columns=["asset_id", "symbol"])
+            # The query returns listed assets first, so they're kept when two symbols normalize to the same one
+            df_assets["normalized_symbol"] = _normalize_symbols(df_assets["symbol"])
+            df_assets = df_assets.drop_duplicates(subset=["normalized_symbol"], keep="first")
+            self._asset_ids_by_country_id[country_id] = df_assets.set_index("normalized_symbol")["asset_id"]
+        return self._asset_ids_by_country_id[country_id]
+
+    def _store_index_holdings(self, index_id: int, index_name: str, country_id: int, df_holdings: pd.DataFrame) -> dict[str, int]:
+        # Resolve the constituents to asset ids with a single lookup against the country's assets
+        asset_ids_by_symbol = self._get_asset_ids_by_symbol(country_id)
+        resolved_asset_ids = _normalize_symbols(df_holdings["symbol"]).map(asset_ids_by_symbol)
+        unresolved_symbols = df_holdings.loc[resolved_asset_ids.isna(), "symbol"].tolist()
+        if len(unresolved_symbols) > 0:
+            logging.warning(f"{len(unresolved_symbols)} {index_name} constituents not found in asset_info: {unresolved_symbols[:20]}")
+        new_asset_ids = {int(asset_id) for asset_id in resolved_asset_ids.dropna()}
+        # Never empty an index because its page couldn't be resolved, a later run fixes it once the assets are initialized
+        if len(new_asset_ids) == 0:
+            logging.error(f"None of the {index_name} constituents were found in asset_info, its holdings were left unchanged.")
+            return {"constituents": len(df_holdings), "unresolved": len(unresolved_symbols), "added": 0, "removed": 0}
+
+        # Only the additions and removals since the last run are written, each with a row in the change history
+        current_asset_ids = set(self._database.query_executor.get_index_holdings_asset_ids(index_id))
+        added_asset_ids = sorted(new_asset_ids - current_asset_ids)
+        removed_asset_ids = sorted(current_asset_ids - new_asset_ids)
+        if len(added_asset_ids) > 0 or len(removed_asset_ids) > 0:
+            self._database.query_executor.update_index_holdings(index_id, added_asset_ids, removed_asset_ids, date.today().isoformat())
+        logging.info(f"{index_name} holdings updated: {len(added_asset_ids)} added, {len(removed_asset_ids)} removed.")
+        return {"constituents": len(df_holdings), "unresolved": len(unresolved_symbols), "added": len(added_asset_ids), "removed": len(removed_asset_ids)}
+
+    def extract_index_holdings(self, index_names: list[str] | None=None) -> dict[str, dict[str, int]]:
+        # Extract every index in index_info, or only the given ones
+        index_rows = [row for row in self._database.query_executor.get_index_info_rows() if index_names is None or row[1] in index_names]
+        results: dict[str, dict[str, int]] = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            # Runs in worker threads, only the download and parsing happen there, the database is only used by the main thread
+            futures = {}
+            for index_id, name, symbol, website_url, table_index, symbol_column, country_id in index_rows:
+                index_data: IndexData = {"name": name, "symbol": symbol, "website_url": website_url, "table_index": table_index, "symbol_column": symbol_column}
+                futures[executor.submit(IndexHoldingsExtractor(index_data).get_holdings_from_index)] = (index_id, name, country_id)
+            # Store each index as soon as its page is parsed
+            for future in as_completed(futures):
+                index_id, name, country_id = futures[future]
+                try:
+                    df_holdings = future.result()
+                except Exception as e:
+                    logging.error(f"{name} holdings could not be extracted: {e}")
+                    continue
+                if df_holdings is None or len(df_holdings) == 0:
+                    logging.error(f"No {name} holdings were extracted.")
+                    continue
+                results[name] = self._store_index_holdings(index_id, name, country_id, df_holdings)
+        return results
 
-    index_wiki_url = {
-        "S&P 500": wiki + sp500,
-        "NASDAQ 100": wiki + nasdaq100,
-        "Dow Jones Industrial Average": wiki + dow30,
-        "Russell 2000": wiki + russell2000,
-        "S&P/TSX 60": wiki + tsx60,
-        "S&P/TSX Composite Index": wiki + tsx_composite
-    }
-
-    index_holdings = {
-        "S&P 500": [],
-        "NASDAQ 100": [],
-        "Dow Jones Industrial Average": [],
-        "Russell 2000": [],
-        "S&P/TSX 60": [],
-        "S&P/TSX Composite Index": []
-    }
 
-    
 if __name__ == "__main__":
-    print("This module is not meant to be executed directly...")
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,107 @@
+# Purpose: Intraday Data Extractor module for importing recent intraday price bars of held assets and downsampling old ones.
+
+# Standard Libraries
+from datetime import datetime, timedelta, timezone
+
+# Third-party Libraries
+import pandas as pd
+import yfinance as yf
+
+# Local Modules
+from database_management.database import Database
+from import_modules.import_market_data.yfinance_data_extractor import YahooFinanceDataExtractor
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Yahoo Finance only serves the most recent days of intraday data, 7 days of 1 minute bars and 60 days of 5 minute bars
+INTRADAY_DOWNLOAD_PERIODS: dict[int, str] = {1: "7d", 5: "60d"}
+# Number of symbols requested together in a single yfinance download
+INTRADAY_DOWNLOAD_CHUNK_SIZE: int = 50
+# Number of days of raw intraday bars kept, older days are downsampled into daily bars and purged
+INTRADAY_RETENTION_DAYS: int = 30
+INTRADAY_PRICE_COLUMNS: list[str] = ["asset_id", "interval_minutes", "timestamp", "open", "high", "low", "close", "volume"]
+
+
+# IntradayDataExtractor class for extracting intraday price bars and applying the intraday retention policy
+class IntradayDataExtractor:
+    def __init__(self, database: Database) -> None:
+        self._database = database
+        self._yfinance_data_extractor = YahooFinanceDataExtractor(self._database)
+
+    def _split_intraday_history(self, data: pd.DataFrame, asset_ids_by_yfinance_symbol: dict[str, int], interval_minutes: int) -> pd.DataFrame:
+        price_frames = []
+        for yfinance_symbol, asset_id in asset_ids_by_yfinance_symbol.items():
+            # Multi-ticker downloads have a (ticker, field) column index, single-ticker downloads can have just the fields
+            if isinstance(data.columns, pd.MultiIndex):
+                if yfinance_symbol not in data.columns.get_level_values(0):
+                    logging.warning(f"No intraday data found for {yfinance_symbol} on Yahoo Finance.")
+                    continue
+                symbol_history = data[yfinance_symbol]
+            else:
+                symbol_history = data
+            symbol_history = symbol_history.dropna(subset=["Close"])
+            if symbol_history.empty:
+                continue
+            # Unix seconds in UTC, whatever the exchange's timezone and the index's datetime resolution
+            timestamps = ((pd.DatetimeIndex(symbol_history.index).tz_convert("UTC") - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+            price_frames.append(pd.DataFrame({
+                "asset_id": asset_id,
+                "interval_minutes": interval_minutes,
+                "timestamp": timestamps,
+                "open": symbol_history["Open"].to_numpy(),
+                "high": symbol_history["High"].to_numpy(),
+                "low": symbol_history["Low"].to_numpy(),
+                "close": symbol_history["Close"].to_numpy(),
+                "volume": symbol_history["Volume"].fillna(0).astype("int64").to_numpy()
+            }))
+        if len(price_frames) == 0:
+            return pd.DataFrame(columns=INTRADAY_PRICE_COLUMNS)
+        return pd.concat(price_frames, ignore_index=True)[INTRADAY_PRICE_COLUMNS]
+
+    def download_intraday_data(self, assets: list[tuple], interval_minutes: int) -> pd.DataFrame:
+        # Download the recent intraday bars of the given (asset_id, exchange_acronym, symbol) assets
+        asset_ids_by_yfinance_symbol = {self._yfinance_data_extractor.get_yfinance_symbol(exchange_acronym, symbol): asset_id
+                                        for asset_id, exchange_acronym, symbol in assets}
+        data = yf.download(list(asset_ids_by_yfinance_symbol), interval=f"{interval_minutes}m", period=INTRADAY_DOWNLOAD_PERIODS[interval_minutes],
+                           auto_adjust=False, group_by="ticker", threads=True, progress=False)
+        return self._split_intraday_history(data, asset_ids_by_yfinance_symbol, interval_minutes)
+
+    def extract_intraday_data(self, interval_minutes_list: list[int] | None=None, chunk_size: int=INTRADAY_DOWNLOAD_CHUNK_SIZE) -> None:
+        # Only the assets currently held are worth the intraday volume
+        assets = self._database.query_executor.get_current_user_held_asset_ids_and_symbols()
+        if assets is None or len(assets) == 0:
+            print("No held assets found to extract intraday data for.")
+            return None
+
+        # Bars older than the retention period would only be downsampled again right away
+        cutoff_timestamp = self._get_retention_cutoff_timestamp(INTRADAY_RETENTION_DAYS)
+        # Every supported interval by default
+        for interval_minutes in interval_minutes_list if interval_minutes_list is not None else list(INTRADAY_DOWNLOAD_PERIODS):
+            for i in range(0, len(assets), chunk_size):
+                df_intraday_prices = self.download_intraday_data(assets[i:i + chunk_size], interval_minutes)
+                df_intraday_prices = df_intraday_prices[df_intraday_prices["timestamp"] >= cutoff_timestamp]
+                # Re-downloaded bars overwrite the stored ones, the latest bar may still have been forming
+                self._database.query_executor.upsert_dataframes_into_sql_tables([
+                    (df_intraday_prices, "asset_intraday_price", ["asset_id", "interval_minutes", "timestamp"])
+                ])
+            print(f"{interval_minutes} minute intraday data stored for {len(assets)} assets.")
+        self.apply_retention_policy()
+
+    def _get_retention_cutoff_timestamp(self, retention_days: int) -> int:
+        # Start of the oldest UTC day that is kept, so only whole days are downsampled
+        cutoff_date = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=retention_days)
+        return int(cutoff_date.timestamp())
+
+    def apply_retention_policy(self, retention_days: int=INTRADAY_RETENTION_DAYS) -> None:
+        # Downsample the days older than the retention period into daily bars, then purge their intraday rows
+        start_dates, deleted_rows = self._database.query_executor.downsample_intraday_prices(self._get_retention_cutoff_timestamp(retention_days))
+        if len(start_dates) > 0:
+            self._database.query_executor.refresh_price_history_rollups("asset", start_dates)
+        logging.info(f"Intraday retention: {deleted_rows} intraday bars of {len(start_dates)} assets downsampled and purged.")
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
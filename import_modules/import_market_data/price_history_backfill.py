@@ -0,0 +1,104 @@
+# Purpose: Price History Backfill module for backfilling the price history of every asset through a persistent, prioritized queue.
+
+# Standard Libraries
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
+# Third-party Libraries
+import pandas as pd
+
+# Local Modules
+from database_management.database import Database
+from import_modules.import_market_data.historical_data_extractor import HistoricalDataExtractor
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Number of assets downloaded together by one request
+BACKFILL_CHUNK_SIZE: int = 50
+# Maximum number of download requests started per minute
+BACKFILL_REQUESTS_PER_MINUTE: int = 30
+# Number of attempts before an asset is marked as failed
+BACKFILL_MAX_ATTEMPTS: int = 3
+
+
+# RateLimiter class for spacing out requests, safe to share between threads
+class RateLimiter:
+    def __init__(self, requests_per_minute: int) -> None:
+        self._interval = 60.0 / requests_per_minute
+        self._next_request_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        # Reserve the next request slot, then sleep outside the lock until it comes up
+        with self._lock:
+            request_time = max(self._next_request_time, time.monotonic())
+            self._next_request_time = request_time + self._interval
+        time.sleep(max(0.0, request_time - time.monotonic()))
+
+
+# PriceHistoryBackfill class for working through the price_history_backfill_queue table
+class PriceHistoryBackfill:
+    def __init__(self, database: Database, chunk_size: int=BACKFILL_CHUNK_SIZE, requests_per_minute: int=BACKFILL_REQUESTS_PER_MINUTE, max_attempts: int=BACKFILL_MAX_ATTEMPTS) -> None:
+        self._database = database
+        self._historical_data_extractor = HistoricalDataExtractor(self._database)
+        self._chunk_size = chunk_size
+        self._rate_limiter = RateLimiter(requests_per_minute)
+        self._max_attempts = max_attempts
+
+    def _download_chunk(self, chunk: list[tuple]) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # Runs in the download thread, only the download happens here, the database is only used by the main thread
+        self._rate_limiter.wait()
+        return self._historical_data_extractor.download_historical_data(chunk, period="max")
+
+    def _store_chunk(self, chunk: list[tuple], future: Future) -> None:
+        asset_ids = [asset[0] for asset in chunk]
+        try:
+            df_price_history, df_dividend_history, df_split_history = future.result()
+        except Exception as e:
+            logging.error(f"Price history backfill download failed for {len(chunk)} assets: {e}")
+            self._database.query_executor.finish_price_history_backfill(asset_ids, str(e), self._max_attempts)
+            return None
+        self._historical_data_extractor.store_historical_data(df_price_history, df_dividend_history, df_split_history)
+        # Assets that came back empty are retried later, Yahoo Finance returns nothing when it throttles
+        found_asset_ids = {int(asset_id) for asset_id in df_price_history["asset_id"].unique()}
+        missing_asset_ids = [asset_id for asset_id in asset_ids if asset_id not in found_asset_ids]
+        self._database.query_executor.finish_price_history_backfill([asset_id for asset_id in asset_ids if asset_id in found_asset_ids])
+        if len(missing_asset_ids) > 0:
+            self._database.query_executor.finish_price_history_backfill(missing_asset_ids, "No historical data returned.", self._max_attempts)
+
+    def enqueue(self) -> None:
+        # Add new assets to the queue and refresh the priority of the unfinished ones
+        self._database.query_executor.enqueue_price_history_backfill()
+
+    def run(self) -> dict[str, int]:
+        # Resume a previous run, the assets it had claimed but not stored are pending again
+        self._database.query_executor.reset_in_progress_price_history_backfill()
+
+        # yf.download keeps its results in module-level state, concurrent calls overwrite each other's results, so only one download runs
+        # at a time, it already downloads the symbols of a chunk in parallel. The next chunk downloads while the previous one is stored.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            chunk = self._database.query_executor.claim_price_history_backfill_batch(self._chunk_size)
+            future: Future | None = executor.submit(self._download_chunk, chunk) if len(chunk) > 0 else None
+            while future is not None:
+                future_done = future
+                chunk_done = chunk
+                # Wait for the download, then start the next highest priority chunk before storing it
+                wait([future_done])
+                chunk = self._database.query_executor.claim_price_history_backfill_batch(self._chunk_size)
+                future = executor.submit(self._download_chunk, chunk) if len(chunk) > 0 else None
+                self._store_chunk(chunk_done, future_done)
+                status_counts = self._database.query_executor.get_price_history_backfill_status_counts()
+                print(f"Price history backfill: {status_counts.get('done', 0)} done, {status_counts.get('pending', 0)} pending, "
+                      f"{status_counts.get('failed', 0)} failed.")
+
+        status_counts = self._database.query_executor.get_price_history_backfill_status_counts()
+        logging.info(f"Price history backfill finished: {status_counts}")
+        return status_counts
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,150 @@
+# Purpose: Quote Service module for refreshing the latest quotes of held assets in batches and serving them from a TTL cache.
+
+# Standard Libraries
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+# Third-party Libraries
+import pandas as pd
+import yfinance as yf
+
+# Local Modules
+from database_management.database import Database
+from import_modules.import_market_data.yfinance_data_extractor import YahooFinanceDataExtractor
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Number of symbols requested together in a single yfinance download
+QUOTE_DOWNLOAD_CHUNK_SIZE: int = 200
+# Number of seconds a quote is served from memory before it's refreshed
+QUOTE_CACHE_TTL_SECONDS: float = 60.0
+LATEST_QUOTE_COLUMNS: list[str] = ["asset_id", "price", "previous_close", "quote_date", "updated_at"]
+
+
+# Quote class for defining the latest quote of an asset
+@dataclass
+class Quote:
+    asset_id: int
+    price: float
+    previous_close: float | None
+    quote_date: str
+    updated_at: str
+
+    def __str__(self) -> str:
+        return f"Quote(asset_id={self.asset_id}, price={self.price}, previous_close={self.previous_close}, " \
+               f"quote_date={self.quote_date}, updated_at={self.updated_at})"
+
+
+# QuoteService class for keeping the latest quotes of held assets in the latest_quote table and in memory
+class QuoteService:
+    def __init__(self, database: Database, ttl_seconds: float=QUOTE_CACHE_TTL_SECONDS, chunk_size: int=QUOTE_DOWNLOAD_CHUNK_SIZE) -> None:
+        self._database = database
+        self._yfinance_data_extractor = YahooFinanceDataExtractor(self._database)
+        self._ttl_seconds = ttl_seconds
+        self._chunk_size = chunk_size
+        # asset_id -> (quote, time.monotonic() when it was cached)
+        self._cache: dict[int, tuple[Quote, float]] = {}
+        self._cache_lock = threading.Lock()
+        # Set while a refresh is running, callers arriving meanwhile wait for it instead of starting their own
+        self._refresh_lock = threading.Lock()
+        self._refresh_done: threading.Event | None = None
+        # The shared database connection isn't thread-safe, so callers on different threads take turns using it
+        self._database_lock = threading.Lock()
+
+    def _download_quotes(self, assets: list[tuple]) -> pd.DataFrame:
+        # The last daily bar is the latest price (it updates during the session), the one before it is the previous close
+        asset_ids_by_yfinance_symbol = {self._yfinance_data_extractor.get_yfinance_symbol(exchange_acronym, symbol): asset_id
+                                        for asset_id, exchange_acronym, symbol in assets}
+        data = yf.download(list(asset_ids_by_yfinance_symbol), period="5d", interval="1d", auto_adjust=False,
+                           group_by="ticker", threads=True, progress=False)
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        quotes = []
+        for yfinance_symbol, asset_id in asset_ids_by_yfinance_symbol.items():
+            if isinstance(data.columns, pd.MultiIndex):
+                if yfinance_symbol not in data.columns.get_level_values(0):
+                    continue
+                closes = data[yfinance_symbol]["Close"].dropna()
+            else:
+                closes = data["Close"].dropna()
+            if closes.empty:
+                logging.warning(f"No quote found for {yfinance_symbol} on Yahoo Finance.")
+                continue
+            previous_close = float(closes.iloc[-2]) if len(closes) > 1 else None
+            quotes.append((asset_id, float(closes.iloc[-1]), previous_close, pd.Timestamp(closes.index[-1]).strftime("%Y-%m-%d"), updated_at))
+        return pd.DataFrame(quotes, columns=LATEST_QUOTE_COLUMNS)
+
+    def _cache_quotes(self, quotes: list[Quote]) -> None:
+        now = time.monotonic()
+        with self._cache_lock:
+            for quote in quotes:
+                self._cache[quote.asset_id] = (quote, now)
+
+    def _get_held_assets(self) -> list[tuple]:
+        with self._database_lock:
+            assets = self._database.query_executor.get_current_user_held_asset_ids_and_symbols()
+        return assets if assets is not None else []
+
+    def _run_refresh(self) -> int:
+        assets = self._get_held_assets()
+        if len(assets) == 0:
+            return 0
+        # A few multi-ticker requests for every held asset, stored in a single transaction
+        df_quotes = pd.concat([self._download_quotes(assets[i:i + self._chunk_size]) for i in range(0, len(assets), self._chunk_size)],
+                              ignore_index=True)
+        with self._database_lock:
+            self._database.query_executor.upsert_dataframes_into_sql_tables([(df_quotes, "latest_quote", ["asset_id"])])
+        self._cache_quotes([Quote(int(asset_id), price, None if pd.isna(previous_close) else previous_close, quote_date, updated_at)
+                            for asset_id, price, previous_close, quote_date, updated_at in df_quotes.itertuples(index=False, name=None)])
+        logging.info(f"Latest quotes refreshed for {len(df_quotes)}/{len(assets)} held assets.")
+        return len(df_quotes)
+
+    def refresh(self) -> None:
+        # Coalesce concurrent refreshes, only the first caller downloads and the others wait for its result
+        with self._refresh_lock:
+            refresh_done = self._refresh_done
+            is_leader = refresh_done is None
+            if is_leader:
+                refresh_done = self._refresh_done = threading.Event()
+        if not is_leader:
+            refresh_done.wait()
+            return None
+        try:
+            self._run_refresh()
+        except Exception as e:
+            # Keep serving the stored quotes if Yahoo Finance can't be reached
+            logging.error(f"Latest quote refresh failed: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refresh_done = None
+            refresh_done.set()
+
+    def get_quotes(self, asset_ids: list[int]) -> dict[int, Quote]:
+        # Serve fresh quotes from memory, refresh once if any of them is missing or expired
+        now = time.monotonic()
+        with self._cache_lock:
+            is_stale = any(asset_id not in self._cache or now - self._cache[asset_id][1] > self._ttl_seconds for asset_id in asset_ids)
+        if is_stale:
+            self.refresh()
+        with self._cache_lock:
+            quotes = {asset_id: self._cache[asset_id][0] for asset_id in asset_ids if asset_id in self._cache}
+        # Assets that aren't held (or failed to refresh) fall back to the last stored quote
+        missing_asset_ids = [asset_id for asset_id in asset_ids if asset_id not in quotes]
+        if len(missing_asset_ids) > 0:
+            with self._database_lock:
+                stored_quotes = [Quote(*row) for row in self._database.query_executor.get_latest_quotes_by_asset_ids(missing_asset_ids)]
+            self._cache_quotes(stored_quotes)
+            quotes.update({quote.asset_id: quote for quote in stored_quotes})
+        return quotes
+
+    def get_held_quotes(self) -> dict[int, Quote]:
+        # Latest quotes of every asset the current user holds
+        return self.get_quotes([asset[0] for asset in self._get_held_assets()])
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
@@ -0,0 +1,77 @@
+# Purpose: Symbol Translator module for translating each exchange's native symbols to the Yahoo Finance format.
+
+# Standard Libraries
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+# Third-party Libraries
+
+# Local Modules
+
+# Configure logging
+import logging
+
+
+# SymbolTranslationRule class for defining how the symbols of one exchange are translated to Yahoo Finance
+@dataclass(frozen=True)
+class SymbolTranslationRule:
+    # (pattern, replacement) pairs applied in order, later pairs never match the output of earlier ones
+    to_yfinance: list[tuple[re.Pattern, str]] = field(default_factory=list)
+    # Yahoo Finance suffix of the exchange, e.g. ".TO" for the TSX
+    suffix: str = ""
+
+
+# Function to precompile a list of (pattern, replacement) pairs
+def _compile(replacements: list[tuple[str, str]]) -> list[tuple[re.Pattern, str]]:
+    return [(re.compile(pattern), replacement) for pattern, replacement in replacements]
+
+
+# Global variables
+# Canadian exchanges only differ by their suffix, a "." class separator becomes "-"
+_CANADIAN_TO_YFINANCE: list[tuple[str, str]] = [(r"\.", "-")]
+# Translation rules by exchange acronym, exchanges without a rule use their symbols as they are
+SYMBOL_TRANSLATION_TABLE: dict[str, SymbolTranslationRule] = {
+    "NASDAQ": SymbolTranslationRule(),
+    "NYSE ARCA": SymbolTranslationRule(),
+    "BATS": SymbolTranslationRule(),
+    # Warrants (".WS") become "-WT", preferred shares ("$A") become "-PA" and share classes (".B") become "-B"
+    "NYSE": SymbolTranslationRule(
+        to_yfinance=_compile([(r"\.W[A-Z]*$", "-WT"), (r"\$([A-Z]*)", r"-P\1"), (r"\.", "-")])
+    ),
+    # Units (".U") become "-UN", on top of the NYSE warrants and share classes
+    "NYSE MKT": SymbolTranslationRule(
+        to_yfinance=_compile([(r"\.U$", "-UN"), (r"\.W[A-Z]*$", "-WT"), (r"\.", "-")])
+    ),
+    # Preferred shares (".PR.A") become "-PA", rights (".RT.A") "-RTA" and warrants (".WT.A") "-WTA"
+    "TSX": SymbolTranslationRule(
+        to_yfinance=_compile([(r"\.PR\.", "-P"), (r"\.RT\.", "-RT"), (r"\.WT\.", "-WT"), *_CANADIAN_TO_YFINANCE]),
+        suffix=".TO"
+    ),
+    "TSXV": SymbolTranslationRule(_compile(_CANADIAN_TO_YFINANCE), ".V"),
+    "CSE": SymbolTranslationRule(_compile(_CANADIAN_TO_YFINANCE), ".CN"),
+    "Cboe CA": SymbolTranslationRule(_compile(_CANADIAN_TO_YFINANCE), ".NE")
+}
+_IDENTITY_RULE = SymbolTranslationRule()
+
+
+# Function to get the translation rule of an exchange
+def _get_rule(exchange_acronym: str) -> SymbolTranslationRule:
+    rule = SYMBOL_TRANSLATION_TABLE.get(exchange_acronym)
+    if rule is None:
+        logging.warning(f"No symbol translation rule for exchange '{exchange_acronym}', using the symbols as they are.")
+        return _IDENTITY_RULE
+    return rule
+
+
+# Function to translate a native exchange symbol to its Yahoo Finance symbol, memoized per (exchange, symbol)
+@lru_cache(maxsize=65536)
+def to_yfinance_symbol(exchange_acronym: str, symbol: str) -> str:
+    rule = _get_rule(exchange_acronym)
+    for pattern, replacement in rule.to_yfinance:
+        symbol = pattern.sub(replacement, symbol)
+    return symbol + rule.suffix
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
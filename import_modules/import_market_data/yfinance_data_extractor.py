@@ -3,14 +3,13 @@
 # Standard Libraries
 
 # Third-party Libraries
-import requests
-import yfinance as yf
-import re
 
 # Local Modules
 from database_management.database import Database
 from import_modules.web_scraper import WebScraper
 from database_management.schema.asset_dataclass import YFinanceAssetInfo
+from import_modules.import_market_data.symbol_translator import to_yfinance_symbol
+from import_modules.import_market_data.yfinance_info_cache import YFinanceInfoCache, YFINANCE_INFO_ASSET_INFO_FIELD_GROUPS
 
 # Configure logging
 import logging
@@ -115,104 +114,21 @@ class YahooFinanceDataExtractor:
         self._database = database
         self._asset_symbol: str | None = None
         self._yfinance_asset_info: YFinanceAssetInfo | None = None
+        self._yfinance_info_cache = YFinanceInfoCache(self._database)
     
-    def _format_symbol(self, original_symbol: str, char_to_replace: str, replacement_char: str) -> str:
-        pattern = r'\{}([A-Z]+)'.format(char_to_replace)
-        formatted_symbol = re.sub(pattern, replacement_char, original_symbol)
-        return formatted_symbol
-
     def _format_symbol_for_yfinance(self, exchange_acronym: str, original_symbol: str) -> str:
-        if exchange_acronym == "NASDAQ":
-            formatted_symbol = original_symbol
-        
-        # Check if the symbol has ".__" in it, yfinance requires it to be "-"
-        if exchange_acronym == "NYSE":
-            if '.' in original_symbol:
-                if ".W" in original_symbol:
-                    formatted_symbol = self._format_symbol(original_symbol, ".W", "-WT")
-                else:
-                    formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            elif '$' in original_symbol:
-                formatted_symbol = self._format_symbol(original_symbol, '$', "-P")
-            else:
-                formatted_symbol = original_symbol
-
-        elif exchange_acronym == "NYSE MKT":
-            if '.' in original_symbol:
-                if ".U" in original_symbol:
-                    formatted_symbol = self._format_symbol(original_symbol, ".U", "-UN")
-                if ".W" in original_symbol:
-                    formatted_symbol = self._format_symbol(original_symbol, ".W", "-WT")
-                else:
-                    formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            # elif '$' in original_symbol:
-            #     formatted_symbol = self._format_symbol(original_symbol, '$', "-P")
-            else:
-                formatted_symbol = original_symbol
-
-        elif exchange_acronym == "NYSE ARCA":
-            formatted_symbol = original_symbol
-
-        elif exchange_acronym == "BATS":
-            formatted_symbol = original_symbol
-
-        # Check if the symbol has ".__" in it, yfinance requires it to be "-__"
-        elif exchange_acronym == "TSX":
-            if '.' in original_symbol:
-                if ".PR." in original_symbol:
-                    formatted_symbol = original_symbol.replace(".PR.", "-P")
-                elif ".RT." in original_symbol:
-                    formatted_symbol = original_symbol.replace(".RT.", "-RT")
-                elif ".WT." in original_symbol:
-                    formatted_symbol = original_symbol.replace(".WT.", "-WT")
-                else:
-                    formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            else:
-                formatted_symbol = original_symbol
-            # Add the ".TO" suffix to the symbol
-            formatted_symbol += ".TO"
-
-        elif exchange_acronym == "TSXV":
-            if '.' in original_symbol:
-                formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            else:
-                formatted_symbol = original_symbol
-            # Add the ".V" suffix to the symbol
-            formatted_symbol += ".V"
+        # Translated through the per-exchange table in symbol_translator, memoized per (exchange, symbol)
+        return to_yfinance_symbol(exchange_acronym, original_symbol)
 
-        elif exchange_acronym == "CSE":
-            if '.' in original_symbol:
-                formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            else:
-                formatted_symbol = original_symbol
-            # Add the ".CN" suffix to the symbol
-            formatted_symbol += ".CN"
-
-        elif exchange_acronym == "Cboe CA":
-            if '.' in original_symbol:
-                formatted_symbol = self._format_symbol(original_symbol, '.', '-')
-            else:
-                formatted_symbol = original_symbol
-            # Add the ".NE" suffix to the symbol
-            formatted_symbol += ".NE"
-
-        return formatted_symbol
-    
     def _get_asset_info_from_yfinance(self, exchange_acronym: str, asset_symbol: str) -> dict | None:
-        try:
-            ticker = yf.Ticker(self._format_symbol_for_yfinance(exchange_acronym, asset_symbol))
-            if ticker.info is None:
-                logging.error(f"Asset symbol {asset_symbol} not found on Yahoo Finance.")
-                raise ValueError(f"Asset symbol {asset_symbol} not found on Yahoo Finance.")
-            else:
-                logging.debug(f"df_asset_info: {ticker.info}")
-                return ticker.info
-        except requests.exceptions.HTTPError as err:
-            print(f"HTTP error occurred for symbol {asset_symbol}: {err}")
-            return None
-        except ValueError as err:
-            print(f"Value error occurred for symbol {asset_symbol}: {err}")
+        # Profiles are served from the info cache, Yahoo Finance is only asked again once they expire
+        yfinance_symbol = self._format_symbol_for_yfinance(exchange_acronym, asset_symbol)
+        asset_info = self._yfinance_info_cache.get_info(yfinance_symbol, YFINANCE_INFO_ASSET_INFO_FIELD_GROUPS)
+        if asset_info is None:
+            print(f"Could not get asset info for symbol {asset_symbol} from Yahoo Finance.")
             return None
+        logging.debug(f"df_asset_info: {asset_info}")
+        return asset_info
 
     def _store_raw_yfinance_data(self, df_asset_info: dict) -> None:
         # Store the yahoo finance data in a YFinanceAssetInfo object
@@ -247,6 +163,8 @@ class YahooFinanceDataExtractor:
     #     self._store_raw_yfinance_data()
 
     def extract_asset_info_from_yfinance(self, exchange_acronym, asset_symbol: str) -> None:  
+        # Forget the previous symbol's info so a failed lookup isn't mistaken for a successful one
+        self._yfinance_asset_info = None
         # Get the raw yahoo finance data
         df_asset_info = self._get_asset_info_from_yfinance(exchange_acronym, asset_symbol)
 
@@ -261,5 +179,12 @@ class YahooFinanceDataExtractor:
     def get_yfinance_asset_info(self) -> YFinanceAssetInfo | None:
         return self._yfinance_asset_info
 
+    def get_yfinance_symbol(self, exchange_acronym: str, asset_symbol: str) -> str:
+        return self._format_symbol_for_yfinance(exchange_acronym, asset_symbol)
+
+    def invalidate_cached_asset_info(self, exchange_acronym: str, asset_symbols: list[str]) -> None:
+        # Forces the next extraction of these symbols to ask Yahoo Finance again
+        self._yfinance_info_cache.invalidate([self._format_symbol_for_yfinance(exchange_acronym, asset_symbol) for asset_symbol in asset_symbols])
+
 if __name__ == "__main__":
     print("This module is not meant to be executed directly.")
@@ -0,0 +1,117 @@
+# Purpose: YFinance Info Cache module for keeping compressed Yahoo Finance info payloads in the database with a staleness policy per field group.
+
+# Standard Libraries
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+# Third-party Libraries
+import pandas as pd
+import requests
+import yfinance as yf
+
+# Local Modules
+from database_management.database import Database
+
+# Configure logging
+import logging
+
+
+# Global variables
+# Fields of the info payload by group, every field that isn't listed belongs to the "market" group
+YFINANCE_INFO_FIELD_GROUPS: dict[str, list[str]] = {
+    "profile": ["shortName", "longName", "longBusinessSummary", "website", "logo_url", "country", "city", "state", "address1", "zip", "phone"],
+    "classification": ["quoteType", "sector", "industry", "financialCurrency", "currency", "exchange", "fullExchangeName"]
+}
+# Number of days a cached field group stays fresh, company profiles rarely change while market fields change daily
+YFINANCE_INFO_TTL_DAYS: dict[str, float] = {
+    "profile": 365.0,
+    "classification": 90.0,
+    "market": 1.0
+}
+# Field groups read by asset info initialization, the only ones kept fresh by refresh_stale by default
+YFINANCE_INFO_ASSET_INFO_FIELD_GROUPS: list[str] = ["profile", "classification"]
+
+
+# YFinanceInfoCache class for serving Yahoo Finance info payloads from the yfinance_info_cache table and refreshing expired ones
+class YFinanceInfoCache:
+    def __init__(self, database: Database, ttl_days: dict[str, float] | None=None) -> None:
+        self._database = database
+        self._ttl_days = {**YFINANCE_INFO_TTL_DAYS, **(ttl_days or {})}
+        self._group_by_field = {field: field_group for field_group, fields in YFINANCE_INFO_FIELD_GROUPS.items() for field in fields}
+
+    def _get_cutoffs(self) -> dict[str, str]:
+        # Entries fetched before the cutoff of their field group are stale
+        now = datetime.now(timezone.utc)
+        return {field_group: (now - timedelta(days=ttl_days)).isoformat(timespec="seconds") for field_group, ttl_days in self._ttl_days.items()}
+
+    def _fetch_info(self, yfinance_symbol: str) -> dict | None:
+        try:
+            info = yf.Ticker(yfinance_symbol).info
+        # HTTP errors, connection errors and timeouts all mean Yahoo Finance can't be reached right now
+        except requests.exceptions.RequestException as err:
+            logging.error(f"Request error occurred for symbol {yfinance_symbol}: {err}")
+            return None
+        if not info:
+            logging.error(f"Asset symbol {yfinance_symbol} not found on Yahoo Finance.")
+            return None
+        return info
+
+    def _store_info(self, yfinance_symbol: str, info: dict) -> None:
+        # Split the payload by field group and store each group compressed, stamped with the time it was fetched
+        grouped_info: dict[str, dict] = {field_group: {} for field_group in self._ttl_days}
+        for field, value in info.items():
+            grouped_info[self._group_by_field.get(field, "market")][field] = value
+        fetched_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        df_cache = pd.DataFrame([(yfinance_symbol, field_group, zlib.compress(json.dumps(fields, default=str).encode()), fetched_at)
+                                 for field_group, fields in grouped_info.items()],
+                                columns=["yfinance_symbol", "field_group", "payload", "fetched_at"])
+        self._database.query_executor.upsert_dataframes_into_sql_tables([(df_cache, "yfinance_info_cache", ["yfinance_symbol", "field_group"])])
+
+    def get_info(self, yfinance_symbol: str, field_groups: list[str] | None=None) -> dict | None:
+        # Serve the requested field groups (all of them by default) from the cache, fetching the payload again only if one of them expired
+        field_groups = field_groups if field_groups is not None else list(self._ttl_days)
+        cutoffs = self._get_cutoffs()
+        entries = {field_group: (payload, fetched_at) for field_group, payload, fetched_at
+                   in self._database.query_executor.get_yfinance_info_cache_entries(yfinance_symbol)}
+        is_fresh = all(field_group in entries and entries[field_group][1] >= cutoffs[field_group] for field_group in field_groups)
+        if not is_fresh:
+            info = self._fetch_info(yfinance_symbol)
+            if info is not None:
+                self._store_info(yfinance_symbol, info)
+                return info
+            # Yahoo Finance couldn't be reached, stale fields are better than none
+            if len(entries) == 0:
+                return None
+            logging.warning(f"Using stale cached info for {yfinance_symbol}.")
+        info = {}
+        for field_group in field_groups:
+            if field_group in entries:
+                info.update(json.loads(zlib.decompress(entries[field_group][0])))
+        return info
+
+    def invalidate(self, yfinance_symbols: list[str]) -> None:
+        # Drop every field group of the symbols so the next lookup fetches them again
+        deleted_count = self._database.query_executor.delete_yfinance_info_cache_entries(yfinance_symbols)
+        logging.debug(f"Invalidated {deleted_count} cached Yahoo Finance info entries.")
+
+    def refresh_stale(self, limit: int | None=None, field_groups: list[str] | None=None) -> int:
+        # Re-fetch only the cached symbols with at least one expired field group among the ones the caller reads,
+        # the "market" group expires daily but isn't used by asset info initialization, so it doesn't trigger a refresh by default
+        field_groups = field_groups if field_groups is not None else YFINANCE_INFO_ASSET_INFO_FIELD_GROUPS
+        cutoffs = {field_group: cutoff for field_group, cutoff in self._get_cutoffs().items() if field_group in field_groups}
+        stale_symbols = self._database.query_executor.get_stale_yfinance_info_symbols(cutoffs, limit)
+        refreshed_count = 0
+        for i, yfinance_symbol in enumerate(stale_symbols, start=1):
+            info = self._fetch_info(yfinance_symbol)
+            if info is not None:
+                self._store_info(yfinance_symbol, info)
+                refreshed_count += 1
+            if i % 100 == 0:
+                print(f"Refreshed {i}/{len(stale_symbols)} stale Yahoo Finance info entries.")
+        logging.info(f"Refreshed {refreshed_count}/{len(stale_symbols)} stale Yahoo Finance info entries.")
+        return refreshed_count
+
+
+if __name__ == "__main__":
+    print("This module is not meant to be executed directly.")
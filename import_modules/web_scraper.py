@@ -1,6 +1,7 @@
 # Purpose: Web Scraper module for making web requests and parsing HTML tables.
 
 # Standard Libraries
+import io
 import requests
 
 # Third-party Libraries
@@ -48,5 +49,21 @@ class WebScraper:
             return None
 
 
+    def get_content_as_stream(self, url: str) -> io.BufferedReader | None:
+        # The body is read from the socket as it's consumed instead of being loaded into memory first
+        response = self.session.get(url, headers=self.headers, stream=True)
+        if response.status_code == 200:
+            # Undo any gzip or deflate content encoding while streaming
+            response.raw.decode_content = True
+            # Keep the raw stream open at the end of the body, the reader reports EOF instead of failing on a closed file
+            response.raw.auto_close = False
+            return io.BufferedReader(response.raw)
+        else:
+            response.close()
+            print(f"Request failed with status code: {response.status_code}")
+            logging.info(f"Request failed with status code: {response.status_code}")
+            return None
+
+
 if __name__ == "__main__":
     print("This module is not meant to be executed directly.")
@@ -17,6 +17,14 @@ from user_interface.user_input import UserInput
 from account_management.account_operations import UserAccountOperation, EmailAccountOperation
 from import_modules.import_market_data.exchange_listings_extractor import ExchangeListingsExtractor
 from import_modules.import_market_data.asset_info_extractor import AssetInfoExtractor
+from import_modules.import_market_data.historical_data_extractor import HistoricalDataExtractor
+from import_modules.import_market_data.price_history_backfill import PriceHistoryBackfill
+from import_modules.import_market_data.intraday_data_extractor import IntradayDataExtractor
+from import_modules.import_market_data.quote_service import QuoteService
+from import_modules.import_market_data.yfinance_info_cache import YFinanceInfoCache
+from import_modules.import_market_data.index_data_extractor import IndexConstituentsExtractor
+from data_analysis.adjustment_factor_engine import AdjustmentFactorEngine
+from data_analysis.price_matrix_cache import PriceMatrixCache
 
 # Local modules imported for Type Checking purposes only
 if TYPE_CHECKING:
@@ -35,6 +43,8 @@ class Dashboard:
         self._user_input = UserInput()
         self._user_account_operation = UserAccountOperation(self._database)
         self._email_account_operation = EmailAccountOperation(self._database)
+        # Kept for the whole session so its in-memory quote cache is shared by every view
+        self._quote_service = QuoteService(self._database)
         self._is_running = False
  
     def __print_welcome_screen(self):
@@ -186,6 +196,8 @@ class Dashboard:
 
     def view_current_portfolio(self):
         # TODO - review and finish this function
+        # Bring the cached split factors up to date, the query restates quantities with them
+        AdjustmentFactorEngine(self._database).refresh_adjustment_factors()
         results = self._database.query_executor.execute_complex_query_by_title("view_current_portfolio")
         print("CURRENT PORTFOLIO:")
         headers = ["symbol", "total_buy_qty", "total_buy_amnt", "avg_buy_price", "total_sell_qty", "total_sell_amnt",
@@ -193,6 +205,16 @@ class Dashboard:
         self._query_results.print_rows_with_headers(headers, results, currency=True)
     
 
+    def view_current_portfolio_market_value(self):
+        # Refresh the held assets' quotes in a few batched requests (served from memory if still fresh), the query only reads latest_quote
+        self._quote_service.get_held_quotes()
+        AdjustmentFactorEngine(self._database).refresh_adjustment_factors()
+        results = self._database.query_executor.execute_complex_query_by_title("market_value_of_current_holdings")
+        print("CURRENT PORTFOLIO MARKET VALUE:")
+        headers = ["symbol", "net_qty", "net_cost", "price", "market_value", "unrealized_gain", "day_change", "quote_date"]
+        self._query_results.print_rows_with_headers(headers, results, currency=True)
+
+
     def view_entire_portfolio_history(self):
         print("View Entire Portfolio History logic goes here...")
 
@@ -243,11 +265,15 @@ class Dashboard:
 
     
     def import_existing_portfolio_from_csv_file(self):
-        print("Import Existing Portfolio from CSV File logic goes here...")
+        # Call the import_from_csv_file script
+        from import_modules.import_from_brokerage_statement import import_from_csv_file
+        import_from_csv_file(self._database)
 
 
     def import_existing_portfolio_from_excel_file(self):
-        print("Import Existing Portfolio from Excel File logic goes here...")
+        # Call the import_from_excel_file script
+        from import_modules.import_from_brokerage_statement import import_from_excel_file
+        import_from_excel_file(self._database)
     
 
     def import_existing_portfolio_from_pdf_file(self):
@@ -269,6 +295,11 @@ class Dashboard:
         # Call the import_from_email_account script
         from import_modules.import_from_email_account import import_from_email_account
         import_from_email_account(self._database)
+
+    def sync_all_import_email_accounts(self):
+        # Call the sync_from_email_accounts script
+        from import_modules.email_sync_engine import sync_from_email_accounts
+        sync_from_email_accounts(self._database)
         
     
     # def get_available_email_accounts(self) -> list[EmailAccount] | None:
@@ -340,11 +371,11 @@ class Dashboard:
         self.initialize_cboe_canada_asset_information_data()
 
 
-    def _initialize_nasdaq_trader_market_listings(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_in_url: str, exchange_filter: str | None) -> None:
+    def _initialize_nasdaq_trader_market_listings(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_in_url: str, exchange_filter: str | None, refresh: bool=False) -> None:
         # Initialize the exchange listings object
         exchange_listings_extractor = ExchangeListingsExtractor(self._database)
         # Initialize the exchange listings
-        exchange_listings_extractor.initialize_nasdaq_trader_market_data(country_iso_code, exchange_name, exchange_acronym, exchange_in_url, exchange_filter)
+        exchange_listings_extractor.initialize_nasdaq_trader_market_data(country_iso_code, exchange_name, exchange_acronym, exchange_in_url, exchange_filter, refresh)
         
         # Get the exchange listings
         df_exchange_listings_info = exchange_listings_extractor.get_exchange_listings_info_dataframe()
@@ -353,14 +384,22 @@ class Dashboard:
         
         # Initialize the asset information
         asset_info_extractor = AssetInfoExtractor(self._database)
-        asset_info_extractor.initialize_asset_info(df_exchange_listings_info, exchange_acronym)
+        if refresh:
+            # Only the listing changes are enriched, renamed symbols update their existing asset_info row
+            is_renamed = df_exchange_listings_info["listing_change"] == "renamed"
+            if (~is_renamed).any():
+                asset_info_extractor.initialize_asset_info(df_exchange_listings_info[~is_renamed], exchange_acronym)
+            if is_renamed.any():
+                asset_info_extractor.initialize_asset_info(df_exchange_listings_info[is_renamed], exchange_acronym, update_existing=True)
+        else:
+            asset_info_extractor.initialize_asset_info(df_exchange_listings_info, exchange_acronym)
         
         # Print and log the success message
-        print(f"{exchange_name} listings initialized successfully.")
-        logging.info(f"{exchange_name} listings initialized successfully.")
+        print(f"{exchange_name} listings {'refreshed' if refresh else 'initialized'} successfully.")
+        logging.info(f"{exchange_name} listings {'refreshed' if refresh else 'initialized'} successfully.")
 
 
-    def initialize_nasdaq_asset_information_data(self):
+    def initialize_nasdaq_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "USA"
         exchange_name = "NASDAQ Stock Exchange"
@@ -370,10 +409,10 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_nasdaq_trader_market_listings(country_iso_code, exchange_name, exchange_acronym,
-                                           exchange_in_url, exchange_filter)
+                                           exchange_in_url, exchange_filter, refresh)
 
 
-    def initialize_nyse_asset_information_data(self):
+    def initialize_nyse_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "USA"
         exchange_name = "New York Stock Exchange"
@@ -383,10 +422,10 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_nasdaq_trader_market_listings(country_iso_code, exchange_name, exchange_acronym,
-                                           exchange_in_url, exchange_filter)
+                                           exchange_in_url, exchange_filter, refresh)
 
     
-    def initialize_nyse_mkt_asset_information_data(self):
+    def initialize_nyse_mkt_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "USA"
         exchange_name = "NYSE American"
@@ -396,10 +435,10 @@ class Dashboard:
  
         # Initialize the exchange listings
         self._initialize_nasdaq_trader_market_listings(country_iso_code, exchange_name, exchange_acronym,
-                                           exchange_in_url, exchange_filter)
+                                           exchange_in_url, exchange_filter, refresh)
 
 
-    def initialize_nyse_arca_asset_information_data(self):
+    def initialize_nyse_arca_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "USA"
         exchange_name = "NYSE Arca"
@@ -409,10 +448,10 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_nasdaq_trader_market_listings(country_iso_code, exchange_name, exchange_acronym,
-                                           exchange_in_url, exchange_filter)
+                                           exchange_in_url, exchange_filter, refresh)
 
 
-    def initialize_bats_asset_information_data(self):
+    def initialize_bats_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "USA"
         exchange_name = "BATS Global Markets"
@@ -422,14 +461,14 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_nasdaq_trader_market_listings(country_iso_code, exchange_name, exchange_acronym,
-                                           exchange_in_url, exchange_filter)
+                                           exchange_in_url, exchange_filter, refresh)
 
 
-    def _initialize_cboe_canada_market_listings(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_filter: str) -> None:
+    def _initialize_cboe_canada_market_listings(self, country_iso_code: str, exchange_name: str, exchange_acronym: str, exchange_filter: str, refresh: bool=False) -> None:
         # Initialize the exchange listings
         exchange_listings_extractor = ExchangeListingsExtractor(self._database)
         # Initialize the exchange listings
-        exchange_listings_extractor.initialize_cboe_canada_market_data(country_iso_code, exchange_name, exchange_acronym, exchange_filter)
+        exchange_listings_extractor.initialize_cboe_canada_market_data(country_iso_code, exchange_name, exchange_acronym, exchange_filter, refresh)
         
         # Get the exchange listings
         df_exchange_listings_info = exchange_listings_extractor.get_exchange_listings_info_dataframe()
@@ -438,14 +477,22 @@ class Dashboard:
         
         # Initialize the asset information
         asset_info_extractor = AssetInfoExtractor(self._database)
-        asset_info_extractor.initialize_asset_info(df_exchange_listings_info, exchange_acronym)
+        if refresh:
+            # Only the listing changes are enriched, renamed symbols update their existing asset_info row
+            is_renamed = df_exchange_listings_info["listing_change"] == "renamed"
+            if (~is_renamed).any():
+                asset_info_extractor.initialize_asset_info(df_exchange_listings_info[~is_renamed], exchange_acronym)
+            if is_renamed.any():
+                asset_info_extractor.initialize_asset_info(df_exchange_listings_info[is_renamed], exchange_acronym, update_existing=True)
+        else:
+            asset_info_extractor.initialize_asset_info(df_exchange_listings_info, exchange_acronym)
         
         # Print and log the success message
-        print(f"{exchange_name} listings initialized successfully.")
-        logging.info(f"{exchange_name} listings initialized successfully.")
+        print(f"{exchange_name} listings {'refreshed' if refresh else 'initialized'} successfully.")
+        logging.info(f"{exchange_name} listings {'refreshed' if refresh else 'initialized'} successfully.")
 
 
-    def initialize_tsx_asset_information_data(self):
+    def initialize_tsx_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "CAN"
         exchange_name = "Toronto Stock Exchange"
@@ -454,10 +501,10 @@ class Dashboard:
         
         # Initialize the exchange listings
         self._initialize_cboe_canada_market_listings(country_iso_code, exchange_name,
-                                                     exchange_acronym, exchange_filter)
+                                                     exchange_acronym, exchange_filter, refresh)
 
 
-    def initialize_tsxv_asset_information_data(self):
+    def initialize_tsxv_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "CAN"
         exchange_name = "TSX Venture Exchange"
@@ -466,10 +513,10 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_cboe_canada_market_listings(country_iso_code, exchange_name,
-                                                     exchange_acronym, exchange_filter)
+                                                     exchange_acronym, exchange_filter, refresh)
 
 
-    def initialize_cse_asset_information_data(self):
+    def initialize_cse_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "CAN"
         exchange_name = "Canadian Securities Exchange"
@@ -478,10 +525,10 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_cboe_canada_market_listings(country_iso_code, exchange_name,
-                                                     exchange_acronym, exchange_filter)
+                                                     exchange_acronym, exchange_filter, refresh)
 
 
-    def initialize_cboe_canada_asset_information_data(self):
+    def initialize_cboe_canada_asset_information_data(self, refresh: bool=False):
         # Set the exchange variables
         country_iso_code = "CAN"
         exchange_name = "Cboe Canada"
@@ -490,15 +537,101 @@ class Dashboard:
 
         # Initialize the exchange listings
         self._initialize_cboe_canada_market_listings(country_iso_code, exchange_name,
-                                                     exchange_acronym, exchange_filter)
+                                                     exchange_acronym, exchange_filter, refresh)
+
+
+    def refresh_all_exchange_listings(self):
+        # Diff every exchange's fresh listing against its asset_info rows, only new and renamed symbols are enriched
+        self.initialize_nasdaq_asset_information_data(refresh=True)
+        self.initialize_nyse_asset_information_data(refresh=True)
+        self.initialize_nyse_mkt_asset_information_data(refresh=True)
+        self.initialize_nyse_arca_asset_information_data(refresh=True)
+        self.initialize_bats_asset_information_data(refresh=True)
+        self.initialize_tsx_asset_information_data(refresh=True)
+        self.initialize_tsxv_asset_information_data(refresh=True)
+        self.initialize_cse_asset_information_data(refresh=True)
+        self.initialize_cboe_canada_asset_information_data(refresh=True)
+
+
+    def retry_failed_asset_information_data(self):
+        # Only the symbols the initialization journal marked as failed are processed again
+        asset_info_extractor = AssetInfoExtractor(self._database)
+        exchange_acronyms = self._database.query_executor.get_exchange_acronyms_with_failed_asset_info_init()
+        if len(exchange_acronyms) == 0:
+            print("No failed asset information to retry.")
+        for exchange_acronym in exchange_acronyms:
+            asset_info_extractor.retry_failed_asset_info(exchange_acronym)
+
+
+    def refresh_stale_asset_information_cache(self):
+        # Only the cached Yahoo Finance info entries past their field group's TTL are fetched again
+        yfinance_info_cache = YFinanceInfoCache(self._database)
+        refreshed_count = yfinance_info_cache.refresh_stale()
+        print(f"{refreshed_count} stale Yahoo Finance info entries refreshed.")
 
 
     def initialize_index_holdings_data(self):
-        print("Initialize Index Holdings Data logic goes here...")
+        # Store the default indexes and extract their constituents concurrently, only the changes since the last run are written
+        index_constituents_extractor = IndexConstituentsExtractor(self._database)
+        index_constituents_extractor.store_default_indexes()
+        results = index_constituents_extractor.extract_index_holdings()
+        if len(results) == 0:
+            print("No index holdings were extracted.")
+        for index_name, counts in results.items():
+            print(f"{index_name}: {counts['constituents']} constituents ({counts['unresolved']} not found in the database), "
+                  f"{counts['added']} added, {counts['removed']} removed.")
+
+
+    def view_index_holdings_data(self):
+        # Read from index_holdings, no index page is downloaded
+        results = self._database.query_executor.get_index_holdings_summary()
+        print("INDEX HOLDINGS:")
+        headers = ["index", "symbol", "constituents", "last_change_date"]
+        self._query_results.print_rows_with_headers(headers, results)
 
 
     def initialize_macro_data(self):
         print("Initialize Macro Data logic goes here...")
+
+
+    def initialize_historical_price_data(self):
+        # Download the full price, dividend and split history of every asset in the database
+        historical_data_extractor = HistoricalDataExtractor(self._database)
+        historical_data_extractor.extract_historical_data()
+        # Bring the cached price matrices up to date with the stored history
+        PriceMatrixCache(self._database).sync()
+        print("Historical price data initialized successfully.")
+        logging.info("Historical price data initialized successfully.")
+
+
+    def update_historical_price_data(self):
+        # Only download the dates missing since each asset's last stored date
+        historical_data_extractor = HistoricalDataExtractor(self._database)
+        historical_data_extractor.update_historical_data()
+        # Add the new dates to the cached price matrices, re-adjusted assets are read again in full
+        PriceMatrixCache(self._database).sync()
+
+
+    def backfill_historical_price_data(self):
+        # Queue every asset, held assets and index constituents first, and work through the queue
+        price_history_backfill = PriceHistoryBackfill(self._database)
+        price_history_backfill.enqueue()
+        status_counts = price_history_backfill.run()
+        # Add the backfilled assets to the cached price matrices
+        PriceMatrixCache(self._database).sync()
+        print(f"Price history backfill finished. {status_counts.get('done', 0)} assets done, {status_counts.get('failed', 0)} failed.")
+
+
+    def update_intraday_price_data(self):
+        # Download the recent 1 and 5 minute bars of the held assets, older intraday bars are downsampled into daily bars
+        intraday_data_extractor = IntradayDataExtractor(self._database)
+        intraday_data_extractor.extract_intraday_data()
+
+
+    def update_index_price_data(self):
+        # Download the daily levels of every index in index_info, new indexes get their full history, the others only the missing dates
+        historical_data_extractor = HistoricalDataExtractor(self._database)
+        historical_data_extractor.update_index_historical_data()
     
 
     def import_custom_market_data(self):
@@ -282,6 +282,7 @@ class ViewPortfolio(Menu):
         # Add menu options
         self.add_option(verb="View", subject="Portfolio Summary")
         self.add_option(verb="View", subject="Current Portfolio")
+        self.add_option(verb="View", subject="Current Portfolio Market Value")
         self.add_option(verb="View", subject="Entire Portfolio History")
         self.add_option(verb="Search", subject="for Current Investment")
         self.add_option(verb="Search", subject="for Investment in Portfolio History")
@@ -293,14 +294,16 @@ class ViewPortfolio(Menu):
             3: ViewPortfolio,
             4: ViewPortfolio,
             5: ViewPortfolio,
+            6: ViewPortfolio,
             0: PortfolioManager
         }
         self.menu_logic = {
             1: self.dashboard.view_portfolio_summary,
             2: self.dashboard.view_current_portfolio,
-            3: self.dashboard.view_entire_portfolio_history,
-            4: self.dashboard.search_for_current_investment,
-            5: self.dashboard.search_for_investment_in_portfolio_history,
+            3: self.dashboard.view_current_portfolio_market_value,
+            4: self.dashboard.view_entire_portfolio_history,
+            5: self.dashboard.search_for_current_investment,
+            6: self.dashboard.search_for_investment_in_portfolio_history,
             0: self.dashboard.previous_menu
         }
 
@@ -366,15 +369,17 @@ class ImportExistingPortfolio(Menu):
         self.add_option(verb="Import", subject="Existing Portfolio from PDF file")
         self.add_option(verb="Import", subject="Existing Portfolio from Database file")
         self.add_option(verb="Import", subject="Existing Portfolio from Email Account")
+        self.add_option(verb="Sync", subject="All Import Email Accounts")
         # Format option 0
         self.format_return_to_previous_menu_option()
         self.menu_mapping = {
             1: ImportFromBrokerageAccount,
-            2: ImportFromCSVFile,
-            3: ImportFromExcelFile,
+            2: ImportExistingPortfolio,
+            3: ImportExistingPortfolio,
             4: ImportFromPDFFile,
             5: ImportFromDatabaseFile,
             6: ImportExistingPortfolio,
+            7: ImportExistingPortfolio,
             0: ManagePortfolio
         }
         self.menu_logic = {
@@ -384,6 +389,7 @@ class ImportExistingPortfolio(Menu):
             4: self.dashboard.import_existing_portfolio_from_pdf_file,
             5: self.dashboard.import_existing_portfolio_from_database_file,
             6: self.dashboard.import_existing_portfolio_from_email_account,
+            7: self.dashboard.sync_all_import_email_accounts,
             0: self.dashboard.previous_menu
         }
 
@@ -630,6 +636,11 @@ class InitializeMarketData(Menu):
         self.add_option(verb="Initialize", subject="Asset Information Data")
         self.add_option(verb="Initialize", subject="Index Holdings Data")
         self.add_option(verb="Initialize", subject="Macro Data")
+        self.add_option(verb="Initialize", subject="Historical Price Data")
+        self.add_option(verb="Update", subject="Historical Price Data")
+        self.add_option(verb="Backfill", subject="Historical Price Data")
+        self.add_option(verb="Update", subject="Intraday Price Data")
+        self.add_option(verb="Update", subject="Index Price Data")
         # Format option 0
         self.format_return_to_previous_menu_option()
         self.menu_mapping = {
@@ -637,13 +648,23 @@ class InitializeMarketData(Menu):
             1: InitializeAssetInformationData,
             2: InitializeIndexHoldingsData,
             3: InitializeMacroData,
+            4: InitializeMarketData,
+            5: InitializeMarketData,
+            6: InitializeMarketData,
+            7: InitializeMarketData,
+            8: InitializeMarketData,
             0: ManageMarketData
         }
         self.menu_logic = {
             # 1: self.dashboard.menu_without_logic,
             1: self.dashboard.menu_without_logic,
-            2: self.dashboard.initialize_index_holdings_data,
+            2: self.dashboard.menu_without_logic,
             3: self.dashboard.initialize_macro_data,
+            4: self.dashboard.initialize_historical_price_data,
+            5: self.dashboard.update_historical_price_data,
+            6: self.dashboard.backfill_historical_price_data,
+            7: self.dashboard.update_intraday_price_data,
+            8: self.dashboard.update_index_price_data,
             0: self.dashboard.previous_menu
         }
 
@@ -712,6 +733,9 @@ class InitializeAssetInformationData(Menu):
         self.add_option(verb="Initialize", subject="TSXV Asset Information Data")
         self.add_option(verb="Initialize", subject="CSE Asset Information Data")
         self.add_option(verb="Initialize", subject="Cboe CA Asset Information Data")
+        self.add_option(verb="Refresh", subject="Stale Asset Information Cache")
+        self.add_option(verb="Refresh", subject="All Exchange Listings")
+        self.add_option(verb="Retry", subject="Failed Asset Information Data")
         # Format option 0
         self.format_return_to_previous_menu_option()
         self.menu_mapping = {
@@ -725,6 +749,9 @@ class InitializeAssetInformationData(Menu):
             8: InitializeAssetInformationData,
             9: InitializeAssetInformationData,
             10: InitializeAssetInformationData,
+            11: InitializeAssetInformationData,
+            12: InitializeAssetInformationData,
+            13: InitializeAssetInformationData,
             0: InitializeMarketData
         }
         self.menu_logic = { # TODO - add logic
@@ -738,6 +765,9 @@ class InitializeAssetInformationData(Menu):
             8: self.dashboard.initialize_tsxv_asset_information_data,
             9: self.dashboard.initialize_cse_asset_information_data,
             10: self.dashboard.initialize_cboe_canada_asset_information_data,
+            11: self.dashboard.refresh_stale_asset_information_cache,
+            12: self.dashboard.refresh_all_exchange_listings,
+            13: self.dashboard.retry_failed_asset_information_data,
             0: self.dashboard.previous_menu
         }
 
@@ -748,13 +778,19 @@ class InitializeIndexHoldingsData(Menu):
         super().__init__(dashboard)
         self.title = "INITIALIZE INDEX HOLDINGS DATA"
         self.previous_menu = InitializeMarketData(dashboard)
-        # Add menu options # TODO - add options
+        # Add menu options
+        self.add_option(verb="Initialize", subject="All Default Index Holdings Data")
+        self.add_option(verb="View", subject="Index Holdings Data")
         # Format option 0
         self.format_return_to_previous_menu_option()
-        self.menu_mapping = { # TODO - add mapping
-            0: ManageMarketData
+        self.menu_mapping = {
+            1: InitializeIndexHoldingsData,
+            2: InitializeIndexHoldingsData,
+            0: InitializeMarketData
         }
-        self.menu_logic = { # TODO - add logic
+        self.menu_logic = {
+            1: self.dashboard.initialize_index_holdings_data,
+            2: self.dashboard.view_index_holdings_data,
             0: self.dashboard.previous_menu
         }
 